@@ -2,6 +2,15 @@ import os
 import sys
 import numpy as np
 from cost_functions import cost_functions
+from cost_functions import array_cost_functions
+from utils import utils
+from utils.script_index import ScriptIndex
+
+
+def initial_script_index(project_data):
+    # per second actions, subjects and objects shared by the vectorized cost functions
+    project_data.script_index = ScriptIndex(project_data.script, project_data.totalTime, project_data.characters,
+                                            project_data.protagonist, project_data.objects)
 
 
 def initial_sequence_matrix(project_data, cost_matrix):
@@ -37,20 +46,26 @@ def get_character_animation(project_data, sequence_index, character_id, timestam
     return c_t_animation
 
 
-def initial_action_map(project_data, cost_matrix):
+def initial_action_map(project_data, cost_matrix, times=None):
+    # times: only recompute these times of an existing action map
 
     num_action_parts = 8  # model animation parts, current number is 8
 
     # ===== data =========
     # character has action on time t or not
-    action_map = np.full((project_data.numCharacters, project_data.totalTime, num_action_parts), -1)
+    if times is None:
+        action_map = np.full((project_data.numCharacters, project_data.totalTime, num_action_parts), -1)
+        times = range(action_map.shape[1])
+    else:
+        action_map = cost_matrix.action_map
+        action_map[:, list(times)] = -1
 
     action_weight_map = 0
 
     # ===== initialization =======
     character_dict = project_data.characters
 
-    for i in range(action_map.shape[1]):
+    for i in times:
         sequence_index = cost_matrix.sequence_cover[i]
 
         for j, c in enumerate(project_data.script[sequence_index]["subjects"]):
@@ -64,30 +79,83 @@ def initial_action_map(project_data, cost_matrix):
     cost_matrix.init_action_map(action_map)
 
 
-def initial_visual_cost_map(project_data, cost_matrix):
-    DefaultQualityHash = \
-        [[sys.maxsize for i in range(project_data.numDefaultCameras)] for j in range(project_data.totalTime)]
-
-    cost_functions.prepareQualityHashWoUserCam(DefaultQualityHash, project_data.totalTime, project_data.startTime,
-                                               project_data.endTime,
-                                               project_data.defaultCameras,
-                                               project_data.characters, project_data.protagonist, project_data.script,
-                                               project_data.charVisibility,
-                                               project_data.headRoom,
-                                               project_data.eyePos, project_data.distMap, project_data.objects,
-                                               project_data.objVisibility)
+def initial_visual_cost_map(project_data, cost_matrix, times=None, vectorized=True):
+    # times: only recompute these times of an existing visual cost map
+    # vectorized: compute all nodes at once with getWeightedQualityCostGrid, or one node per call
+    if times is None:
+        DefaultQualityHash = \
+            [[sys.maxsize for i in range(project_data.numDefaultCameras)] for j in range(project_data.totalTime)]
+    else:
+        DefaultQualityHash = cost_matrix.visual_cost_map
+
+    if not vectorized:
+        prepare_quality_hash(project_data, DefaultQualityHash, times)
+        cost_matrix.init_visual_cost_map(DefaultQualityHash)
+        return
+
+    if times is None:
+        times = range(project_data.totalTime)
+    if project_data.userCamData:
+        # times covered by user cameras are skipped and get 0 node cost
+        userCamTimes = utils.getUserCamTimes(project_data.userCamData)
+        for i in times:
+            if project_data.startTime + i in userCamTimes:
+                DefaultQualityHash[i] = [0] * project_data.numDefaultCameras
+        times = [i for i in times if project_data.startTime + i not in userCamTimes]
+    if len(times):
+        qualityCost = array_cost_functions.getWeightedQualityCostGrid(project_data.totalTime, project_data.startTime,
+                                                                      project_data.endTime,
+                                                                      project_data.defaultCameras,
+                                                                      project_data.characters,
+                                                                      project_data.protagonist, project_data.script,
+                                                                      project_data.charVisibility,
+                                                                      project_data.headRoom, project_data.eyePos,
+                                                                      project_data.distMap, project_data.objects,
+                                                                      project_data.objVisibility, times,
+                                                                      getattr(project_data, "script_index", None))
+        for i, row in zip(times, qualityCost.tolist()):
+            DefaultQualityHash[i] = row
 
     cost_matrix.init_visual_cost_map(DefaultQualityHash)
 
 
-def initial_action_cost_map(project_data, cost_matrix):
-
-    action_cost_map = np.full((project_data.numCharacters, project_data.totalTime), 1, dtype=float)
+def prepare_quality_hash(project_data, DefaultQualityHash, times=None):
+    if project_data.userCamData:
+        # times covered by user cameras are skipped
+        cost_functions.prepareQualityHashWUserCam(DefaultQualityHash, project_data.totalTime, project_data.startTime,
+                                                  project_data.endTime,
+                                                  project_data.defaultCameras,
+                                                  project_data.characters, project_data.protagonist,
+                                                  project_data.script,
+                                                  project_data.charVisibility,
+                                                  project_data.headRoom,
+                                                  project_data.eyePos, project_data.distMap, project_data.objects,
+                                                  project_data.objVisibility, project_data.userCamData, times)
+    else:
+        cost_functions.prepareQualityHashWoUserCam(DefaultQualityHash, project_data.totalTime, project_data.startTime,
+                                                   project_data.endTime,
+                                                   project_data.defaultCameras,
+                                                   project_data.characters, project_data.protagonist, project_data.script,
+                                                   project_data.charVisibility,
+                                                   project_data.headRoom,
+                                                   project_data.eyePos, project_data.distMap, project_data.objects,
+                                                   project_data.objVisibility, times)
+
+
+def initial_action_cost_map(project_data, cost_matrix, times=None):
+    # times: only recompute these times of an existing action cost map
+
+    if times is None:
+        action_cost_map = np.full((project_data.numCharacters, project_data.totalTime), 1, dtype=float)
+        times = range(project_data.totalTime)
+    else:
+        action_cost_map = cost_matrix.action_cost_map
 
     action_dict = project_data.animation_dict
     action_score_dict = [x for x in range(len(action_dict))]
     for i, c_t_a in enumerate(cost_matrix.action_map):
-        for j, t_a in enumerate(c_t_a):
+        for j in times:
+            t_a = c_t_a[j]
             score = 0
             for a in t_a:
                 if a == -1:
@@ -103,11 +171,23 @@ def initial_action_cost_map(project_data, cost_matrix):
     pass
 
 
-def init_quality_cost(project_data, cost_matrix):
-    quality_cost = cost_matrix.visual_cost_map
-
-    for t, t_cam_cost in enumerate(quality_cost):
-        for cam, v_cost in enumerate(t_cam_cost):
+def init_quality_cost(project_data, cost_matrix, times=None):
+    # times: only recompute these times of an existing quality cost
+    if times is None:
+        times = range(project_data.totalTime)
+        quality_cost = np.zeros((project_data.totalTime, project_data.numDefaultCameras), dtype=float)
+        talking_char_t = np.full((project_data.totalTime), -1)
+        talking_cost_map = np.full((project_data.totalTime, project_data.numDefaultCameras), 1, dtype=float)
+    else:
+        quality_cost = np.array(cost_matrix.quality_cost, dtype=float)
+        talking_char_t = np.array(project_data.talking_char_t)
+        talking_char_t[list(times)] = -1
+        talking_cost_map = np.array(cost_matrix.talking_cost, dtype=float)
+        talking_cost_map[list(times)] = 1
+
+    # visual_cost_map is kept unweighted
+    for t in times:
+        for cam, v_cost in enumerate(cost_matrix.visual_cost_map[t]):
             char_index = project_data.defaultCameras[cam]['charIndex']
             action_cost = cost_matrix.action_cost_map[char_index][t]
             quality_cost[t][cam] = cost_matrix.visual_cost_weight * v_cost \
@@ -115,11 +195,10 @@ def init_quality_cost(project_data, cost_matrix):
 
     # ======== talking cost  map =================
 
-    talking_char_t = np.full((project_data.totalTime), -1)
-    talking_cost_map = np.full((project_data.totalTime, project_data.numDefaultCameras), 1, dtype=float)
     char2camera_id = project_data.char2camera_id
 
-    for t, seq in enumerate(cost_matrix.sequence_cover):
+    for t in times:
+        seq = cost_matrix.sequence_cover[t]
         for char, char_sentence in enumerate(project_data.action_data[seq]):
             for s_id in char_sentence['sentences'].keys():
                 if char_sentence['sentences'][s_id]['animation_duration'] != 0:
@@ -149,7 +228,16 @@ def init_quality_cost(project_data, cost_matrix):
 
     cost_matrix.init_talking_cost(talking_cost_map)
 
-    quality_cost = np.array(quality_cost) + cost_matrix.talking_cost_weight * talking_cost_map
+    for t in times:
+        quality_cost[t] = quality_cost[t] + cost_matrix.talking_cost_weight * talking_cost_map[t]
+
+    # ======== character conflict and emotion cost, only if enabled ========
+    weights = cost_functions.STYLE_WEIGHTS
+    if weights[0] or weights[1]:
+        features = array_cost_functions.getStyleFeatures(project_data)
+        style_cost = array_cost_functions.getStyleCostGrid(features, *cost_functions.STYLE_INTENSITIES[:2])
+        for t in times:
+            quality_cost[t] = quality_cost[t] + weights[0] * style_cost[0][t] + weights[1] * style_cost[1][t]
     cost_matrix.init_quality_cost(quality_cost.tolist())
     project_data.initial_talking_char_t(talking_char_t)
 
@@ -164,7 +252,111 @@ def initial_cost_map(project_data, cost_matrix):
     pass
 
 
-
-
-
-
+def initial_transfer_cost(project_data, cost_matrix, max_duration, times=None):
+    """
+    transfer cost of every edge is prepared before dynamic programming
+    transfer_cost[t - startTime][duration - 1][cam1][cam2] is the edge cost from node [t, cam1] to node [t + duration, cam2],
+    edges to the dummy end node stay 0
+    camera movement cost is added to the default camera edges when its STYLE_WEIGHTS entry is not 0
+    times: only recompute edges starting at these times of an existing transfer cost
+    """
+    features = array_cost_functions.getTransferFeatures(project_data)
+    optimize_duration = project_data.endTime - project_data.startTime + 1
+    num_cameras = project_data.numDefaultCameras
+    if times is None or cost_matrix.transfer_cost is None or cost_matrix.transfer_cost.shape[1] != max_duration:
+        transfer_cost = np.zeros((optimize_duration, max_duration, num_cameras, num_cameras), dtype=float)
+        times = range(project_data.startTime, project_data.endTime + 1)
+    else:
+        transfer_cost = cost_matrix.transfer_cost
+
+    # camera movement cost is only added if enabled
+    movement_weight = cost_functions.STYLE_WEIGHTS[2]
+    if movement_weight:
+        style_features = array_cost_functions.getStyleFeatures(project_data)
+    else:
+        style_features = None
+
+    for t in times:
+        transfer_cost[t - project_data.startTime] = get_transfer_cost_row(
+            features, style_features, t, max_duration, project_data.endTime, num_cameras, movement_weight,
+            cost_functions.STYLE_INTENSITIES[2])
+
+    cost_matrix.init_transfer_cost(transfer_cost)
+
+
+def get_transfer_cost_row(features, style_features, t, max_duration, end_time, num_cameras, movement_weight=0,
+                          movement_intensity=0):
+    """
+    :param features: per second features from array_cost_functions.getTransferFeatures
+    :param style_features: per second features from array_cost_functions.getStyleFeatures, None without movement cost
+    :param t: start time of the edges
+    :param max_duration: longest shot duration
+    :param end_time: project end time
+    :param num_cameras: number of default cameras
+    :param movement_weight: camera movement weight, STYLE_WEIGHTS[2]
+    :param movement_intensity: handheld intensity, STYLE_INTENSITIES[2]
+    :return: transfer cost of the edges starting at t, shape [max_duration, num_cameras, num_cameras], durations
+             reaching the dummy end node stay 0
+    """
+    row = np.zeros((max_duration, num_cameras, num_cameras), dtype=float)
+    for duration in range(1, max_duration + 1):
+        if t + duration > end_time:
+            break
+        row[duration - 1] = array_cost_functions.getTransferCostBlock(features, t, t + duration)
+        if movement_weight:
+            row[duration - 1] += movement_weight * array_cost_functions.getCameraMovementCostBlock(
+                style_features, t, t + duration, movement_intensity)
+    return row
+
+
+def initial_dominated_states(project_data, cost_matrix, max_duration, times=None):
+    """
+    mark nodes [t, cam] that can not be on an optimal path, dominated[t - startTime][cam] is True for them
+    node [t, cam] is dominated by [t, cam2] if, for every shot duration, the quality cost saved by cam2 is larger than
+    the most the edges around the shot could save by keeping cam: the incoming and outgoing transfer cost of cam2 is
+    bounded by the largest transfer cost of its edges, the duration cost by the gap between same and other camera.
+    Swapping cam for cam2 then makes any path strictly cheaper, so pruning never changes the optimal path.
+    user cameras are not covered by the transfer cost, the bound only holds for the default cameras
+    times: only recompute the marks at these times of existing marks
+    """
+    optimize_duration = project_data.endTime - project_data.startTime + 1
+    num_cameras = project_data.numDefaultCameras
+    quality_cumsum = cost_matrix.quality_cost_cumsum[project_data.startTime:]
+    transfer_cost = cost_matrix.transfer_cost[:, :max_duration]
+    if times is None or cost_matrix.dominated is None:
+        dominated = np.zeros((optimize_duration, num_cameras), dtype=bool)
+        times = range(project_data.startTime, project_data.endTime + 1)
+    else:
+        dominated = cost_matrix.dominated
+
+    # largest hop cost saving of keeping the same camera, or of changing it
+    same_cost = cost_functions.getDurationCost([0, 0], [0, 0], 1)
+    duration_gap = np.array([abs(same_cost - cost_functions.getDurationCost([0, 0], [0, 1], duration))
+                             for duration in range(1, max_duration + 1)])
+
+    for t in times:
+        i = t - project_data.startTime
+        # in_max[cam]: largest transfer cost entering node [i, cam], in_gap its largest hop cost gap
+        in_max = np.zeros((num_cameras,), dtype=float)
+        in_gap = 0
+        for duration in range(1, min(i, max_duration) + 1):
+            in_max = np.maximum(in_max, transfer_cost[i - duration, duration - 1].max(axis=0))
+            in_gap = max(in_gap, duration_gap[duration - 1])
+        # out_max[duration - 1][cam]: largest transfer cost leaving node [i, cam] after duration
+        out_max = transfer_cost[i].max(axis=2)
+
+        # margin[cam][cam2] > 0 for every duration: cam2 is cheaper than cam whatever the neighbours are
+        margin = np.full((num_cameras, num_cameras), np.inf)
+        for duration in range(1, max_duration + 1):
+            if i + duration > optimize_duration:
+                break
+            quality_cost = quality_cumsum[i + duration] - quality_cumsum[i]
+            bound = .5 * in_max + .5 * in_gap
+            if i + duration < optimize_duration:
+                # edges to the dummy end node cost the same for every camera
+                bound = bound + .5 * out_max[duration - 1] + .5 * duration_gap[duration - 1]
+            margin = np.minimum(margin, quality_cost[:, np.newaxis] - quality_cost[np.newaxis, :] - bound[np.newaxis, :])
+        np.fill_diagonal(margin, -np.inf)
+        dominated[i] = (margin > 0).any(axis=1)
+
+    cost_matrix.init_dominated(dominated)
@@ -0,0 +1,102 @@
+# batch script, prepares and optimizes many projects on a worker pool
+import os
+import sys
+import time
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from common.data_preparation import data_preparation_main, connect_database
+from common.main import optimize_project, save_data
+from common import project_cache
+
+# DB connection of the current worker process, made on its first project loaded from DB
+worker_database = None
+
+
+def get_worker_database():
+    global worker_database
+    if worker_database is None:
+        worker_database = connect_database()
+    return worker_database
+
+
+def load_project(job):
+    """
+    :param job: project id, project cache folder, or path of a pickled Project
+    :return: project data
+    """
+    if isinstance(job, str) and project_cache.is_project_cache(job):
+        return project_cache.load_project(job)
+    if isinstance(job, str) and os.path.isfile(job):
+        return project_cache.load_pickled_project(job)
+    return data_preparation_main(int(job), get_worker_database())
+
+
+def run_project(job, result_path, animation_score_path, solver):
+    """
+    :return: summary of one project, {"job", "project_id", "path", "timing", "error"}
+    description:
+    prepares and optimizes one project, the camera sequence is saved to <result_path>/camera_path_<project id>
+    """
+    summary = {"job": job, "project_id": None, "path": None, "timing": {}, "error": None}
+    try:
+        start = time.time()
+        project_data = load_project(job)
+        summary["project_id"] = project_data.project_id
+        summary["timing"]["preparation"] = time.time() - start
+
+        start = time.time()
+        path, cost_matrix = optimize_project(project_data, animation_score_path, solver)
+        summary["timing"]["optimization"] = time.time() - start
+
+        summary["path"] = path
+        save_data(result_path, "camera_path_{}".format(project_data.project_id), path)
+    except Exception as e:
+        # one broken project should not stop the batch
+        summary["error"] = "{}: {}".format(type(e).__name__, e)
+    return summary
+
+
+def batch_main(jobs, result_path="../results", max_workers=None,
+               animation_score_path="../prepare/static_datas/animation_score_dict", solver="iterative"):
+    """
+    :param jobs: list of project ids, project cache folders or pickled Project files
+    :param result_path: folder of the per-project results and the batch summary
+    :param max_workers: number of worker processes, number of cpus if None
+    :param animation_score_path: animation score dict file
+    :param solver: solver of camera_optimization_main
+    :return: list of project summaries, in the order of jobs
+    description:
+    every worker process keeps its own DB connection. The timing summary of all projects is written to
+    <result_path>/batch_summary.json
+    """
+    if not os.path.isdir(result_path):
+        os.makedirs(result_path)
+
+    start = time.time()
+    summaries = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run_project, job, result_path, animation_score_path, solver): i
+                   for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries[futures[future]] = summary
+            if summary["error"]:
+                print("project {} failed: {}".format(summary["job"], summary["error"]))
+            else:
+                print("project {} done, preparation {:.2f}s, optimization {:.2f}s"
+                      .format(summary["project_id"], summary["timing"]["preparation"],
+                              summary["timing"]["optimization"]))
+
+    batch_summary = {"total_time": time.time() - start,
+                     "projects": [{"job": s["job"], "project_id": s["project_id"], "timing": s["timing"],
+                                   "error": s["error"]} for s in summaries]}
+    with open(os.path.join(result_path, "batch_summary.json"), "w") as f:
+        json.dump(batch_summary, f, indent=2)
+    print("{} projects done in {:.2f}s, {} failed".format(len(jobs), batch_summary["total_time"],
+                                                      len([s for s in summaries if s["error"]])))
+    return summaries
+
+
+if __name__ == "__main__":
+    # usage: python batch_optimization.py <project id or pickled project file> ...
+    batch_main(sys.argv[1:])
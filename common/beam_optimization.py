@@ -0,0 +1,168 @@
+import numpy as np
+from cost_functions import cost_functions
+from cost_functions import array_cost_functions
+from common.camera_optimization import MAX_DURATION, backward_pass, get_duration_cost_block, get_start_cost
+
+
+def get_transfer_cost_range():
+    """
+    :return: lowest and highest transfer cost any edge can have
+    description:
+    eye position and left right order costs are averages of values in [0, 1], the camera movement cost of
+    getCameraMovementCost is (1 - handheld intensity) times an average of closeness changes in [0, 1]
+    """
+    movement = cost_functions.STYLE_WEIGHTS[2] * (1 - cost_functions.STYLE_INTENSITIES[2])
+    return min(0, movement), cost_functions.TRANSFER_WEIGHTS[1] + cost_functions.TRANSFER_WEIGHTS[3] + max(0, movement)
+
+
+def get_forward_dominated(cost, shot_costs, bounds):
+    """
+    :param cost: cost so far of the nodes of one time, shape [n]
+    :param shot_costs: quality cost of a shot of every duration from these nodes, shape [durations, n]
+    :param bounds: most the edge leaving a shot of every duration can cost more for one camera than for another
+    :return: dominated nodes, shape [n]
+    description:
+    node cam2 is dominated by node cam if, for every duration, cost + shot cost + bound of cam is below cost + shot cost
+    of cam2. Any path going on from cam2 is then strictly more expensive than the same path going on from cam, so
+    dropping cam2 never drops the optimal path.
+    """
+    value = cost[np.newaxis, :] + shot_costs
+    # margin[cam][cam2] > 0 for every duration: cam2 costs more than cam whatever comes next
+    margin = (value[:, np.newaxis, :] - value[:, :, np.newaxis] - bounds[:, np.newaxis, np.newaxis]).min(axis=0)
+    np.fill_diagonal(margin, -np.inf)
+    return (margin > 0).any(axis=0)
+
+
+def beam_search(project_data, cost_matrix, beam_width, max_duration=MAX_DURATION, features=None, prune=True):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix with quality cost initialized, cost_matrix.transfer_cost is not needed
+    :param beam_width: number of camera states kept for every time
+    :param max_duration: longest shot duration
+    :param features: per second features from getTransferFeatures, computed if None
+    :param prune: drop the nodes dominated by another node of the same time before the beam cut, see
+                  get_forward_dominated
+    :return: [total cost, camera sequence]
+    description:
+    forward pass from startTime to endTime. Only the cheapest path reaching a node [t, cam] is kept. Nodes of time t
+    dominated by another node of time t are dropped, they can not be on the optimal path, then only the beam_width
+    remaining nodes with the lowest cost so far plus their first second of quality cost are expanded. Transfer costs are computed only for expanded nodes, so neither the full transfer
+    tensor nor the full cost-to-go table is stored: memory is O(T * beam_width) back pointers plus a window of
+    max_duration rows of pending costs.
+    """
+    if features is None:
+        features = array_cost_functions.getTransferFeatures(project_data)
+    num_cameras = project_data.numDefaultCameras
+    optimize_duration = project_data.endTime - project_data.startTime + 1
+    quality_cumsum = cost_matrix.quality_cost_cumsum
+    duration_cost = [get_duration_cost_block(duration, num_cameras) for duration in range(1, max_duration + 1)]
+    # most the leaving edge of a shot can cost more for one camera than for another
+    transfer_low, transfer_high = get_transfer_cost_range()
+    same_cost = cost_functions.getDurationCost([0, 0], [0, 0], 1)
+    edge_bound = np.array([.5 * (transfer_high - transfer_low) +
+                           .5 * abs(same_cost - cost_functions.getDurationCost([0, 0], [0, 1], duration))
+                           for duration in range(1, max_duration + 1)])
+
+    # pending[i % (max_duration + 1)] holds the best cost found so far for nodes of time startTime + i
+    pending_cost = np.full((max_duration + 1, num_cameras), np.inf)
+    pending_prev = np.full((max_duration + 1, num_cameras, 2), -1, dtype=int)
+    pending_cost[0] = get_start_cost(project_data)
+
+    # kept nodes of every time: {cam: [previous time, previous camera]}
+    back_pointer = []
+    end_cost = np.inf
+    end_prev = None
+
+    for i in range(optimize_duration):
+        t = project_data.startTime + i
+        slot = i % (max_duration + 1)
+        cost = pending_cost[slot].copy()
+        prev = pending_prev[slot].copy()
+        pending_cost[slot] = np.inf
+        pending_prev[slot] = -1
+
+        rank = cost + (quality_cumsum[i + 1] - quality_cumsum[i])
+        if prune:
+            live = np.flatnonzero(np.isfinite(cost))
+            durations = np.arange(1, min(max_duration, project_data.endTime + 1 - t) + 1)
+            shot_costs = quality_cumsum[i + durations][:, live] - quality_cumsum[i][live]
+            # edges to the dummy end node cost the same for every camera
+            bounds = np.where(t + durations == project_data.endTime + 1, 0, edge_bound[durations - 1])
+            rank[live[get_forward_dominated(cost[live], shot_costs, bounds)]] = np.inf
+        order = np.argsort(rank, kind="stable")[:beam_width]
+        keep = order[np.isfinite(rank[order])]
+        back_pointer.append({int(cam): [int(prev[cam][0]), int(prev[cam][1])] for cam in keep})
+        if keep.size == 0:
+            continue
+
+        for duration in range(1, max_duration + 1):
+            if t + duration > project_data.endTime + 1:
+                break
+            quality_cost = quality_cumsum[i + duration][keep] - quality_cumsum[i][keep]
+            if t + duration == project_data.endTime + 1:
+                # dummy end node, 0 node cost and 0 transfer cost
+                end_duration_cost = cost_functions.getDurationCost([t, 0], [t + duration, num_cameras], duration)
+                total_cost = cost[keep] + .5 * end_duration_cost + quality_cost
+                best = int(total_cost.argmin())
+                if total_cost[best] < end_cost:
+                    end_cost = total_cost[best]
+                    end_prev = [t, int(keep[best])]
+            else:
+                transfer_cost = array_cost_functions.getTransferCostBlock(features, t, t + duration, cams1=keep)
+                candidate_cost = cost[keep][:, np.newaxis] + .5 * transfer_cost \
+                                 + .5 * duration_cost[duration - 1][keep] + quality_cost[:, np.newaxis]
+                best = candidate_cost.argmin(axis=0)
+                total_cost = candidate_cost[best, np.arange(num_cameras)]
+                next_slot = (i + duration) % (max_duration + 1)
+                update = total_cost < pending_cost[next_slot]
+                pending_cost[next_slot][update] = total_cost[update]
+                pending_prev[next_slot][update, 0] = t
+                pending_prev[next_slot][update, 1] = keep[best[update]]
+
+    # backtrack from the dummy end node
+    path = []
+    node = end_prev
+    next_time = project_data.endTime + 1
+    while node is not None and node[0] >= project_data.startTime:
+        path.append([node[0], node[1], next_time - node[0]])
+        next_time = node[0]
+        node = back_pointer[node[0] - project_data.startTime][node[1]]
+    path.reverse()
+    return [float(end_cost), path]
+
+
+def camera_optimization_beam(project_data, cost_matrix, beam_width, max_duration=MAX_DURATION):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix prepared by camera_pre_optimization
+    :param beam_width: number of camera states kept for every time
+    :param max_duration: longest shot duration
+    :return: camera sequence, list of [start time, camera index, duration]
+    """
+    total_cost, path = beam_search(project_data, cost_matrix, beam_width, max_duration)
+    print("camera sequence (beam width {}, cost {}): {}".format(beam_width, total_cost, path))
+    return path
+
+
+def beam_search_gap(project_data, cost_matrix, beam_widths, max_duration=MAX_DURATION):
+    """
+    :param project_data: project data, should be small enough for the exact solver
+    :param cost_matrix: cost matrix prepared by camera_pre_optimization
+    :param beam_widths: list of beam widths to try
+    :param max_duration: longest shot duration
+    :return: list of [beam width, beam cost, gap to exact cost, relative gap]
+    description:
+    compare beam search with the exact dynamic programming to pick a beam width
+    """
+    DefaultCamCostHash, _ = backward_pass(project_data, cost_matrix, max_duration)
+    exact_cost = float(np.min(DefaultCamCostHash[0])) + get_start_cost(project_data)
+    features = array_cost_functions.getTransferFeatures(project_data)
+
+    report = []
+    for beam_width in beam_widths:
+        total_cost, _ = beam_search(project_data, cost_matrix, beam_width, max_duration, features)
+        gap = total_cost - exact_cost
+        report.append([beam_width, total_cost, gap, gap / exact_cost if exact_cost else 0])
+        print("beam width {}: cost {} exact cost {} gap {} ({:.2%})".format(beam_width, total_cost, exact_cost, gap,
+                                                                             report[-1][-1]))
+    return report
@@ -3,17 +3,36 @@ import sys
 import numpy as np
 from utils import utils
 from cost_functions import cost_functions
+from cost_functions import array_cost_functions
+from cost_functions import cost_curve
 from camera_optimization_support.support import *
 
 
 MAX_DURATION = 6
+SOLVERS = ["recursive", "iterative", "checkpoint"]
+# duration curve of every duration up to MAX_DURATION, 0 is the same camera
+DURATION_CURVE = cost_curve.CurveLookup(cost_curve.durationCurve, MAX_DURATION)
+# per frame project data used by camera_pre_optimization, velocity and distance only with the style cost enabled
+PRE_OPTIMIZATION_FIELDS = ["charVisibility", "eyePos", "headRoom", "leftRightOrder", "objVisibility"]
+STYLE_FIELDS = ["defaultVelocity", "defaultDist"]
 
 
-def camera_pre_optimization(project_data, cost_matrix):
+def camera_pre_optimization(project_data, cost_matrix, prune=False, transfer=True):
+    # prune: mark dominated nodes so the iterative solver skips them
+    # transfer: prepare the transfer cost, False when parallel_optimization prepares it in a process pool
+    assert transfer or not prune, "dominated state pruning needs the transfer cost"
+    assert not (prune and project_data.userCamData), "dominated state pruning does not support user cameras"
     script = project_data.script
     characters = project_data.characters
     action_data = project_data.action_data
     animation_dict = project_data.animation_dict
+    fields = PRE_OPTIMIZATION_FIELDS
+    if any(cost_functions.STYLE_WEIGHTS):
+        fields = fields + STYLE_FIELDS
+    project_data.prefetch(fields)
+
+    # ========= initial script index =============
+    initial_script_index(project_data)
 
     # ========= initial sequence matrix ==========
     initial_sequence_matrix(project_data, cost_matrix)
@@ -24,8 +43,44 @@ def camera_pre_optimization(project_data, cost_matrix):
 
     init_quality_cost(project_data, cost_matrix)
 
+    if transfer:
+        initial_transfer_cost(project_data, cost_matrix, MAX_DURATION)
+
+    if prune:
+        initial_dominated_states(project_data, cost_matrix, MAX_DURATION)
+
+
+def update_pre_optimization(project_data, cost_matrix, dirty_start, dirty_end, max_duration=MAX_DURATION):
+    """
+    :param project_data: project data after a local script or user edit
+    :param cost_matrix: cost matrix prepared by camera_pre_optimization before the edit
+    :param dirty_start: first edited time
+    :param dirty_end: last edited time
+    :param max_duration: longest shot duration
+    description:
+    recompute only the rows of the cost maps inside [dirty_start, dirty_end] and the edges touching them.
+    The edit must keep sequence lengths, so sequence_cover stays valid.
+    """
+    # the edit may change actions, subjects or objects, the script index is cheap to rebuild
+    initial_script_index(project_data)
+    times = range(dirty_start, dirty_end + 1)
+    initial_action_map(project_data, cost_matrix, times)
+    initial_visual_cost_map(project_data, cost_matrix, times)
+    initial_action_cost_map(project_data, cost_matrix, times)
+    init_quality_cost(project_data, cost_matrix, times)
 
-def helper(project_data, t, camIndex, DefaultCamCostHash, DefaultCamNextCamHash, DefaultQualithHash):
+    # edges starting inside the range or ending inside it
+    initial_transfer_cost(project_data, cost_matrix, max_duration,
+                          range(max(dirty_start - max_duration, project_data.startTime), dirty_end + 1))
+    # marks depend on the quality cost and the edges within max_duration of the node
+    if cost_matrix.dominated is not None:
+        initial_dominated_states(project_data, cost_matrix, max_duration,
+                                 range(max(dirty_start - max_duration, project_data.startTime),
+                                       min(dirty_end + max_duration, project_data.endTime) + 1))
+
+
+def helper(project_data, t, camIndex, DefaultCamCostHash, DefaultCamNextCamHash, DefaultQualithHash,
+           DefaultQualityCumsum=None, max_duration=MAX_DURATION):
     # recursion
     print("calculate time {} cam {}".format(t, camIndex))
     if t == project_data.endTime + 1:
@@ -35,21 +90,21 @@ def helper(project_data, t, camIndex, DefaultCamCostHash, DefaultCamNextCamHash,
     if t == -1:
         print("start Node!")
     else:
-        if DefaultCamCostHash[t - project_data.startTime][camIndex]:
+        if DefaultCamCostHash[t - project_data.startTime][camIndex] is not None:
             # if this cost has already been calculated
             # return this cost directly
             return DefaultCamCostHash[t - project_data.startTime][camIndex]
 
-    validNextNodes = utils.getValidNextNodesWoUserCam(t, MAX_DURATION, project_data.numDefaultCameras, project_data.startTime,
+    validNextNodes = utils.getValidNextNodesWoUserCam(t, max_duration, project_data.numDefaultCameras, project_data.startTime,
                                                       project_data.endTime)
     minCost = sys.maxsize
 
     for nextNode in validNextNodes:
         duration = nextNode[-1]
         nextNodeCost = helper(project_data, nextNode[0], nextNode[1], DefaultCamCostHash, DefaultCamNextCamHash,
-                                   DefaultQualithHash)
+                                   DefaultQualithHash, DefaultQualityCumsum, max_duration)
         qualityCost = cost_functions.getDurationQualityCost([t, camIndex], duration, DefaultQualithHash, project_data.startTime,
-                                                            project_data.endTime)
+                                                            project_data.endTime, DefaultQualityCumsum)
         # hops cost
         durationCost = cost_functions.getDurationCost([t, camIndex], [nextNode[0], nextNode[1]], duration)
         transferCost = cost_functions.getWeightedTransferCostWoUserCam([t, camIndex], [nextNode[0], nextNode[1]],
@@ -67,33 +122,417 @@ def helper(project_data, t, camIndex, DefaultCamCostHash, DefaultCamNextCamHash,
     return minCost
 
 
-def camera_optimization_main(project_data, cost_matrix):
-    optimizeDuration = project_data.endTime -project_data.startTime + 1
-    # 从任意点开始到end的cost
-    DefaultCamCostHash = [[None for i in range(project_data.numDefaultCameras)] for j in range(optimizeDuration)]
-    DefaultCamNextCamHash = [[[None, None] for i in range(project_data.numDefaultCameras)] for j in range(optimizeDuration)]
-    # node cost
-    DefaultQualityHash = cost_matrix.quality_cost
-    minCost = helper(project_data, -1, -1, DefaultCamCostHash, DefaultCamNextCamHash, DefaultQualityHash)
+def get_duration_cost_block(duration, num_cameras):
+    """
+    :param duration: shot duration
+    :param num_cameras: number of default cameras
+    :return: hop cost for every (camera, next camera) pair, shape [num_cameras, num_cameras]
+    """
+    # same as cost_functions.getDurationCost
+    block = np.full((num_cameras, num_cameras), DURATION_CURVE(duration), dtype=float)
+    np.fill_diagonal(block, DURATION_CURVE(0))
+    return block
+
+
+def check_transfer_cost(project_data, cost_matrix, max_duration):
+    """
+    build cost_matrix.transfer_cost if it is missing or does not cover max_duration
+    """
+    if cost_matrix.transfer_cost is None or cost_matrix.transfer_cost.shape[1] < max_duration:
+        initial_transfer_cost(project_data, cost_matrix, max_duration)
+
+
+def get_start_cost(project_data):
+    """
+    :param project_data: project data
+    :return: cost of the edge from the dummy start node to the node [startTime, cam], same for every camera
+    """
+    # dummy start node has 0 quality cost and 0 transfer cost
+    return .5 * cost_functions.getDurationCost([-1, -1], [project_data.startTime, 0], 1)
+
+
+def get_live_cameras(cost_matrix, i):
+    """
+    :return: index of the cameras not dominated at optimize time i, a slice of all cameras if there is no pruning
+    """
+    if cost_matrix.dominated is None:
+        return slice(None)
+    return np.flatnonzero(~cost_matrix.dominated[i])
+
+
+def backward_step(project_data, cost_matrix, i, future_cost, max_duration=MAX_DURATION, transfer_row=None):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix with quality cost initialized, and transfer cost if transfer_row is None
+    :param i: optimize time, t - startTime
+    :param future_cost: cost-to-go rows after i, future_cost[duration - 1] is the row of i + duration
+    :param max_duration: longest shot duration
+    :param transfer_row: transfer cost of the edges leaving i, cost_matrix.transfer_cost[i] if None
+    :return: cost-to-go row and next node row of i
+    """
+    if transfer_row is None:
+        transfer_row = cost_matrix.transfer_cost[i]
+    num_cameras = project_data.numDefaultCameras
+    quality_cumsum = cost_matrix.quality_cost_cumsum
+    cameras = np.arange(num_cameras)
+    t = project_data.startTime + i
+
+    # dominated nodes are skipped, their cost-to-go stays inf
+    live = get_live_cameras(cost_matrix, i)
+    min_cost = np.full((cameras[live].shape[0],), np.inf)
+    node = np.zeros((min_cost.shape[0], 2), dtype=int)
+    for duration in range(1, max_duration + 1):
+        if t + duration > project_data.endTime + 1:
+            break
+        quality_cost = quality_cumsum[i + duration][live] - quality_cumsum[i][live]
+        if t + duration == project_data.endTime + 1:
+            # dummy end node, 0 node cost and 0 transfer cost
+            end_cost = cost_functions.getDurationCost([t, 0], [t + duration, num_cameras], duration)
+            total_cost = .5 * end_cost + quality_cost
+            next_cam = np.full(min_cost.shape, num_cameras)
+        else:
+            next_live = get_live_cameras(cost_matrix, i + duration)
+            transfer_cost = transfer_row[duration - 1][live][:, next_live]
+            duration_cost = get_duration_cost_block(duration, num_cameras)[live][:, next_live]
+            candidate_cost = future_cost[duration - 1][next_live][np.newaxis, :] + .5 * transfer_cost \
+                             + .5 * duration_cost + quality_cost[:, np.newaxis]
+            next_index = candidate_cost.argmin(axis=1)
+            total_cost = candidate_cost[np.arange(min_cost.shape[0]), next_index]
+            next_cam = cameras[next_live][next_index]
+
+        update = total_cost < min_cost
+        min_cost[update] = total_cost[update]
+        node[update, 0] = t + duration
+        node[update, 1] = next_cam[update]
 
+    cost_row = np.full((num_cameras,), np.inf)
+    cost_row[live] = min_cost
+    next_row = np.zeros((num_cameras, 2), dtype=int)
+    next_row[live] = node
+    return cost_row, next_row
+
+
+def backward_pass(project_data, cost_matrix, max_duration=MAX_DURATION, DefaultCamCostHash=None,
+                  DefaultCamNextCamHash=None, last_time=None):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix with quality cost initialized
+    :param max_duration: longest shot duration
+    :param DefaultCamCostHash: cost-to-go table of a previous run, reused after last_time
+    :param DefaultCamNextCamHash: next node table of a previous run, reused after last_time
+    :param last_time: last time whose nodes are recomputed
+    :return: cost-to-go table of shape [optimizeDuration, numDefaultCameras] and next node table of shape
+             [optimizeDuration, numDefaultCameras, 2], same layout as DefaultCamCostHash and DefaultCamNextCamHash
+    description:
+    iterative version of helper. Tables are filled from endTime back to startTime, every node of time t only needs
+    the cost-to-go of nodes after t, so no recursion is needed. For each hop duration all (camera, next camera)
+    pairs are evaluated at once. Ties are broken the same way as helper: shorter duration first, then lower camera index.
+    Transfer costs are looked up from cost_matrix.transfer_cost.
+    Nodes after last_time only see costs after last_time, so their rows of a previous run stay valid when nothing
+    after last_time changed.
+    Nodes marked in cost_matrix.dominated are skipped.
+    """
+    num_cameras = project_data.numDefaultCameras
+    optimize_duration = project_data.endTime - project_data.startTime + 1
+    check_transfer_cost(project_data, cost_matrix, max_duration)
+
+    # last row is the dummy end node
+    cost_to_go = np.zeros((optimize_duration + 1, num_cameras), dtype=float)
+    next_node = np.zeros((optimize_duration, num_cameras, 2), dtype=int)
+    first = optimize_duration - 1
+    if DefaultCamCostHash is not None:
+        cost_to_go[:optimize_duration] = DefaultCamCostHash
+        next_node[:] = DefaultCamNextCamHash
+        first = min(last_time - project_data.startTime, first)
+
+    for i in range(first, -1, -1):
+        cost_to_go[i], next_node[i] = backward_step(project_data, cost_matrix, i,
+                                                    cost_to_go[i + 1:i + 1 + max_duration], max_duration)
+
+    return cost_to_go[:optimize_duration], next_node
+
+
+def backward_pass_with_user_cams(project_data, cost_matrix, userCamData, max_duration=MAX_DURATION):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix with quality cost initialized
+    :param userCamData: user added camera data {startTime: <user cam data>}, intervals must not overlap
+    :param max_duration: longest shot duration of default cameras, user cameras keep their own duration
+    :return: DefaultCamCostHash and DefaultCamNextCamHash as in backward_pass, infinite cost for default nodes covered by
+             user cameras, plus UserCamCostHash {startTime: cost-to-go} and UserCamNextCamHash {startTime: next node}
+    description:
+    backward_pass with user cameras as hard constraints, same rules as getValidNextNodesWUserCam and
+    getUserDefinedNextNodes: a default node can not jump through a user camera interval, it either stops before the
+    interval or goes to the user node at its start. User nodes have no quality cost and go to the end of their interval.
+    Default -> default transfer costs come from cost_matrix.transfer_cost, edges touching a user node follow
+    getWeightedTransferCostWithUserCams.
+    """
+    num_cameras = project_data.numDefaultCameras
+    optimize_duration = project_data.endTime - project_data.startTime + 1
+    quality_cumsum = cost_matrix.quality_cost_cumsum
+    check_transfer_cost(project_data, cost_matrix, max_duration)
+    features = array_cost_functions.getTransferFeatures(project_data)
+    user_features = array_cost_functions.getUserCamFeatures(userCamData, features)
+    user_cam_times = utils.getUserCamTimes(userCamData)
+    assert len(user_cam_times) == sum(x["duration"] for x in userCamData.values()), "user camera intervals overlap"
+
+    cost_to_go = np.zeros((optimize_duration + 1, num_cameras), dtype=float)
+    next_node = np.zeros((optimize_duration, num_cameras, 2), dtype=int)
+    user_cost_to_go = {}
+    user_next_node = {}
+    cameras = np.arange(num_cameras)
+
+    for i in range(optimize_duration - 1, -1, -1):
+        t = project_data.startTime + i
+        if t in userCamData:
+            user_cam = userCamData[t]["camIndex"]
+            t2 = t + userCamData[t]["duration"]
+            duration_cost = np.array([cost_functions.getDurationCost([t, user_cam], [t2, cam], t2 - t)
+                                      for cam in range(num_cameras)])
+            if t2 in userCamData:
+                # user -> user, no transfer cost
+                user_cost_to_go[t] = user_cost_to_go[t2] + .5 * cost_functions.getDurationCost(
+                    [t, user_cam], [t2, userCamData[t2]["camIndex"]], t2 - t)
+                user_next_node[t] = [t2, userCamData[t2]["camIndex"]]
+            elif t2 == project_data.endTime + 1:
+                user_cost_to_go[t] = .5 * cost_functions.getDurationCost([t, user_cam], [t2, num_cameras], t2 - t)
+                user_next_node[t] = [t2, num_cameras]
+            else:
+                transfer_cost = array_cost_functions.getTransferCostFromUserCam(features, user_features, t, t2)
+                total_cost = cost_to_go[t2 - project_data.startTime] + .5 * transfer_cost + .5 * duration_cost
+                next_cam = int(total_cost.argmin())
+                user_cost_to_go[t] = total_cost[next_cam]
+                user_next_node[t] = [t2, next_cam]
+
+        if t in user_cam_times:
+            cost_to_go[i] = np.inf
+            continue
+
+        min_cost = np.full((num_cameras,), np.inf)
+        for duration in range(1, max_duration + 1):
+            if t + duration > project_data.endTime + 1:
+                break
+            quality_cost = quality_cumsum[i + duration] - quality_cumsum[i]
+            if t + duration in userCamData:
+                # stop at the start of the user camera interval
+                user_cam = userCamData[t + duration]["camIndex"]
+                transfer_cost = array_cost_functions.getTransferCostToUserCam(features, user_features, t, t + duration)
+                duration_cost = np.array([cost_functions.getDurationCost([t, cam], [t + duration, user_cam], duration)
+                                          for cam in range(num_cameras)])
+                total_cost = user_cost_to_go[t + duration] + .5 * transfer_cost + .5 * duration_cost + quality_cost
+                next_cam = np.full((num_cameras,), user_cam)
+            elif t + duration == project_data.endTime + 1:
+                # dummy end node, 0 node cost and 0 transfer cost
+                end_cost = cost_functions.getDurationCost([t, 0], [t + duration, num_cameras], duration)
+                total_cost = .5 * end_cost + quality_cost
+                next_cam = np.full((num_cameras,), num_cameras)
+            else:
+                transfer_cost = cost_matrix.transfer_cost[i][duration - 1]
+                duration_cost = get_duration_cost_block(duration, num_cameras)
+                candidate_cost = cost_to_go[i + duration][np.newaxis, :] + .5 * transfer_cost + .5 * duration_cost \
+                                 + quality_cost[:, np.newaxis]
+                next_cam = candidate_cost.argmin(axis=1)
+                total_cost = candidate_cost[cameras, next_cam]
+
+            update = total_cost < min_cost
+            min_cost[update] = total_cost[update]
+            next_node[i][update, 0] = t + duration
+            next_node[i][update, 1] = next_cam[update]
+            if t + duration in userCamData:
+                # can not jump through a user camera interval
+                break
+        cost_to_go[i] = min_cost
+
+    return cost_to_go[:optimize_duration], next_node, user_cost_to_go, user_next_node
+
+
+def get_optimized_path_with_user_cams(project_data, DefaultCamCostHash, DefaultCamNextCamHash, UserCamNextCamHash,
+                                      userCamData):
+    """
+    :return: camera sequence, list of [start time, camera index, duration], user camera shots use their camIndex
+    """
     path = []
-    startIndex = DefaultCamCostHash[0].index(min(DefaultCamCostHash[0]))
+    if project_data.startTime in userCamData:
+        startNode = [project_data.startTime, userCamData[project_data.startTime]["camIndex"]]
+    else:
+        startNode = [project_data.startTime, int(np.argmin(DefaultCamCostHash[0]))]
+    while startNode[0] < project_data.endTime + 1:
+        if startNode[0] in userCamData:
+            nextNode = UserCamNextCamHash[startNode[0]]
+        else:
+            nextNode = [int(x) for x in DefaultCamNextCamHash[startNode[0] - project_data.startTime][startNode[1]]]
+        path.append([startNode[0], startNode[1], nextNode[0] - startNode[0]])
+        startNode = nextNode
+    return path
+
+
+def get_optimized_path(project_data, DefaultCamCostHash, DefaultCamNextCamHash):
+    """
+    :param project_data: project data
+    :param DefaultCamCostHash: cost-to-go table
+    :param DefaultCamNextCamHash: next node table
+    :return: camera sequence, list of [start time, camera index, duration]
+    """
+    path = []
+    startIndex = int(np.argmin(DefaultCamCostHash[0]))
     startNode = [project_data.startTime, startIndex]
     while startNode[0] < project_data.endTime + 1:
-        duration = DefaultCamNextCamHash[startNode[0] - project_data.startTime][startNode[1]][0] - startNode[0]
-        path.append([startNode[0], startNode[1], duration])
-        startNode = DefaultCamNextCamHash[startNode[0] - project_data.startTime][startNode[1]]
+        nextNode = [int(x) for x in DefaultCamNextCamHash[startNode[0] - project_data.startTime][startNode[1]]]
+        path.append([startNode[0], startNode[1], nextNode[0] - startNode[0]])
+        startNode = nextNode
+    return path
+
+
+def get_edge_features(project_data):
+    """
+    :param project_data: project data
+    :return: transfer features and style features, None without camera movement cost, to compute transfer cost rows
+             with get_transfer_cost_row
+    """
+    features = array_cost_functions.getTransferFeatures(project_data)
+    if cost_functions.STYLE_WEIGHTS[2]:
+        return features, array_cost_functions.getStyleFeatures(project_data)
+    return features, None
+
+
+def get_transfer_row(project_data, edge_features, i, max_duration):
+    """
+    :return: transfer cost of the edges leaving optimize time i, same as cost_matrix.transfer_cost[i]
+    """
+    features, style_features = edge_features
+    return get_transfer_cost_row(features, style_features, project_data.startTime + i, max_duration,
+                                 project_data.endTime, project_data.numDefaultCameras,
+                                 cost_functions.STYLE_WEIGHTS[2], cost_functions.STYLE_INTENSITIES[2])
+
+
+def checkpoint_backward_pass(project_data, cost_matrix, interval, max_duration=MAX_DURATION, edge_features=None):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix with quality cost initialized, the transfer cost is not used
+    :param interval: number of times between two checkpoints
+    :param max_duration: longest shot duration
+    :param edge_features: features from get_edge_features, computed if None
+    :return: cost-to-go row of startTime, and checkpoints {block start: cost-to-go rows after the block}
+    description:
+    backward_pass keeping only the last max_duration cost-to-go rows. At every block of interval times, the rows
+    after the block are saved, so the block can be solved again on its own during reconstruction.
+    Transfer costs are computed for one time at a time, the O(T * max_duration * C * C) transfer cost tensor is
+    never built.
+    """
+    optimize_duration = project_data.endTime - project_data.startTime + 1
+    if edge_features is None:
+        edge_features = get_edge_features(project_data)
+
+    # future_cost[duration - 1] is the cost-to-go row of i + duration, the first one is the dummy end node
+    future_cost = np.zeros((max_duration, project_data.numDefaultCameras), dtype=float)
+    checkpoints = {}
+    for i in range(optimize_duration - 1, -1, -1):
+        if i == optimize_duration - 1 or (i + 1) % interval == 0:
+            checkpoints[i - i % interval] = future_cost.copy()
+        cost_row, _ = backward_step(project_data, cost_matrix, i, future_cost, max_duration,
+                                    get_transfer_row(project_data, edge_features, i, max_duration))
+        future_cost = np.vstack([cost_row[np.newaxis, :], future_cost[:-1]])
+    return future_cost[0], checkpoints
+
+
+def get_checkpoint_optimized_path(project_data, cost_matrix, interval=None, max_duration=MAX_DURATION):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix with quality cost initialized, camera_pre_optimization with transfer=False is
+                        enough
+    :param interval: number of times between two checkpoints, about sqrt of the optimize duration if None
+    :param max_duration: longest shot duration
+    :return: camera sequence, same as get_optimized_path after backward_pass
+    description:
+    linear memory version of backward_pass + get_optimized_path. Only the checkpoints and the tables of one block are
+    kept, about O(numDefaultCameras * sqrt(optimizeDuration)) numbers, plus one time of transfer cost. Each block is
+    solved again from its checkpoint when the path reaches it, with the same float operations, so the path is the same.
+    Transfer costs are computed twice, once in checkpoint_backward_pass and once when their block is solved again.
+    """
+    optimize_duration = project_data.endTime - project_data.startTime + 1
+    if interval is None:
+        interval = max(int(np.ceil(np.sqrt(optimize_duration))), 1)
+    edge_features = get_edge_features(project_data)
+    start_cost, checkpoints = checkpoint_backward_pass(project_data, cost_matrix, interval, max_duration,
+                                                       edge_features)
+
+    path = []
+    startNode = [project_data.startTime, int(np.argmin(start_cost))]
+    block_start = None
+    while startNode[0] < project_data.endTime + 1:
+        i = startNode[0] - project_data.startTime
+        if block_start != i - i % interval:
+            # solve the block of i again from its checkpoint
+            block_start = i - i % interval
+            block_end = min(block_start + interval, optimize_duration)
+            cost_to_go = np.vstack([np.zeros((block_end - block_start, project_data.numDefaultCameras)),
+                                    checkpoints[block_start]])
+            next_node = np.zeros((block_end - block_start, project_data.numDefaultCameras, 2), dtype=int)
+            for j in range(block_end - block_start - 1, -1, -1):
+                cost_to_go[j], next_node[j] = backward_step(
+                    project_data, cost_matrix, block_start + j, cost_to_go[j + 1:j + 1 + max_duration], max_duration,
+                    get_transfer_row(project_data, edge_features, block_start + j, max_duration))
+        nextNode = [int(x) for x in next_node[i - block_start][startNode[1]]]
+        path.append([startNode[0], startNode[1], nextNode[0] - startNode[0]])
+        startNode = nextNode
+    return path
+
+
+def camera_optimization_main(project_data, cost_matrix, solver="iterative", max_duration=MAX_DURATION):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix prepared by camera_pre_optimization
+    :param solver: "iterative" for the bottom-up NumPy solver, "recursive" for the original memoized recursion,
+                   "checkpoint" for the iterative solver with O(sqrt(T)) tables and no transfer cost tensor, prepare the
+                   cost matrix with camera_pre_optimization(transfer=False) to never build the tensor
+    :param max_duration: longest shot duration
+    :return: camera sequence, list of [start time, camera index, duration]
+    user cameras in project_data.userCamData are fixed shots, only the iterative solver supports them
+    """
+    assert solver in SOLVERS, "unknown solver {}, expected one of {}".format(solver, SOLVERS)
+    assert solver == "iterative" or not project_data.userCamData, \
+        "user cameras are only supported by the iterative solver, not {}".format(solver)
+
+    if solver == "recursive":
+        optimizeDuration = project_data.endTime -project_data.startTime + 1
+        # 从任意点开始到end的cost
+        DefaultCamCostHash = [[None for i in range(project_data.numDefaultCameras)] for j in range(optimizeDuration)]
+        DefaultCamNextCamHash = [[[None, None] for i in range(project_data.numDefaultCameras)] for j in range(optimizeDuration)]
+        # node cost
+        DefaultQualityHash = cost_matrix.quality_cost
+        minCost = helper(project_data, -1, -1, DefaultCamCostHash, DefaultCamNextCamHash, DefaultQualityHash,
+                         cost_matrix.quality_cost_cumsum, max_duration)
+    elif solver == "iterative" and project_data.userCamData:
+        DefaultCamCostHash, DefaultCamNextCamHash, UserCamCostHash, UserCamNextCamHash = \
+            backward_pass_with_user_cams(project_data, cost_matrix, project_data.userCamData, max_duration)
+    elif solver == "iterative":
+        DefaultCamCostHash, DefaultCamNextCamHash = backward_pass(project_data, cost_matrix, max_duration)
+        cost_matrix.init_dp_tables(DefaultCamCostHash, DefaultCamNextCamHash)
+
+    if solver == "checkpoint":
+        path = get_checkpoint_optimized_path(project_data, cost_matrix, max_duration=max_duration)
+    elif solver == "iterative" and project_data.userCamData:
+        path = get_optimized_path_with_user_cams(project_data, DefaultCamCostHash, DefaultCamNextCamHash,
+                                                 UserCamNextCamHash, project_data.userCamData)
+    else:
+        path = get_optimized_path(project_data, DefaultCamCostHash, DefaultCamNextCamHash)
 
     # path = [[0, 7, 3], [3, 67, 4], [7, 7, 3], [10, 29, 4], [14, 87, 3], [17, 47, 3], [20, 48, 2], [22, 47, 3], [25, 48, 3], [28, 47, 3], [31, 29, 5], [36, 7, 2], [38, 29, 4], [42, 68, 2], [44, 69, 3], [47, 8, 5], [52, 47, 3], [55, 8, 4], [59, 29, 5], [64, 7, 4], [68, 29, 4], [72, 7, 3], [75, 67, 2], [77, 29, 5], [82, 8, 4], [86, 47, 3], [89, 87, 1], [90, 29, 4], [94, 7, 5], [99, 29, 2], [101, 8, 3], [104, 7, 3], [107, 29, 4], [111, 7, 2], [113, 88, 2], [115, 89, 3], [118, 8, 4], [122, 29, 5], [127, 7, 4], [131, 8, 4], [135, 7, 4], [139, 29, 4], [143, 7, 3]]
 
     print("camera sequence: ", path)
 
+    userCamData = project_data.userCamData or {}
     t = 0
     for cam in path:
         start = cam[0]
         cam_id = cam[1]
         end = start + cam[2]
         for i in range(start, end):
+            # user camera indices may overlap the default ones, only the shot start tells them apart
+            if start in userCamData:
+                print("Use user defined Cam: {}".format(cam_id))
+                t += 1
+                continue
             cam_setting = project_data.defaultCameras[cam_id]
             cam_index = cam_setting['camIndex']
             cam_char = cam_setting['charIndex']
@@ -106,5 +545,45 @@ def camera_optimization_main(project_data, cost_matrix):
     return path
 
 
+def camera_re_optimization(project_data, cost_matrix, dirty_start, dirty_end, max_duration=MAX_DURATION):
+    """
+    :param project_data: project data after a local script or user edit
+    :param cost_matrix: cost matrix of a previous camera_optimization_main run
+    :param dirty_start: first edited time
+    :param dirty_end: last edited time
+    :param max_duration: longest shot duration, same as the previous run
+    :return: camera sequence, list of [start time, camera index, duration]
+    description:
+    incremental version of camera_pre_optimization + camera_optimization_main. Only the edited cost rows are
+    recomputed and the backward pass restarts from dirty_end, reusing the tables after it.
+    With dominated state pruning the marks up to dirty_end + max_duration may change, so it restarts from there.
+    With user cameras the backward pass runs over the whole timeline, the user camera tables are not kept.
+    """
+    update_pre_optimization(project_data, cost_matrix, dirty_start, dirty_end, max_duration)
+    if project_data.userCamData:
+        DefaultCamCostHash, DefaultCamNextCamHash, UserCamCostHash, UserCamNextCamHash = \
+            backward_pass_with_user_cams(project_data, cost_matrix, project_data.userCamData, max_duration)
+        # default tables with user cameras can not be reused by a later run without them
+        cost_matrix.init_dp_tables(None, None)
+        path = get_optimized_path_with_user_cams(project_data, DefaultCamCostHash, DefaultCamNextCamHash,
+                                                 UserCamNextCamHash, project_data.userCamData)
+        print("camera sequence: ", path)
+        return path
+
+    if cost_matrix.dominated is not None:
+        dirty_end = min(dirty_end + max_duration, project_data.endTime)
+    if cost_matrix.cost_to_go is None:
+        DefaultCamCostHash, DefaultCamNextCamHash = backward_pass(project_data, cost_matrix, max_duration)
+    else:
+        DefaultCamCostHash, DefaultCamNextCamHash = backward_pass(project_data, cost_matrix, max_duration,
+                                                                  cost_matrix.cost_to_go, cost_matrix.next_node,
+                                                                  dirty_end)
+    cost_matrix.init_dp_tables(DefaultCamCostHash, DefaultCamNextCamHash)
+
+    path = get_optimized_path(project_data, DefaultCamCostHash, DefaultCamNextCamHash)
+    print("camera sequence: ", path)
+    return path
+
+
 if __name__ == "__main__":
     camera_optimization_main(32)
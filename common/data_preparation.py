@@ -32,13 +32,24 @@ def load_local_data(path, project):
     project.load_color_abs_coverage(color_abs_coverage)
 
 
-def data_preparation_main(project_id):
-
+def connect_database(pool_size=None):
+    # pool_size: pooled connections for loaders running on several threads
     db_address = "mysql.minestoryboard.com"
-    database = DataBase(db_address, "minestory", "2870", "minestory")
+    database = DataBase(db_address, "minestory", "2870", "minestory", pool_size)
     database.db_connect()
+    return database
+
+
+def data_preparation_main(project_id, database=None, max_threads=None):
+    # database: an already connected DataBase, a new connection is made if None
+    # max_threads: load every per frame data now, downloaded concurrently and parsed in worker processes.
+    #              Otherwise each one is loaded when first used
+    if database is None:
+        database = connect_database(max_threads)
     dl = DBLoader(database, project_id)
     project_data = Project(dl, project_id)
+    if max_threads:
+        project_data.prefetch(max_threads=max_threads)
 
     # TODO: change local data load to mysql
     path = "../../TCL_MineTool/UnityProject/MineStudioPrototype/Assets/StreamingAssets/camera_data_58"
@@ -2,6 +2,7 @@
 import os
 import pickle
 from common.data_preparation import data_preparation_main
+from common import project_cache
 from common.camera_optimization import camera_optimization_main, camera_pre_optimization
 from prepare.structure import CostMatrix
 
@@ -25,24 +26,38 @@ def load_data(path, fn):
     return data
 
 
+def optimize_project(project_data, animation_score_path="../prepare/static_datas/animation_score_dict",
+                     solver="iterative"):
+    """
+    :param project_data: project data from data_preparation_main
+    :param animation_score_path: animation score dict file
+    :param solver: solver of camera_optimization_main
+    :return: camera sequence and the cost matrix used to find it
+    """
+    project_data.initial_minimum_cost_map()
+    project_data.initial_animation_score_dict(animation_score_path)
+    project_data.init_char2camera_id()
+
+    cost_matrix = CostMatrix(project_data.project_id,
+                             action_cost_weight=5, visual_cost_weight=1)
+    camera_pre_optimization(project_data, cost_matrix)
+    path = camera_optimization_main(project_data, cost_matrix, solver)
+    project_data.set_camera_optimized_path(path)
+    return path, cost_matrix
+
+
 def main(image_root, num_camera, num_time):
     result_path = "../results"
     # ================ Data Preparation ==============
     # project_data = data_preparation_main(58)
 
-    # save_data(result_path, "project_data", project_data)
+    # project_cache.save_project(os.path.join(result_path, "project_data"), project_data)
 
     # =============== Camera Optimization ============
 
-    project_data = load_data(result_path, "project_data")
-    project_data.initial_minimum_cost_map()
-    project_data.initial_animation_score_dict("../prepare/static_datas/animation_score_dict")
-    project_data.init_char2camera_id()
-
-    cost_matrix = CostMatrix(project_data.project_id,
-                             action_cost_weight=5, visual_cost_weight=1)
-    camera_pre_optimization(project_data, cost_matrix)
-    camera_optimization_main(project_data, cost_matrix)
+    # pickled projects of older runs are converted to a cache
+    project_data = project_cache.load_or_convert_project(os.path.join(result_path, "project_data"))
+    optimize_project(project_data)
 
 
 
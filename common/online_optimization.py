@@ -0,0 +1,178 @@
+import numpy as np
+from cost_functions import cost_functions
+from cost_functions import array_cost_functions
+from common.camera_optimization import MAX_DURATION, get_duration_cost_block
+
+FEATURE_NAMES = ["quality", "eyePos", "leftRight", "subCount", "objCount"]
+
+
+def iter_second_features(project_data, cost_matrix):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix with quality cost initialized
+    :return: generator of per second features from startTime to endTime
+    description:
+    replay a prepared project as a stream. A live producer should yield the same dicts, with leftRight codes that are
+    consistent over the whole stream.
+    """
+    features = array_cost_functions.getTransferFeatures(project_data)
+    quality_hash = np.asarray(cost_matrix.quality_cost, dtype=float)
+    for t in range(project_data.startTime, project_data.endTime + 1):
+        yield {"time": t,
+               "quality": quality_hash[t - project_data.startTime],
+               "eyePos": features["eyePos"][t],
+               "leftRight": features["leftRight"][t],
+               "subCount": features["subCount"][t],
+               "objCount": features["objCount"][t]}
+
+
+class OnlineCameraOptimizer:
+    """
+    sliding window camera selection
+    Seconds are pushed one at a time. Forward costs are kept only from the end of the last committed shot, and a shot
+    of the current best path is committed once it ended at least `window` seconds ago. A committed second is never
+    changed afterwards, and the delay of a decision is at most window + max_duration seconds.
+    """
+
+    def __init__(self, num_cameras, window, start_time=0, max_duration=MAX_DURATION):
+        self.num_cameras = num_cameras
+        self.window = window
+        self.start_time = start_time
+        self.max_duration = max_duration
+        self.duration_cost = [get_duration_cost_block(duration, num_cameras) for duration in range(1, max_duration + 1)]
+
+        # received features {name: {time: value}}, only kept from the anchor time on
+        self.features = {name: {} for name in FEATURE_NAMES}
+        # forward cost of node [t, cam] without its own quality cost, and its previous node
+        self.cost = {}
+        self.prev = {}
+        # all paths must start a shot at the anchor time
+        self.anchor = start_time
+        self.now = start_time - 1
+
+    def push(self, second):
+        """
+        :param second: per second features, see iter_second_features
+        :return: newly committed shots, list of [start time, camera index, duration]
+        """
+        assert second["time"] == self.now + 1, "seconds must be pushed in order, expected time {}".format(self.now + 1)
+        self.now = second["time"]
+        for name in FEATURE_NAMES:
+            self.features[name][self.now] = second[name]
+
+        if self.now == self.start_time:
+            # dummy start node has 0 quality cost and 0 transfer cost
+            start_cost = .5 * cost_functions.getDurationCost([-1, -1], [self.start_time, 0], 1)
+            self.cost[self.now] = np.full((self.num_cameras,), start_cost)
+            self.prev[self.now] = np.full((self.num_cameras, 2), -1, dtype=int)
+        else:
+            self.relax(self.now)
+        return self.commit(self.now - self.window)
+
+    def finish(self):
+        """
+        :return: all shots not committed yet, the last one ends at the last pushed second
+        """
+        if self.now < self.start_time:
+            return []
+        return self.commit(self.now + 1, final=True)
+
+    def quality_sum(self, t1, t2):
+        return np.sum([self.features["quality"][t] for t in range(t1, t2)], axis=0)
+
+    def edge_cost(self, t1, cams1, t2):
+        """
+        :return: edge cost from cameras cams1 at t1 to every camera at t2, including quality cost of the shot [t1, t2)
+        """
+        transfer_cost = array_cost_functions.getTransferCostBlock(self.features, t1, t2, cams1=cams1)
+        return .5 * transfer_cost + .5 * self.duration_cost[t2 - t1 - 1][cams1] \
+               + self.quality_sum(t1, t2)[cams1][:, np.newaxis]
+
+    def relax(self, t):
+        cost = np.full((self.num_cameras,), np.inf)
+        prev = np.full((self.num_cameras, 2), -1, dtype=int)
+        for duration in range(1, self.max_duration + 1):
+            t1 = t - duration
+            if t1 < self.anchor:
+                break
+            cams1 = np.nonzero(np.isfinite(self.cost[t1]))[0]
+            if cams1.size == 0:
+                continue
+            candidate_cost = self.cost[t1][cams1][:, np.newaxis] + self.edge_cost(t1, cams1, t)
+            best = candidate_cost.argmin(axis=0)
+            total_cost = candidate_cost[best, np.arange(self.num_cameras)]
+            update = total_cost < cost
+            cost[update] = total_cost[update]
+            prev[update, 0] = t1
+            prev[update, 1] = cams1[best[update]]
+        self.cost[t] = cost
+        self.prev[t] = prev
+
+    def best_shots(self, final):
+        """
+        :param final: if True the path must end at the last pushed second
+        :return: shots of the current best path from the anchor time
+        """
+        best_score = np.inf
+        best_node = None
+        for t1 in range(max(self.anchor, self.now + 1 - self.max_duration), self.now + 1):
+            score = self.cost[t1] + self.quality_sum(t1, self.now + 1)
+            if final:
+                score = score + .5 * cost_functions.getDurationCost([t1, 0], [self.now + 1, self.num_cameras],
+                                                                    self.now + 1 - t1)
+            cam = int(score.argmin())
+            if score[cam] < best_score:
+                best_score = score[cam]
+                best_node = [t1, cam]
+
+        shots = []
+        next_time = self.now + 1
+        node = best_node
+        while node[0] >= self.anchor:
+            shots.append([node[0], node[1], next_time - node[0]])
+            next_time = node[0]
+            node = [int(x) for x in self.prev[node[0]][node[1]]]
+        shots.reverse()
+        return shots
+
+    def commit(self, limit, final=False):
+        """
+        :param limit: commit shots of the best path ending at or before this time
+        :param final: if True commit the whole remaining path
+        :return: committed shots
+        """
+        committed = [shot for shot in self.best_shots(final) if shot[0] + shot[2] <= limit]
+        if not committed or final:
+            return committed
+
+        start, cam, duration = committed[-1]
+        anchor = start + duration
+        # the only way into the new anchor time is the last committed shot
+        self.cost[anchor] = self.cost[start][cam] + self.edge_cost(start, np.array([cam]), anchor)[0]
+        self.prev[anchor] = np.tile([start, cam], (self.num_cameras, 1))
+        for t in [x for x in self.cost.keys() if x < anchor]:
+            del self.cost[t]
+            del self.prev[t]
+            for name in FEATURE_NAMES:
+                del self.features[name][t]
+        self.anchor = anchor
+        for t in range(anchor + 1, self.now + 1):
+            self.relax(t)
+        return committed
+
+
+def online_camera_optimization(feature_stream, num_cameras, window, start_time=0, max_duration=MAX_DURATION):
+    """
+    :param feature_stream: iterable of per second features, see iter_second_features
+    :param num_cameras: number of default cameras
+    :param window: lookahead window in seconds before a shot is committed
+    :param start_time: time of the first second
+    :param max_duration: longest shot duration
+    :return: generator of committed shots [start time, camera index, duration], in time order
+    """
+    optimizer = OnlineCameraOptimizer(num_cameras, window, start_time, max_duration)
+    for second in feature_stream:
+        for shot in optimizer.push(second):
+            yield shot
+    for shot in optimizer.finish():
+        yield shot
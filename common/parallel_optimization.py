@@ -0,0 +1,120 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from cost_functions import cost_functions
+from cost_functions import array_cost_functions
+from camera_optimization_support.support import get_transfer_cost_row
+from common.camera_optimization import MAX_DURATION, backward_pass, get_optimized_path, get_start_cost
+
+# features that are not per second, sent whole to every worker
+SHARED_FEATURES = ["leftRightValues"]
+
+
+def get_segments(project_data, cost_matrix, max_duration=MAX_DURATION):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix with sequence cover initialized
+    :param max_duration: longest shot duration
+    :return: list of [segment start, segment end), split at sequence boundaries
+    description:
+    short sequences are merged so that every segment lasts at least max_duration seconds, a segment shorter than the
+    longest shot would cost more to send to a worker than to solve.
+    """
+    segments = []
+    segment_start = project_data.startTime
+    for t in range(project_data.startTime + 1, project_data.endTime + 1):
+        if cost_matrix.sequence_cover[t] == cost_matrix.sequence_cover[t - 1]:
+            continue
+        if t - segment_start >= max_duration and project_data.endTime + 1 - t >= max_duration:
+            segments.append([segment_start, t])
+            segment_start = t
+    segments.append([segment_start, project_data.endTime + 1])
+    return segments
+
+
+def prepare_segment(task):
+    """
+    :param task: segment data, see get_segment_tasks
+    :return: transfer cost of the edges starting inside the segment, shape [segment length, max_duration, num_cameras,
+             num_cameras], same rows as initial_transfer_cost
+    """
+    # feature rows start at the segment start
+    start = task["start"]
+    return np.array([get_transfer_cost_row(task["features"], task["style_features"], t - start, task["max_duration"],
+                                           task["end_time"] - start, task["num_cameras"], task["movement_weight"],
+                                           task["movement_intensity"])
+                     for t in range(start, task["end"])])
+
+
+def get_feature_rows(features, start, end):
+    """
+    :return: per second features of the times [start, end), None if features is None
+    """
+    if features is None:
+        return None
+    return {name: value if name in SHARED_FEATURES else value[start:end] for name, value in features.items()}
+
+
+def get_segment_tasks(project_data, segments, max_duration):
+    """
+    :return: one task per segment, the style weights are passed along since worker processes may not share them
+    description:
+    a task only holds the feature rows its edges read, from the segment start to max_duration seconds after its end,
+    so every worker receives about its share of the features instead of all of them.
+    """
+    features = array_cost_functions.getTransferFeatures(project_data)
+    movement_weight = cost_functions.STYLE_WEIGHTS[2]
+    style_features = array_cost_functions.getStyleFeatures(project_data) if movement_weight else None
+    return [{"start": start,
+             "end": end,
+             "end_time": project_data.endTime,
+             "num_cameras": project_data.numDefaultCameras,
+             "max_duration": max_duration,
+             "features": get_feature_rows(features, start, end + max_duration + 1),
+             "style_features": get_feature_rows(style_features, start, end + max_duration + 1),
+             "movement_weight": movement_weight,
+             "movement_intensity": cost_functions.STYLE_INTENSITIES[2]} for start, end in segments]
+
+
+def initial_transfer_cost_parallel(project_data, cost_matrix, max_duration=MAX_DURATION, max_workers=None):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix with sequence cover initialized
+    :param max_duration: longest shot duration
+    :param max_workers: number of worker processes, number of cpus if None
+    description:
+    initial_transfer_cost with the timeline split at sequence boundaries, the edges of every segment are computed in
+    their own process. Each edge only depends on its two end times, so the rows are the same as initial_transfer_cost.
+    """
+    segments = get_segments(project_data, cost_matrix, max_duration)
+    tasks = get_segment_tasks(project_data, segments, max_duration)
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        transfer_cost = np.concatenate(list(pool.map(prepare_segment, tasks)))
+    cost_matrix.init_transfer_cost(transfer_cost)
+    print("transfer cost of {} segments prepared".format(len(segments)))
+
+
+def camera_optimization_parallel(project_data, cost_matrix, max_duration=MAX_DURATION, max_workers=None):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix prepared by camera_pre_optimization, with transfer=False to skip the serial
+                        transfer cost
+    :param max_duration: longest shot duration
+    :param max_workers: number of worker processes, number of cpus if None
+    :return: [total cost, camera sequence], same as camera_optimization_main
+    description:
+    only the transfer cost tensor, most of the solve time, is built in parallel, per segment in a process pool. The
+    DP itself is not split: backward_pass runs once, serially, over the whole timeline. Solving the segments in
+    parallel and stitching them at the boundaries would need the cost to every boundary node [t, cam] within
+    max_duration of the segment end, max_duration * num_cameras times the work of backward_pass.
+    user cameras are not supported, use camera_optimization_main for them
+    """
+    assert not project_data.userCamData, "user cameras are only supported by camera_optimization_main"
+    transfer_cost = cost_matrix.transfer_cost
+    if transfer_cost is None or transfer_cost.shape[1] < max_duration:
+        initial_transfer_cost_parallel(project_data, cost_matrix, max_duration, max_workers)
+
+    DefaultCamCostHash, DefaultCamNextCamHash = backward_pass(project_data, cost_matrix, max_duration)
+    path = get_optimized_path(project_data, DefaultCamCostHash, DefaultCamNextCamHash)
+    total_cost = float(DefaultCamCostHash[0][path[0][1]]) + get_start_cost(project_data)
+    print("camera sequence: {}".format(path))
+    return [total_cost, path]
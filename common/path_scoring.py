@@ -0,0 +1,102 @@
+import numpy as np
+from cost_functions import cost_functions
+from common.camera_optimization import get_start_cost
+
+# per-shot cost terms of score_path
+SCORE_TERMS = ["quality", "talking", "duration", "transfer"]
+
+
+def check_path(project_data, cost_matrix, path):
+    """
+    assert path is a camera sequence of default cameras covering startTime to endTime
+    """
+    assert len(path), "empty camera sequence"
+    assert path[0][0] == project_data.startTime, "camera sequence must start at {}".format(project_data.startTime)
+    assert (path[:-1, 0] + path[:-1, 2] == path[1:, 0]).all(), "shots of the camera sequence are not contiguous"
+    assert path[-1][0] + path[-1][2] == project_data.endTime + 1, \
+        "camera sequence must end at {}".format(project_data.endTime)
+    assert ((path[:, 2] >= 1) & (path[:, 2] <= cost_matrix.transfer_cost.shape[1])).all(), \
+        "shot duration must be between 1 and {}".format(cost_matrix.transfer_cost.shape[1])
+    assert ((path[:, 1] >= 0) & (path[:, 1] < project_data.numDefaultCameras)).all(), \
+        "only default cameras can be scored"
+
+
+def get_shot_costs(project_data, cost_matrix, shots, next_cams):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix prepared by camera_pre_optimization
+    :param shots: shots of shape [n, 3], [start time, camera index, duration]
+    :param next_cams: camera of the next shot, numDefaultCameras for the dummy end node
+    :return: {term: cost of every shot} for every term in SCORE_TERMS
+    description:
+    cost of a shot is its quality cost and the cost of the edge leaving it, the same split as backward_pass
+    """
+    start, cams, durations = shots[:, 0], shots[:, 1], shots[:, 2]
+    end = start + durations
+    i = start - project_data.startTime
+    num_cameras = project_data.numDefaultCameras
+
+    quality_cost = cost_matrix.quality_cost_cumsum[end, cams] - cost_matrix.quality_cost_cumsum[start, cams]
+    talking_cost = np.zeros((len(cost_matrix.talking_cost) + 1, num_cameras), dtype=float)
+    np.cumsum(cost_matrix.talking_cost_weight * np.asarray(cost_matrix.talking_cost, dtype=float), axis=0,
+              out=talking_cost[1:])
+    talking_cost = talking_cost[end, cams] - talking_cost[start, cams]
+
+    max_duration = cost_matrix.transfer_cost.shape[1]
+    same_cost = cost_functions.getDurationCost([0, 0], [0, 0], 1)
+    change_cost = np.array([0] + [cost_functions.getDurationCost([0, 0], [0, 1], duration)
+                                  for duration in range(1, max_duration + 1)], dtype=float)
+    duration_cost = .5 * np.where(cams == next_cams, same_cost, change_cost[durations])
+
+    # edges to the dummy end node have 0 transfer cost
+    to_end = next_cams == num_cameras
+    transfer_cost = np.zeros(shots.shape[0], dtype=float)
+    transfer_cost[~to_end] = .5 * cost_matrix.transfer_cost[i[~to_end], durations[~to_end] - 1, cams[~to_end],
+                                                            next_cams[~to_end]]
+
+    return {"quality": quality_cost - talking_cost,
+            "talking": talking_cost,
+            "duration": duration_cost,
+            "transfer": transfer_cost}
+
+
+def score_path(project_data, cost_matrix, path):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix prepared by camera_pre_optimization
+    :param path: camera sequence, list of [start time, camera index, duration]
+    :return: {"total": total cost, "start": cost of the dummy start edge, and for every term in SCORE_TERMS the cost of
+             every shot}
+    description:
+    scores a given camera sequence without solving, with the same cost as the solvers. quality is the node cost
+    without the talking part, duration and transfer are the edge leaving each shot.
+    """
+    path = np.asarray(path, dtype=int).reshape((-1, 3))
+    check_path(project_data, cost_matrix, path)
+    next_cams = np.append(path[1:, 1], project_data.numDefaultCameras)
+    score = get_shot_costs(project_data, cost_matrix, path, next_cams)
+    score["start"] = get_start_cost(project_data)
+    score["total"] = score["start"] + float(sum(score[term].sum() for term in SCORE_TERMS))
+    return score
+
+
+def score_paths(project_data, cost_matrix, paths):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix prepared by camera_pre_optimization
+    :param paths: list of camera sequences
+    :return: total cost of every camera sequence, shape [len(paths)]
+    description:
+    all shots of all paths are scored in one batch
+    """
+    paths = [np.asarray(path, dtype=int).reshape((-1, 3)) for path in paths]
+    for path in paths:
+        check_path(project_data, cost_matrix, path)
+    shots = np.concatenate(paths)
+    next_cams = np.concatenate([np.append(path[1:, 1], project_data.numDefaultCameras) for path in paths])
+    path_index = np.repeat(np.arange(len(paths)), [path.shape[0] for path in paths])
+    shot_costs = get_shot_costs(project_data, cost_matrix, shots, next_cams)
+    total_cost = np.full((len(paths),), get_start_cost(project_data))
+    for term in SCORE_TERMS:
+        total_cost += np.bincount(path_index, weights=shot_costs[term], minlength=len(paths))
+    return total_cost
@@ -0,0 +1,136 @@
+# on disk project format: one .npy per array field and a JSON manifest for everything else
+import os
+import json
+import pickle
+import numpy as np
+from prepare.structure import Project
+
+PROJECT_CACHE_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+# per frame data saved as .npy, missing values ("NA") are NaN, str arrays keep "NA"
+ARRAY_FIELDS = {"charVisibility": np.int32,
+                "eyePos": np.float32,
+                "headRoom": np.float32,
+                "leftRightOrder": str,
+                "objVisibility": np.int32,
+                "defaultVelocity": np.float32,
+                "defaultDist": np.float32}
+# dicts with int keys, JSON turns the keys into strings
+INT_KEY_FIELDS = ["defaultCameras", "userCamData", "char2camera_id"]
+# derived fields, rebuilt when needed, and the DB loader of lazy fields
+SKIPPED_FIELDS = ["script_index", "db_loader"]
+
+
+def to_array(value, dtype):
+    """
+    :param value: nested list or ndarray, "NA" for missing values
+    :param dtype: array dtype
+    :return: ndarray of dtype, NaN for "NA" unless dtype is str
+    """
+    if isinstance(value, np.ndarray):
+        return value.astype(dtype, copy=False)
+    if dtype is str:
+        # fixed width strings, unlike object arrays they can be memory mapped
+        return np.array(value, dtype=str)
+    array = np.array(value, dtype=object)
+    array[array == "NA"] = np.nan
+    return array.astype(dtype)
+
+
+def to_json(value):
+    # numpy values in the JSON fields
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError("{} is not JSON serializable".format(type(value).__name__))
+
+
+def save_project(path, project_data):
+    """
+    :param path: cache folder, created if missing
+    :param project_data: project data
+    description:
+    array fields of ARRAY_FIELDS and any other ndarray attribute are saved as <path>/<field>.npy, every other
+    attribute goes into the JSON manifest together with PROJECT_CACHE_VERSION
+    """
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    # lazy fields not used yet are loaded, the cache holds every field
+    project_data.prefetch()
+    manifest = {"version": PROJECT_CACHE_VERSION, "arrays": {}, "fields": {}}
+    for field, value in vars(project_data).items():
+        if field in SKIPPED_FIELDS:
+            continue
+        if value is not None and (field in ARRAY_FIELDS or isinstance(value, np.ndarray)):
+            array = to_array(value, ARRAY_FIELDS[field]) if field in ARRAY_FIELDS else value
+            fn = field + ".npy"
+            np.save(os.path.join(path, fn), array)
+            manifest["arrays"][field] = fn
+        else:
+            manifest["fields"][field] = value
+    with open(os.path.join(path, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, default=to_json)
+
+
+def load_project(path, mmap=True):
+    """
+    :param path: cache folder from save_project
+    :param mmap: memory map the ARRAY_FIELDS arrays read only instead of reading them, processes loading the same
+                 cache then share the page cache
+    :return: project data
+    """
+    with open(os.path.join(path, MANIFEST_NAME), "r") as f:
+        manifest = json.load(f)
+    assert manifest["version"] == PROJECT_CACHE_VERSION, \
+        "project cache {} has version {}, expected {}".format(path, manifest["version"], PROJECT_CACHE_VERSION)
+
+    state = {}
+    for field, value in manifest["fields"].items():
+        if field in INT_KEY_FIELDS and value is not None:
+            value = {int(k): v for k, v in value.items()}
+        state[field] = value
+    for field, fn in manifest["arrays"].items():
+        mmap_mode = "r" if mmap and field in ARRAY_FIELDS else None
+        state[field] = np.load(os.path.join(path, fn), mmap_mode=mmap_mode)
+    # the cache holds every field, Project.__init__ would download them again
+    return Project.from_state(state)
+
+
+def is_project_cache(path):
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def load_pickled_project(path):
+    """
+    :param path: pickled Project file, the format of results written before the project cache
+    :return: project data
+    """
+    with open(path, "rb") as f:
+        project_data = pickle.load(f)
+    # fields added since, the per frame fields were all loaded when it was pickled
+    if "script_index" not in vars(project_data):
+        project_data.script_index = None
+    return project_data
+
+
+def load_or_convert_project(path, mmap=True):
+    """
+    :param path: project cache folder, or pickled Project file of an older run
+    :param mmap: see load_project
+    :return: project data
+    description:
+    a pickled project is converted once: the pickle is moved to <path>.pkl and the cache is saved at path, later
+    runs load the cache. A conversion stopped before the cache was saved starts again from <path>.pkl.
+    """
+    if is_project_cache(path):
+        return load_project(path, mmap)
+    legacy_path = path if os.path.isfile(path) else path + ".pkl"
+    assert os.path.isfile(legacy_path), "no project cache or pickled project at {}".format(path)
+    print("{} is a pickled project of an older run, converting it to a project cache".format(legacy_path))
+    project_data = load_pickled_project(legacy_path)
+    if legacy_path == path:
+        os.rename(path, path + ".pkl")
+    save_project(path, project_data)
+    print("project cache saved at {}, the pickled project is kept at {}.pkl".format(path, path))
+    return load_project(path, mmap)
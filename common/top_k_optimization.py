@@ -0,0 +1,156 @@
+import numpy as np
+from cost_functions import cost_functions
+from common.camera_optimization import MAX_DURATION, check_transfer_cost, get_duration_cost_block, get_start_cost
+
+
+# polynomial hash of a per second camera sequence, two moduli so that distinct sequences practically never collide
+SEQUENCE_HASH_BASE = 1000003
+SEQUENCE_HASH_MODULI = np.array([2147483647, 2147483629], dtype=np.int64)
+
+
+def get_sequence_hash_tables(max_duration):
+    """
+    :return: powers BASE ** duration and sums 1 + BASE + ... + BASE ** (duration - 1) modulo SEQUENCE_HASH_MODULI, for
+             every duration up to max_duration, both of shape [max_duration + 1, 2]
+    """
+    powers = np.ones((max_duration + 1, 2), dtype=np.int64)
+    sums = np.zeros((max_duration + 1, 2), dtype=np.int64)
+    for duration in range(1, max_duration + 1):
+        sums[duration] = (sums[duration - 1] + powers[duration - 1]) % SEQUENCE_HASH_MODULI
+        powers[duration] = powers[duration - 1] * SEQUENCE_HASH_BASE % SEQUENCE_HASH_MODULI
+    return powers, sums
+
+
+def get_distinct_best(costs, keys, k):
+    """
+    :param costs: candidate costs of one node
+    :param keys: sequence hash key of every candidate
+    :param k: number of candidates kept
+    :return: index of the k cheapest candidates with distinct keys, a key keeps its cheapest candidate, ties keep the
+             candidate order
+    """
+    order = np.argsort(costs, kind="stable")
+    order = order[np.isfinite(costs[order])]
+    window = 2 * k
+    while True:
+        # only the first candidates are searched for distinct keys, most of them are already distinct
+        _, first = np.unique(keys[order[:window]], return_index=True)
+        if first.shape[0] >= k or window >= order.shape[0]:
+            return order[np.sort(first)[:k]]
+        window *= 2
+
+
+def top_k_backward_pass(project_data, cost_matrix, k, max_duration=MAX_DURATION):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix prepared by camera_pre_optimization
+    :param k: number of camera sequences kept for every node
+    :param max_duration: longest shot duration
+    :return: cost-to-go table of shape [optimizeDuration, numDefaultCameras, k] and next node table of shape
+             [optimizeDuration, numDefaultCameras, k, 3]
+    description:
+    K-best version of backward_pass. DefaultCamCostHash and DefaultCamNextCamHash get one more axis: entry r of node
+    [t, cam] is the r-th cheapest way from this node to the end, its next node entry is [next time, next camera, r']
+    where r' is the rank used at the next node. Only k entries are kept per node, so memory stays O(T * C * k).
+    Unused entries have infinite cost.
+    Splitting a run of one camera into several shots gives the same cut, so the entries of a node are distinct per
+    second camera sequences: candidates are compared by a hash of their sequence and each keeps its cheapest split.
+    """
+    num_cameras = project_data.numDefaultCameras
+    optimize_duration = project_data.endTime - project_data.startTime + 1
+    quality_cumsum = cost_matrix.quality_cost_cumsum
+    check_transfer_cost(project_data, cost_matrix, max_duration)
+    cameras = np.arange(num_cameras, dtype=np.int64)
+    hash_powers, hash_sums = get_sequence_hash_tables(max_duration)
+
+    # last row is the dummy end node, it only has one way to the end, its empty sequence has hash 0
+    cost_to_go = np.full((optimize_duration + 1, num_cameras, k), np.inf)
+    cost_to_go[optimize_duration, :, 0] = 0
+    next_node = np.full((optimize_duration, num_cameras, k, 3), -1, dtype=int)
+    sequence_hash = np.zeros((optimize_duration + 1, num_cameras, k, 2), dtype=np.int64)
+
+    for i in range(optimize_duration - 1, -1, -1):
+        t = project_data.startTime + i
+        candidate_costs = []
+        candidate_nodes = []
+        candidate_hashes = []
+        for duration in range(1, max_duration + 1):
+            if t + duration > project_data.endTime + 1:
+                break
+            quality_cost = quality_cumsum[i + duration] - quality_cumsum[i]
+            # camera of the shot for duration seconds, then the sequence of the next node
+            shot_hash = cameras[:, np.newaxis] * hash_sums[duration]
+            if t + duration == project_data.endTime + 1:
+                # dummy end node, 0 node cost and 0 transfer cost
+                end_cost = cost_functions.getDurationCost([t, 0], [t + duration, num_cameras], duration)
+                candidate_costs.append((.5 * end_cost + quality_cost)[:, np.newaxis])
+                candidate_nodes.append([t + duration, num_cameras, 0])
+                candidate_hashes.append(shot_hash[:, np.newaxis] % SEQUENCE_HASH_MODULI)
+            else:
+                transfer_cost = cost_matrix.transfer_cost[i][duration - 1]
+                duration_cost = get_duration_cost_block(duration, num_cameras)
+                candidate_cost = cost_to_go[i + duration][np.newaxis, :, :] \
+                                 + .5 * transfer_cost[:, :, np.newaxis] \
+                                 + .5 * duration_cost[:, :, np.newaxis] \
+                                 + quality_cost[:, np.newaxis, np.newaxis]
+                candidate_costs.append(candidate_cost.reshape((num_cameras, -1)))
+                candidate_nodes.extend([[t + duration, cam, rank] for cam in range(num_cameras) for rank in range(k)])
+                candidate_hash = (shot_hash[:, np.newaxis, np.newaxis]
+                                  + hash_powers[duration] * sequence_hash[i + duration][np.newaxis]) \
+                                 % SEQUENCE_HASH_MODULI
+                candidate_hashes.append(candidate_hash.reshape((num_cameras, -1, 2)))
+
+        # keep the k cheapest distinct candidates of every camera, ties keep the order of helper
+        candidate_costs = np.concatenate(candidate_costs, axis=1)
+        candidate_nodes = np.array(candidate_nodes, dtype=int)
+        candidate_hashes = np.concatenate(candidate_hashes, axis=1)
+        candidate_keys = candidate_hashes[..., 0] * SEQUENCE_HASH_MODULI[1] + candidate_hashes[..., 1]
+        for cam in range(num_cameras):
+            best = get_distinct_best(candidate_costs[cam], candidate_keys[cam], k)
+            cost_to_go[i, cam, :best.shape[0]] = candidate_costs[cam][best]
+            next_node[i, cam, :best.shape[0]] = candidate_nodes[best]
+            sequence_hash[i, cam, :best.shape[0]] = candidate_hashes[cam][best]
+
+    return cost_to_go[:optimize_duration], next_node
+
+
+def get_top_k_paths(project_data, DefaultCamCostHash, DefaultCamNextCamHash, k):
+    """
+    :param project_data: project data
+    :param DefaultCamCostHash: cost-to-go table from top_k_backward_pass
+    :param DefaultCamNextCamHash: next node table from top_k_backward_pass
+    :param k: number of camera sequences
+    :return: list of [total cost, camera sequence], cheapest first
+    paths of different start cameras differ at startTime and the entries of a node are distinct, so are the paths
+    """
+    start_cost = DefaultCamCostHash[0] + get_start_cost(project_data)
+    order = np.argsort(start_cost, axis=None, kind="stable")[:k]
+
+    paths = []
+    for cam, rank in zip(*np.unravel_index(order, start_cost.shape)):
+        total_cost = float(start_cost[cam][rank])
+        if np.isinf(total_cost):
+            break
+        path = []
+        node = [project_data.startTime, int(cam), int(rank)]
+        while node[0] < project_data.endTime + 1:
+            next_node = [int(x) for x in DefaultCamNextCamHash[node[0] - project_data.startTime][node[1]][node[2]]]
+            path.append([node[0], node[1], next_node[0] - node[0]])
+            node = next_node
+        paths.append([total_cost, path])
+    return paths
+
+
+def camera_optimization_top_k(project_data, cost_matrix, k, max_duration=MAX_DURATION):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix prepared by camera_pre_optimization
+    :param k: number of camera sequences
+    :param max_duration: longest shot duration
+    :return: the k cheapest distinct camera sequences, list of [total cost, camera sequence], cheapest first
+    """
+    DefaultCamCostHash, DefaultCamNextCamHash = top_k_backward_pass(project_data, cost_matrix, k, max_duration)
+    paths = get_top_k_paths(project_data, DefaultCamCostHash, DefaultCamNextCamHash, k)
+    for i, (total_cost, path) in enumerate(paths):
+        print("camera sequence {} cost {}: {}".format(i, total_cost, path))
+    return paths
@@ -0,0 +1,167 @@
+import numpy as np
+from cost_functions import cost_functions
+from cost_functions import array_cost_functions
+from common.camera_optimization import MAX_DURATION, get_duration_cost_block, get_start_cost
+
+# names of the quality cost terms, in the order of get_cost_terms()["quality"]
+QUALITY_TERMS = ["visibility", "hitchcock", "lookroom", "headroom", "pov", "shot_order", "action", "talking"]
+# names of the transfer cost terms, in the order of get_cost_terms()["transfer"]
+TRANSFER_TERMS = ["position", "left_right"]
+
+
+def get_cost_terms(project_data, cost_matrix, max_duration=MAX_DURATION):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix prepared by camera_pre_optimization, for the action and talking cost
+    :param max_duration: longest shot duration
+    :return: {"quality": unweighted node cost terms, shape [len(QUALITY_TERMS), totalTime, numDefaultCameras],
+              "transfer": unweighted edge cost terms, shape [len(TRANSFER_TERMS), optimizeDuration, max_duration,
+              numDefaultCameras, numDefaultCameras]}
+    description:
+    every cost term is computed once, so any weight setting can be solved without running the cost functions again
+    """
+    assert not project_data.userCamData, "weight sweep does not support user cameras"
+    assert not any(cost_functions.STYLE_WEIGHTS), "weight sweep does not support conflict, emotion and movement cost"
+    num_cameras = project_data.numDefaultCameras
+    quality = np.zeros((len(QUALITY_TERMS), project_data.totalTime, num_cameras), dtype=float)
+    quality[:len(cost_functions.QUALITY_WEIGHTS)] = array_cost_functions.getQualityCostTermsGrid(
+        project_data.totalTime, project_data.startTime, project_data.endTime, project_data.defaultCameras,
+        project_data.characters, project_data.protagonist, project_data.script, project_data.charVisibility,
+        project_data.headRoom, project_data.eyePos, project_data.distMap, project_data.objects,
+        project_data.objVisibility, scriptIndex=getattr(project_data, "script_index", None))
+    char_index = [project_data.defaultCameras[cam]['charIndex'] for cam in range(num_cameras)]
+    quality[-2] = np.asarray(cost_matrix.action_cost_map, dtype=float)[char_index].T
+    quality[-1] = cost_matrix.talking_cost
+
+    features = array_cost_functions.getTransferFeatures(project_data)
+    optimize_duration = project_data.endTime - project_data.startTime + 1
+    transfer = np.zeros((len(TRANSFER_TERMS), optimize_duration, max_duration, num_cameras, num_cameras), dtype=float)
+    for i in range(optimize_duration):
+        t = project_data.startTime + i
+        for duration in range(1, max_duration + 1):
+            if t + duration > project_data.endTime:
+                break
+            transfer[:, i, duration - 1] = array_cost_functions.getTransferCostBlock(features, t, t + duration,
+                                                                                     returnTerms=True)
+    return {"quality": quality, "transfer": transfer}
+
+
+def get_weight_vectors(cost_matrix, settings):
+    """
+    :param cost_matrix: cost matrix, its weights are used for missing CostMatrix weights
+    :param settings: list of dict with any of "quality_weights", "transfer_weights", "visual_cost_weight",
+                     "action_cost_weight", "talking_cost_weight", missing ones keep the current value
+    :return: quality weights of shape [len(settings), len(QUALITY_TERMS) + 1] (term weights, then visual cost weight)
+             and transfer weights of shape [len(settings), len(TRANSFER_TERMS)]
+    """
+    quality_weights = []
+    transfer_weights = []
+    for setting in settings:
+        qw = setting.get("quality_weights", cost_functions.QUALITY_WEIGHTS)
+        tw = setting.get("transfer_weights", cost_functions.TRANSFER_WEIGHTS)
+        assert len(qw) == len(cost_functions.QUALITY_WEIGHTS), "quality_weights needs {} values".format(
+            len(cost_functions.QUALITY_WEIGHTS))
+        assert len(tw) == len(cost_functions.TRANSFER_WEIGHTS), "transfer_weights needs {} values".format(
+            len(cost_functions.TRANSFER_WEIGHTS))
+        quality_weights.append(list(qw) + [setting.get("action_cost_weight", cost_matrix.action_cost_weight),
+                                           setting.get("talking_cost_weight", cost_matrix.talking_cost_weight),
+                                           setting.get("visual_cost_weight", cost_matrix.visual_cost_weight)])
+        # only eye position (1) and left right order (3) transfer terms are used
+        transfer_weights.append([tw[1], tw[3]])
+    return np.array(quality_weights, dtype=float), np.array(transfer_weights, dtype=float)
+
+
+def solve_weight_batch(project_data, terms, quality_weights, transfer_weights, max_duration=MAX_DURATION):
+    """
+    :param project_data: project data
+    :param terms: cost terms from get_cost_terms
+    :param quality_weights: quality weights from get_weight_vectors, shape [W, len(QUALITY_TERMS) + 1]
+    :param transfer_weights: transfer weights from get_weight_vectors, shape [W, len(TRANSFER_TERMS)]
+    :param max_duration: longest shot duration
+    :return: list of [total cost, camera sequence], one for each weight setting
+    description:
+    backward_pass vectorized over the weight axis. Costs are summed in the same order as init_quality_cost and
+    getTransferCostFromArrays, so each setting gets the same path as a full pipeline run with that setting.
+    """
+    num_settings = quality_weights.shape[0]
+    num_cameras = project_data.numDefaultCameras
+    optimize_duration = project_data.endTime - project_data.startTime + 1
+    settings = np.arange(num_settings)[:, np.newaxis]
+    num_terms = len(cost_functions.QUALITY_WEIGHTS)
+
+    # weighted node cost summation, same order as getWeightedQualityCostWoObj and init_quality_cost
+    node_cost = terms["quality"][0][np.newaxis] * quality_weights[:, 0, np.newaxis, np.newaxis]
+    for k in range(1, num_terms):
+        node_cost = node_cost + terms["quality"][k][np.newaxis] * quality_weights[:, k, np.newaxis, np.newaxis]
+    quality_cost = quality_weights[:, -1, np.newaxis, np.newaxis] * node_cost \
+                   + quality_weights[:, num_terms, np.newaxis, np.newaxis] * terms["quality"][-2][np.newaxis]
+    quality_cost = quality_cost + quality_weights[:, num_terms + 1, np.newaxis, np.newaxis] * terms["quality"][-1][np.newaxis]
+    quality_cumsum = np.zeros((num_settings, quality_cost.shape[1] + 1, num_cameras), dtype=float)
+    np.cumsum(quality_cost, axis=1, out=quality_cumsum[:, 1:])
+
+    cost_to_go = np.zeros((num_settings, optimize_duration + 1, num_cameras), dtype=float)
+    next_node = np.zeros((num_settings, optimize_duration, num_cameras, 2), dtype=int)
+    for i in range(optimize_duration - 1, -1, -1):
+        t = project_data.startTime + i
+        min_cost = np.full((num_settings, num_cameras), np.inf)
+        for duration in range(1, max_duration + 1):
+            if t + duration > project_data.endTime + 1:
+                break
+            quality_sum = quality_cumsum[:, i + duration] - quality_cumsum[:, i]
+            if t + duration == project_data.endTime + 1:
+                # dummy end node, 0 node cost and 0 transfer cost
+                end_cost = cost_functions.getDurationCost([t, 0], [t + duration, num_cameras], duration)
+                total_cost = .5 * end_cost + quality_sum
+                next_cam = np.full((num_settings, num_cameras), num_cameras)
+            else:
+                transfer_cost = terms["transfer"][0][i][duration - 1][np.newaxis] \
+                                * transfer_weights[:, 0, np.newaxis, np.newaxis] \
+                                + terms["transfer"][1][i][duration - 1][np.newaxis] \
+                                * transfer_weights[:, 1, np.newaxis, np.newaxis]
+                duration_cost = get_duration_cost_block(duration, num_cameras)
+                candidate_cost = cost_to_go[:, i + duration][:, np.newaxis, :] + .5 * transfer_cost \
+                                 + .5 * duration_cost + quality_sum[:, :, np.newaxis]
+                next_cam = candidate_cost.argmin(axis=2)
+                total_cost = np.take_along_axis(candidate_cost, next_cam[:, :, np.newaxis], axis=2)[:, :, 0]
+
+            update = total_cost < min_cost
+            min_cost[update] = total_cost[update]
+            next_node[:, i][update, 0] = t + duration
+            next_node[:, i][update, 1] = next_cam[update]
+        cost_to_go[:, i] = min_cost
+
+    results = []
+    start_cost = get_start_cost(project_data)
+    for w in range(num_settings):
+        path = []
+        node = [project_data.startTime, int(np.argmin(cost_to_go[w, 0]))]
+        total_cost = float(cost_to_go[w, 0, node[1]]) + start_cost
+        while node[0] < project_data.endTime + 1:
+            nextNode = [int(x) for x in next_node[w, node[0] - project_data.startTime, node[1]]]
+            path.append([node[0], node[1], nextNode[0] - node[0]])
+            node = nextNode
+        results.append([total_cost, path])
+    return results
+
+
+def weight_sweep(project_data, cost_matrix, settings, max_duration=MAX_DURATION, batch_size=32, terms=None):
+    """
+    :param project_data: project data
+    :param cost_matrix: cost matrix prepared by camera_pre_optimization
+    :param settings: list of weight settings, see get_weight_vectors
+    :param max_duration: longest shot duration
+    :param batch_size: number of settings solved at once, bounds the memory of the batched tables
+    :param terms: cost terms from a previous get_cost_terms call, computed if None
+    :return: list of {"setting", "cost", "path"}, in the order of settings
+    """
+    if terms is None:
+        terms = get_cost_terms(project_data, cost_matrix, max_duration)
+    quality_weights, transfer_weights = get_weight_vectors(cost_matrix, settings)
+    results = []
+    for b in range(0, len(settings), batch_size):
+        batch = solve_weight_batch(project_data, terms, quality_weights[b:b + batch_size],
+                                   transfer_weights[b:b + batch_size], max_duration)
+        for setting, (cost, path) in zip(settings[b:b + batch_size], batch):
+            results.append({"setting": setting, "cost": cost, "path": path})
+            print("weights {}: cost {:.4f}".format(setting, cost))
+    return results
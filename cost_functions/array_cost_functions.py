@@ -0,0 +1,438 @@
+"""array versions of cost functions for camera optimization
+   cost terms are evaluated for many nodes/edges at once on NumPy arrays instead of one node per call
+"""
+import numpy as np
+from utils import utils
+from cost_functions import cost_functions
+from cost_functions import cost_curve
+from utils.script_index import ScriptIndex
+from prepare import action_preprocess
+
+# head room values are integer pixels, their cost is looked up
+HEAD_ROOM_COST = cost_curve.CurveLookup(cost_curve.headRoomCostCurve, cost_functions.FRAMEY)
+
+
+def getEyePosArray(eyePosData):
+    """
+    :param eyePosData: eye position data, 4D list of shape [time, cam, char, 2], ["NA", "NA"] if no eye present
+    :return: float array of shape [time, cam, char, 2], NaN if no eye present
+    """
+    if isinstance(eyePosData, np.ndarray):
+        return eyePosData.astype(float)
+    return np.array([[[[np.nan, np.nan] if pos == ["NA", "NA"] else pos for pos in cam] for cam in t]
+                     for t in eyePosData], dtype=float)
+
+
+def getLeftRightArray(leftRightData):
+    """
+    :param leftRightData: left right order data, 3D list of shape [time, cam, char]
+    :return: int array of shape [time, cam, char] where equal entries of leftRightData get equal codes, and the sorted
+             distinct values the codes index into
+    """
+    values = np.array(leftRightData, dtype=str)
+    vocabulary, codes = np.unique(values, return_inverse=True)
+    return codes.reshape(values.shape), vocabulary
+
+
+def getLeftRightCodes(leftRight, vocabulary):
+    """
+    :param leftRight: characters on screen order of one node
+    :param vocabulary: distinct values from getLeftRightArray
+    :return: int array of codes, -1 for values never seen in the default camera data
+    """
+    values = np.array(leftRight, dtype=str).reshape(-1)
+    index = np.clip(np.searchsorted(vocabulary, values), 0, max(len(vocabulary) - 1, 0))
+    if len(vocabulary) == 0:
+        return np.full(values.shape, -1)
+    return np.where(vocabulary[index] == values, index, -1)
+
+
+def getCharacterCountArray(script, totalTime, characterIndex, objIndex=None):
+    """
+    :param script: action sequence
+    :param totalTime: animation total time
+    :param characterIndex: character index from character list
+    :param objIndex: item index from item list
+    :return: subject count and object count arrays of shape [time, char], how many actions happening at time t have
+             the character as subject/object
+    """
+    subCount = np.zeros((totalTime, len(characterIndex)), dtype=int)
+    objCount = np.zeros((totalTime, len(characterIndex)), dtype=int)
+    for t in range(totalTime):
+        index = utils.getActionIndex(t, script)
+        for subs in utils.getSubjects(t, index, script, characterIndex, objIndex):
+            for sub in subs:
+                if sub in characterIndex:
+                    subCount[t][characterIndex[sub]] += 1
+        for objs in utils.getObjects(t, index, script, characterIndex, objIndex):
+            for obj in objs:
+                if obj in characterIndex:
+                    objCount[t][characterIndex[obj]] += 1
+    return subCount, objCount
+
+
+def getProjectCharacterCounts(project_data):
+    # subject and object counts of getCharacterCountArray, from the script index if it is built
+    scriptIndex = getattr(project_data, "script_index", None)
+    if scriptIndex is None:
+        return getCharacterCountArray(project_data.script, project_data.totalTime, project_data.characters,
+                                      project_data.objects)
+    return scriptIndex.subCount, scriptIndex.objCount
+
+
+def getTransferFeatures(project_data):
+    """
+    :param project_data: project data
+    :return: per second features used by edge cost
+    """
+    subCount, objCount = getProjectCharacterCounts(project_data)
+    leftRight, leftRightValues = getLeftRightArray(project_data.leftRightOrder)
+    return {"eyePos": getEyePosArray(project_data.eyePos),
+            "leftRight": leftRight,
+            "leftRightValues": leftRightValues,
+            "subCount": subCount,
+            "objCount": objCount}
+
+
+def getUserCamFeatures(userCamData, features):
+    """
+    :param userCamData: user added camera data {startTime: <user cam data>}
+    :param features: per second features from getTransferFeatures
+    :return: {startTime: first and last node features of the user camera}, each with a camera axis of length 1
+    """
+    userFeatures = {}
+    for t, userCam in userCamData.items():
+        userFeatures[t] = {}
+        for startEnd in ["start", "end"]:
+            eyePos = [[np.nan, np.nan] if "NA" in pos else pos for pos in userCam[startEnd + "_eyePosition"]]
+            userFeatures[t][startEnd + "EyePos"] = np.array(eyePos, dtype=float).reshape((1, -1, 2))
+            userFeatures[t][startEnd + "LeftRight"] = \
+                getLeftRightCodes(userCam[startEnd + "_leftToRight"], features["leftRightValues"]).reshape((1, -1))
+    return userFeatures
+
+
+def getTransferWeights(features, t1, t2):
+    """
+    :return: number of eye position continuity terms of every character for an edge from t1 to t2: a character
+             shared by the actions of both times contributes one term per action it takes part in at t1
+    """
+    return features["subCount"][t1] * (features["subCount"][t2] > 0) + \
+           features["objCount"][t1] * (features["objCount"][t2] > 0)
+
+
+def getTransferCostFromArrays(eye1, eye2, leftRight1, leftRight2, weights, countMissing=True, returnTerms=False):
+    """
+    :param eye1: eye positions of first nodes, shape [n1, char, 2], NaN if no eye present
+    :param eye2: eye positions of second nodes, shape [n2, char, 2]
+    :param leftRight1: left right order codes of first nodes, shape [n1, char]
+    :param leftRight2: left right order codes of second nodes, shape [n2, char]
+    :param weights: eye position continuity terms of every character, from getTransferWeights
+    :param countMissing: whether characters without eye position on either side still count in the average,
+                         True for getWeightedTransferCostWoUserCam, False for getWeightedTransferCostWithUserCams
+    :param returnTerms: return the unweighted eye position and left right order costs instead
+    :return: transfer cost of every (first node, second node) pair, shape [n1, n2]
+    """
+    # eye position change cost
+    shared = np.nonzero(weights)[0]
+    posCost = np.zeros((eye1.shape[0], eye2.shape[0]), dtype=float)
+    if shared.size:
+        scale = np.array([cost_functions.FRAMEX, cost_functions.FRAMEY], dtype=float)
+        pos1 = eye1[:, shared] / scale
+        pos2 = eye2[:, shared] / scale
+        diff = pos1[:, np.newaxis] - pos2[np.newaxis, :]
+        l = np.sqrt(diff[..., 0] ** 2 + diff[..., 1] ** 2) / np.sqrt(2)
+        cost = cost_curve.reverseSigmoid(l, .5, 20)
+        cost[(diff == 0).all(axis=-1)] = 0
+        # "NA" eye position on either side
+        missing = np.isnan(l)
+        cost[missing] = 0
+        if countMissing:
+            posCost = (cost * weights[shared]).sum(axis=-1) / weights[shared].sum()
+        else:
+            posCount = (~missing * weights[shared]).sum(axis=-1)
+            posCost = np.divide((cost * weights[shared]).sum(axis=-1), posCount,
+                                out=np.zeros(posCount.shape, dtype=float), where=posCount != 0)
+
+    # left right order cost
+    if leftRight1.shape[-1] and leftRight1.shape[-1] == leftRight2.shape[-1]:
+        leftRightCost = (leftRight1[:, np.newaxis] != leftRight2[np.newaxis, :]).mean(axis=-1)
+    else:
+        leftRightCost = 0
+
+    if returnTerms:
+        return posCost, leftRightCost + np.zeros(posCost.shape, dtype=float)
+
+    # weighted edge cost summation
+    transferCost = posCost * cost_functions.TRANSFER_WEIGHTS[1] + \
+                   leftRightCost * cost_functions.TRANSFER_WEIGHTS[3]
+    return transferCost
+
+
+def getTransferCostBlock(features, t1, t2, cams1=None, returnTerms=False):
+    """
+    :param features: per second features from getTransferFeatures
+    :param t1: first node time
+    :param t2: second node time
+    :param cams1: cameras of first node, all default cameras if None
+    :param returnTerms: return the unweighted eye position and left right order costs instead
+    :return: transfer cost from every camera in cams1 at t1 to every camera at t2, shape [len(cams1), numCameras]
+    description:
+    array version of getWeightedTransferCostWoUserCam
+    """
+    eye1 = features["eyePos"][t1]
+    leftRight1 = features["leftRight"][t1]
+    if cams1 is not None:
+        eye1 = eye1[cams1]
+        leftRight1 = leftRight1[cams1]
+    return getTransferCostFromArrays(eye1, features["eyePos"][t2], leftRight1, features["leftRight"][t2],
+                                     getTransferWeights(features, t1, t2), returnTerms=returnTerms)
+
+
+def getTransferCostToUserCam(features, userFeatures, t1, t2):
+    """
+    :param features: per second features from getTransferFeatures
+    :param userFeatures: user camera features from getUserCamFeatures
+    :param t1: start time of the default camera shot
+    :param t2: start time of the user camera
+    :return: transfer cost from every default camera at t1 to the user camera at t2, shape [numCameras]
+    description:
+    array version of getWeightedTransferCostWithUserCams for default -> user edges, the default camera side uses its
+    last second t2 - 1
+    """
+    return getTransferCostFromArrays(features["eyePos"][t2 - 1], userFeatures[t2]["startEyePos"],
+                                     features["leftRight"][t2 - 1], userFeatures[t2]["startLeftRight"],
+                                     getTransferWeights(features, t1, t2), countMissing=False)[:, 0]
+
+
+def getTransferCostFromUserCam(features, userFeatures, t1, t2):
+    """
+    :param features: per second features from getTransferFeatures
+    :param userFeatures: user camera features from getUserCamFeatures
+    :param t1: start time of the user camera
+    :param t2: end time of the user camera, start time of the next default camera
+    :return: transfer cost from the user camera at t1 to every default camera at t2, shape [numCameras]
+    description:
+    array version of getWeightedTransferCostWithUserCams for user -> default edges
+    """
+    return getTransferCostFromArrays(userFeatures[t1]["endEyePos"], features["eyePos"][t2],
+                                     userFeatures[t1]["endLeftRight"], features["leftRight"][t2],
+                                     getTransferWeights(features, t1, t2), countMissing=False)[0]
+
+
+def getStyleFeatures(project_data):
+    """
+    :param project_data: project data
+    :return: {"motion": on screen motion, "closeness": camera closeness, both of shape [time, cam, char],
+              "involved": characters taking part in the actions, shape [time, char]}
+    """
+    subCount, objCount = getProjectCharacterCounts(project_data)
+    return {"motion": cost_curve.motionCurve(np.asarray(project_data.defaultVelocity, dtype=float)),
+            "closeness": cost_curve.closenessCurve(np.asarray(project_data.defaultDist, dtype=float)),
+            "involved": (subCount + objCount) > 0}
+
+
+def getStyleCostGrid(features, conflictIntensity, emotionIntensity):
+    """
+    :param features: per second features from getStyleFeatures
+    :return: unweighted character conflict and character emotion node costs, shape [2, time, numCameras]
+    description:
+    array version of getCharacterConflictsCost and getCharacterEmotionCost for all nodes at once
+    """
+    involved = features["involved"][:, np.newaxis, :]
+    numInvolved = involved.sum(axis=2)
+    motion = safeDivide((features["motion"] * involved).sum(axis=2), numInvolved)
+    closeness = safeDivide((features["closeness"] * involved).sum(axis=2), numInvolved)
+    return np.array([np.where(numInvolved > 0, conflictIntensity * (1 - motion), 0),
+                     np.where(numInvolved > 0, emotionIntensity * (1 - closeness), 0)])
+
+
+def getCameraMovementCostBlock(features, t1, t2, handheldIntensity):
+    """
+    :param features: per second features from getStyleFeatures
+    :return: unweighted camera movement cost from every camera at t1 to every camera at t2,
+             shape [numCameras, numCameras]
+    description:
+    array version of getCameraMovementCost
+    """
+    involved = features["involved"][t1] & features["involved"][t2]
+    if not involved.any():
+        numCameras = features["closeness"].shape[1]
+        return np.zeros((numCameras, numCameras), dtype=float)
+    closeness1 = features["closeness"][t1][:, np.newaxis, involved]
+    closeness2 = features["closeness"][t2][np.newaxis, :, involved]
+    return (1 - handheldIntensity) * np.abs(closeness1 - closeness2).sum(axis=2) / involved.sum()
+
+
+def getHeadRoomArray(headRoomData):
+    """
+    :param headRoomData: head room data, 3D list of shape [time, cam, char], "NA" if head top is out
+    :return: float array of shape [time, cam, char], NaN if head top is out
+    """
+    if isinstance(headRoomData, np.ndarray):
+        return headRoomData.astype(float)
+    return np.array([[[np.nan if top == "NA" else int(top) for top in cam] for cam in t] for t in headRoomData],
+                    dtype=float)
+
+
+def getVisibilityArray(charVisibility, objVisibility=None):
+    """
+    :param charVisibility: character visibility, 4D list of shape [time, cam, char, 6]
+    :param objVisibility: item visibility, 4D list of shape [time, cam, item, 2]
+    :return: float array of shape [time, cam, char + item, 6], items use the first 2 body parts
+    """
+    vis = np.asarray(charVisibility, dtype=float)
+    if objVisibility is not None and len(objVisibility):
+        objVis = np.asarray(objVisibility, dtype=float)
+        vis = np.concatenate([vis, np.zeros(objVis.shape[:3] + (6,), dtype=float)], axis=2)
+        vis[:, :, -objVis.shape[2]:, :2] = objVis
+    return vis
+
+
+def selectRows(data, rows):
+    # rows of a nested list or array, without converting the other rows
+    if isinstance(data, np.ndarray):
+        return data[rows]
+    return [data[t] for t in rows]
+
+
+def safeDivide(a, b):
+    # a / b, 0 where b is 0
+    return np.divide(a, b, out=np.zeros(np.broadcast(a, b).shape, dtype=float), where=b != 0)
+
+
+def getQualityCostTermsGrid(totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, script, vis,
+                            headRoom, eye, distMap, objIndex=None, objVisibility=None, times=None, scriptIndex=None):
+    """
+    :param times: quality hash rows to compute, all rows of totalTime if None
+    :param scriptIndex: ScriptIndex of the project, built from script if None
+    :return: unweighted node cost terms in the order of QUALITY_WEIGHTS, shape [6, len(times), numCameras]
+    description:
+    array version of cost_functions.getWeightedQualityCost with returnTerms=True for all nodes at once, items are
+    included when objIndex is given. Actions, subjects and objects come from the ScriptIndex, every term is
+    then evaluated on [time, action, member, camera] arrays.
+    """
+    if times is None:
+        times = range(totalTime)
+    times = np.array(list(times), dtype=int)
+    withObj = bool(objIndex)
+    numChars = len(characterIndex)
+    if scriptIndex is None:
+        scriptIndex = ScriptIndex(script, totalTime, characterIndex, protagonist, objIndex)
+    assert bool(scriptIndex.objIndex) == withObj, "script index and quality cost must both use items or not"
+    nodeTimes = startTime + times
+    structure = scriptIndex.getActionStructure(nodeTimes)
+
+    rows = np.arange(len(times))[:, np.newaxis, np.newaxis]
+    action = structure["action"]
+    numActions = action.sum(axis=1)
+
+    # subjects then objects on one member axis, padding is -1
+    members = np.concatenate([structure["subject"], structure["object"]], axis=2)
+    memberMask = members >= 0
+    numSubMembers = structure["subject"].shape[2]
+    numSub = memberMask[:, :, :numSubMembers].sum(axis=2)[..., np.newaxis]
+    numObj = memberMask[:, :, numSubMembers:].sum(axis=2)[..., np.newaxis]
+    # one entry per (time, action, member) of the actions, sums over members are sums over entries of a group
+    entryRow, entryAction, entryMember = np.nonzero(memberMask & action[..., np.newaxis])
+    entryGroup = entryRow * action.shape[1] + entryAction
+    groups, groupStarts = np.unique(entryGroup, return_index=True)
+
+    def sumMembers(values):
+        # [entry, camera] values summed per (time, action), shape [time, action, camera]
+        sums = np.zeros((action.size, numCameras), dtype=float)
+        if groups.shape[0]:
+            sums[groups] = np.add.reduceat(values, groupStarts, axis=0)
+        return sums.reshape(action.shape + (numCameras,))
+
+    # [entry, camera, body part], only the visibility of the entries is converted to float
+    entryMembers = members[entryRow, entryAction, entryMember]
+    if withObj or not isinstance(vis, np.ndarray):
+        visArray = getVisibilityArray(selectRows(vis, nodeTimes),
+                                      selectRows(objVisibility, nodeTimes) if withObj else None)
+        entryVis = visArray[entryRow, :, entryMembers]
+    else:
+        visArray = vis
+        entryVis = vis[nodeTimes[entryRow], :, entryMembers].astype(float)
+    numCameras = visArray.shape[1]
+    # sums over the short body part axis as a product with ones, much faster than sum(axis=2)
+    bodyParts = np.ones((entryVis.shape[2],), dtype=float)
+    # objects are all 0 when the action has none
+    totalVis = sumMembers(entryVis.dot(bodyParts))
+
+    # visibility cost
+    visCosts = 1 - totalVis / cost_functions.FRAMESIZE
+    if not withObj:
+        visCosts = np.where(numSub > 0, visCosts, 0)
+    visCost = (visCosts * action[..., np.newaxis]).sum(axis=1) / numActions[:, np.newaxis]
+
+    # hitchcock cost, the importance share each entry should have on screen, 0 for unused item body parts
+    isSub = entryMember < numSubMembers
+    hasObj = numObj[entryRow, entryAction, 0] > 0
+    body = structure["body"][entryRow, entryAction]
+    item = np.zeros((6,), dtype=float)
+    item[:2] = action_preprocess.ITEM_IMPORTANCE_TABLE[action_preprocess.getItemCategory()]
+    # items use 2 body parts, subjects items use item importance when the action has no objects
+    isItem = (entryMembers >= numChars)[:, np.newaxis]
+    importance = np.where(isItem & (isSub & ~hasObj)[:, np.newaxis], item, body)
+    so = structure["so"][entryRow, entryAction]
+    coef = np.where(isSub, safeDivide(so[:, 0], numSub[entryRow, entryAction, 0]),
+                    safeDivide(so[:, 1], numObj[entryRow, entryAction, 0]))
+    target = coef[:, np.newaxis] * importance * np.where(isItem, np.arange(6) < 2, True)
+    # nodes without visibility cost 1, divide by 1 there
+    total = np.where(totalVis == 0, 1, totalVis)[entryRow, entryAction][..., np.newaxis]
+    # in place, entryVis is the largest array
+    np.divide(entryVis, total, out=entryVis)
+    np.subtract(target[:, np.newaxis], entryVis, out=entryVis)
+    hcCosts = safeDivide(sumMembers(np.abs(entryVis, out=entryVis).dot(bodyParts)), numSub + numObj)
+    hcCosts = np.where(totalVis == 0, 1, hcCosts)
+    hitchCockCost = (hcCosts * action[..., np.newaxis]).sum(axis=1) / numActions[:, np.newaxis]
+
+    # lookroom cost, eye positions of character subjects, the curve is evaluated before picking the subjects
+    eyeArray = getEyePosArray(selectRows(eye, nodeTimes))[..., 0]
+    eyeArray = np.where(np.isnan(eyeArray), 1, cost_curve.lookRoomCostCurve(eyeArray / cost_functions.FRAMEX, 0))
+    subChar = structure["subjectChar"]
+    eyeCost = eyeArray.transpose((0, 2, 1))[rows, np.maximum(subChar, 0)]
+    eyeCost = (eyeCost * (subChar >= 0)[..., np.newaxis]).sum(axis=2)
+    lookRoomCosts = safeDivide(eyeCost, (subChar >= 0).sum(axis=2)[..., np.newaxis])
+    lookRoomCost = (lookRoomCosts * action[..., np.newaxis]).sum(axis=1) / numActions[:, np.newaxis]
+
+    # headroom cost, head room of character subjects and objects
+    headArray = getHeadRoomArray(selectRows(headRoom, nodeTimes))
+    headArray = np.where(np.isnan(headArray), 0, HEAD_ROOM_COST(headArray)).transpose((0, 2, 1))
+    headChar = np.concatenate([subChar, structure["objectChar"]], axis=2)
+    headCost = headArray[rows, np.maximum(headChar, 0)]
+    numHead = (headChar >= 0).sum(axis=2)
+    headRoomCosts = safeDivide((headCost * (headChar >= 0)[..., np.newaxis]).sum(axis=2), numHead[..., np.newaxis])
+    # without items only actions with characters count
+    headActions = action if withObj else action & (numHead > 0)
+    headRoomCost = safeDivide((headRoomCosts * headActions[..., np.newaxis]).sum(axis=1),
+                              headActions.sum(axis=1)[:, np.newaxis])
+
+    # POV cost
+    povCost = np.ones((len(times), numCameras), dtype=float)
+    for r in np.nonzero(structure["pov"])[0]:
+        povCost[r] = [cost_functions.getPOVCost(nodeTimes[r], cam, characterIndex[protagonist], cameraIndex,
+                                                characterIndex) for cam in range(numCameras)]
+
+    # shot order cost, only in the first 10% of time
+    shotOrder = np.array([1 if cameraIndex[cam]["distance"] == "NA" else
+                          cost_functions.getShotOrderCost(distMap[cameraIndex[cam]["distance"]])
+                          for cam in range(numCameras)], dtype=float)
+    shotOrderCost = np.where((nodeTimes < totalTime * .1)[:, np.newaxis], shotOrder, 1)
+
+    return np.array([visCost, hitchCockCost, lookRoomCost, headRoomCost, povCost, shotOrderCost])
+
+
+def getWeightedQualityCostGrid(totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, script, vis,
+                               headRoom, eye, distMap, objIndex=None, objVisibility=None, times=None, scriptIndex=None):
+    """
+    :return: node quality cost of shape [len(times), numCameras], same as the quality hash of
+             prepareQualityHashWoUserCam
+    """
+    terms = getQualityCostTermsGrid(totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, script,
+                                    vis, headRoom, eye, distMap, objIndex, objVisibility, times, scriptIndex)
+    # weighted node cost summation
+    qualityCost = terms[0] * cost_functions.QUALITY_WEIGHTS[0]
+    for k in range(1, len(cost_functions.QUALITY_WEIGHTS)):
+        qualityCost = qualityCost + terms[k] * cost_functions.QUALITY_WEIGHTS[k]
+    return qualityCost
@@ -2,6 +2,17 @@ import math
 import numpy as np
 import matplotlib.pyplot as plt
 
+# every curve accepts a scalar or a NumPy array, arrays are evaluated elementwise and keep their shape.
+# scalars keep the math module results
+
+def exp(x):
+    if np.ndim(x) == 0:
+        return math.exp(x)
+    # overflow gives inf, the sigmoid curves are then 0 or 1
+    with np.errstate(over="ignore"):
+        return np.exp(x)
+
+
 # simplified cost curve for aligned and perpendicular lookroom
 def lookRoomCostCurve(lookroom, theta):
     # thetas will be [-pi, +pi]
@@ -17,48 +28,91 @@ def lookRoomCostCurve(lookroom, theta):
     #     else:
     #         cost = sigmoid(lookroom, .9, 40)
 
-    if lookroom < .5:
-        cost = reverseSigmoid(lookroom, .2, 20)
-    else:
-        cost = sigmoid(lookroom, .8, 20)
+    if np.ndim(lookroom) == 0:
+        if lookroom < .5:
+            cost = reverseSigmoid(lookroom, .2, 20)
+        else:
+            cost = sigmoid(lookroom, .8, 20)
+        return cost
 
-    return cost
+    return np.where(lookroom < .5, reverseSigmoid(lookroom, .2, 20), sigmoid(lookroom, .8, 20))
 
 
 def headRoomCostCurve(headroom):
-    if headroom < .3:
-        return reverseSigmoid(headroom, .1, 40)
-    else:
-        return sigmoid(headroom, .7, 20)
+    if np.ndim(headroom) == 0:
+        if headroom < .3:
+            return reverseSigmoid(headroom, .1, 40)
+        else:
+            return sigmoid(headroom, .7, 20)
+    return np.where(headroom < .3, reverseSigmoid(headroom, .1, 40), sigmoid(headroom, .7, 20))
 
 
 def durationCurve(duration):
-    return round(convex(duration, 3, 9), 2)
+    if np.ndim(duration) == 0:
+        return round(convex(duration, 3, 9), 2)
+    return np.round(convex(duration, 3, 9), 2)
 
 def positionChangeCurve(pos1, pos2):
-    if pos1 == pos2:
-        return 0
-    l = math.sqrt((pos1[0] - pos2[0]) ** 2 + (pos1[1] - pos2[1]) ** 2) / math.sqrt(2)
-    return reverseSigmoid(l, .5, 20)
+    # pos1, pos2: [x, y], or arrays with a last axis of length 2, a single position is broadcast against the other
+    pos1 = np.asarray(pos1, dtype=float)
+    pos2 = np.asarray(pos2, dtype=float)
+    assert pos1.shape[-1] == 2 and pos2.shape[-1] == 2, "positions must have a last axis of length 2"
+    if pos1.ndim == 1 and pos2.ndim == 1:
+        # one pair of positions
+        if pos1[0] == pos2[0] and pos1[1] == pos2[1]:
+            return 0
+        l = math.sqrt((float(pos1[0]) - float(pos2[0])) ** 2 + (float(pos1[1]) - float(pos2[1])) ** 2) / math.sqrt(2)
+        return reverseSigmoid(l, .5, 20)
+    l = np.sqrt((pos1[..., 0] - pos2[..., 0]) ** 2 + (pos1[..., 1] - pos2[..., 1]) ** 2) / np.sqrt(2)
+    return np.where((pos1 == pos2).all(axis=-1), 0, reverseSigmoid(l, .5, 20))
 
 def shotOrderCurve(dist):
     return reverseSigmoid(dist, 1, 10)
 
+def motionCurve(velocity):
+    # on screen motion in [0, 1] of a character projected velocity, frame fraction per second
+    return sigmoid(velocity, .25, 20)
+
+def closenessCurve(dist):
+    # camera closeness in [0, 1] of a character camera distance, close up ~.9, long shot ~0
+    return reverseSigmoid(dist, 1.5, 3)
+
 
 
 def sigmoid(x, xoffset, scale):
-    return 1 / (1 + math.exp(-(x - xoffset) * scale))
+    return 1 / (1 + exp(-(x - xoffset) * scale))
 
 
 def reverseSigmoid(x, xoffset, scale):
-    return 1 / (1 + math.exp((x - xoffset) * scale))
+    return 1 / (1 + exp((x - xoffset) * scale))
 
 
 def convex(x, xoffset, yscale):
     return (x-xoffset) ** 2 / yscale
 
 
-
+class CurveLookup:
+    """
+    precomputed curve values for bounded integer inputs, such as head room pixels or durations up to MAX_DURATION
+    inputs outside [minValue, maxValue] or not integer fall back to the curve itself
+    """
+    def __init__(self, curve, maxValue, minValue=0):
+        self.curve = curve
+        self.minValue = minValue
+        self.table = np.array([curve(x) for x in range(minValue, maxValue + 1)], dtype=float)
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=float)
+        index = x - self.minValue
+        inTable = (index >= 0) & (index < self.table.shape[0]) & (index == np.floor(index))
+        # at least 1-D, a scalar lookup gives a numpy scalar that can not be assigned into
+        result = np.array(self.table[np.where(inTable, index, 0).astype(int)], dtype=float, ndmin=1)
+        if not np.all(inTable):
+            outside = ~np.array(inTable, ndmin=1)
+            result[outside] = self.curve(np.array(x, ndmin=1)[outside])
+        if np.ndim(x) == 0:
+            return float(result[0])
+        return result
 
 
 
@@ -19,6 +19,10 @@ FRAMESIZE = FRAMEX*FRAMEY
 FRAME_DIAGONAL = math.sqrt(FRAMEX ** 2 + FRAMEY ** 2)
 QUALITY_WEIGHTS = [0.4, 0.5, 0.2, 0.1, 2, 0.2]
 TRANSFER_WEIGHTS = [0.2, 0.2, 0.3, 0.3]
+# character conflict, character emotion (node cost) and camera movement (edge cost) weights, 0 disables the term
+STYLE_WEIGHTS = [0, 0, 0]
+# user defined character conflict, character emotion and handheld intensities, in [0, 1]
+STYLE_INTENSITIES = [.5, .5, .5]
 
 def getVisibilityCost(subVis, objVis):
     """
@@ -57,10 +61,14 @@ def getHitchCockCost(actions_list, subVis_list, objVis_list):
     The main purpose is to see whether different part of different characters/items visibility is proportional to its importance
     """
     hcCosts = []
+    itemImportance = utils.getObjectImportance()
     for i in range(len(actions_list)):
         objVis = objVis_list[i]
         subVis = subVis_list[i]
         action = actions_list[i]
+        # importance of the action is looked up once, not per body part
+        soImportance = utils.getSOImportance(action)
+        bodyImportance = utils.getBodyImportance(action)
         if not objVis:
             cost = 0
             # subVis can include character vis and object vis
@@ -68,17 +76,16 @@ def getHitchCockCost(actions_list, subVis_list, objVis_list):
             if totalVis == 0:
                 hcCosts.append(1)
             else:
+                subjectImportance = soImportance[0] / len(subVis)
                 # subjects can be characters or items
                 for i in range(len(subVis)):
                     if len(subVis[i]) == 6:
                         for j in range(6):
-                            cost += abs(
-                                (utils.getSOImportance(action)[0] / len(subVis)) * utils.getBodyImportance(action)[j] - subVis[i][j] / totalVis)
+                            cost += abs(subjectImportance * bodyImportance[j] - subVis[i][j] / totalVis)
 
                     if len(subVis[i]) == 2:
                         for j in range(2):
-                            cost += abs(
-                                (utils.getSOImportance(action)[0] / len(subVis)) * utils.getObjectImportance()[j] - subVis[i][j] / totalVis)
+                            cost += abs(subjectImportance * itemImportance[j] - subVis[i][j] / totalVis)
                 hcCosts.append(cost / len(subVis))
 
         # if this action has objects
@@ -88,10 +95,8 @@ def getHitchCockCost(actions_list, subVis_list, objVis_list):
             if totalVis == 0:
                 hcCosts.append(1)
             else:
-                subjectImportance = utils.getSOImportance(action)[0] / len(subVis)
-                objectImportance = utils.getSOImportance(action)[1] / len(objVis)
-                bodyImportance = utils.getBodyImportance(action)
-                itemImportance = utils.getObjectImportance()
+                subjectImportance = soImportance[0] / len(subVis)
+                objectImportance = soImportance[1] / len(objVis)
                 for i in range(len(subVis)):
                     if len(subVis[i]) == 6:
                         # this subject is a character subject
@@ -257,30 +262,55 @@ def getDurationCost(node1, node2, d):
     return cost_curve.durationCurve(d)
 
 
-def getCharacterConflictsCost(node, conflict_int):
+def getCharacterConflictsCost(node, conflict_int, velocityData, chars):
     """
     :param node: graph node
     :param conflict_int: user defined character conflict intensity
+    :param velocityData: character projected velocity, 3D list of shape [time, cam, char]
+    :param chars: indices of the characters taking part in the actions at node time
     :return: conflict cost
+    description:
+    conflicts are shown with characters moving on screen, the stronger the conflict the more a camera showing little
+    motion of the characters costs
     """
-    pass
+    if not chars:
+        return 0
+    motion = [cost_curve.motionCurve(velocityData[node[0]][node[1]][char]) for char in chars]
+    return conflict_int * (1 - sum(motion) / len(motion))
 
 
-def getCharacterEmotionCost(node, emotion_int):
+def getCharacterEmotionCost(node, emotion_int, distData, chars):
     """
     :param node: graph mode
     :param emotion_int: user defined emotion intensity
+    :param distData: character camera distance, 3D list of shape [time, cam, char]
+    :param chars: indices of the characters taking part in the actions at node time
     :return: emotion cost
+    description:
+    emotional moments are shot close to the characters, the stronger the emotion the more a far camera costs
     """
-    pass
+    if not chars:
+        return 0
+    closeness = [cost_curve.closenessCurve(distData[node[0]][node[1]][char]) for char in chars]
+    return emotion_int * (1 - sum(closeness) / len(closeness))
 
-def getCameraMovementCost(node, handheld_int):
+def getCameraMovementCost(node1, node2, handheld_int, distData, chars):
     """
-    :param node: graph node
+    :param node1: first graph node
+    :param node2: second graph node
     :param handheld_int: user defined handheld intensity
+    :param distData: character camera distance, 3D list of shape [time, cam, char]
+    :param chars: indices of the characters taking part in the actions at both node times
     :return: handheld cost
+    description:
+    a steady camera style keeps the framing distance of the characters across cuts, a handheld style allows jumps.
+    The cost is the change of camera closeness of the characters, scaled by how steady the style is
     """
-    pass
+    if not chars:
+        return 0
+    change = [abs(cost_curve.closenessCurve(distData[node1[0]][node1[1]][char]) -
+                  cost_curve.closenessCurve(distData[node2[0]][node2[1]][char])) for char in chars]
+    return (1 - handheld_int) * sum(change) / len(change)
 
 def getPOVCost(t, cam, protagonist, cameraIndex, characterIndex):
     """
@@ -317,15 +347,21 @@ def getQualityCost(t, cam, qualityHash, startTime, endTime):
         return 0
     return qualityHash[t - startTime][cam]
 
-def getDurationQualityCost(node, duration, qualityHash, startTime, endTime):
+def getDurationQualityCost(node, duration, qualityHash, startTime, endTime, qualityCumsum=None):
     """
     :param node: graph node
     :param duration: duration
     :param qualityHash: qualish Hash
     :param startTime: user defined animation start time
     :param endTime: user defined animation end time
+    :param qualityCumsum: cumulative quality hash along time, if given the cost is a single subtraction
     :return: node accumulated quality cost inside "duration" of time
     """
+    if qualityCumsum is not None:
+        if node[0] == -1 or node[0] == endTime + 1:
+            return 0
+        end = min(node[0] + duration, endTime + 1)
+        return qualityCumsum[end - startTime][node[1]] - qualityCumsum[node[0] - startTime][node[1]]
     cost = 0
     for i in range(duration):
         cost += getQualityCost(node[0] + i, node[1], qualityHash, startTime, endTime)
@@ -349,287 +385,136 @@ def getInterActionCost(t1, t2, script):
     return 0
 
 # prepare node cost for graph nodes when no user free cameras are added
-def prepareQualityHashWoUserCam(qualityHash, totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, script, vis, headRoom, eye, distMap, objIndex = None, objVisibility = None):
+def prepareQualityHashWoUserCam(qualityHash, totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, script, vis, headRoom, eye, distMap, objIndex = None, objVisibility = None, times = None):
     """
     description: prepare node cost (no user free cameras considered)
     Node quality costs are calculated before dynamic programming. This ease the process of calculating node cost because they only need to consider
     features related the node itself. Once the node quality costs are calculated, save them in qualith hash for dynamic programming.
+    If times is given, only these rows of qualityHash are recomputed.
     """
-    if objIndex:
-        for i in range(len(qualityHash)):
-            for j in range(len(qualityHash[0])):
-                print("prepare quality hash for time {} cam {}".format(i, j))
-                qualityHash[i][j] = getWeightedQualityCostWObj([startTime + i, j], totalTime, startTime, endTime,
-                                                           cameraIndex, characterIndex, protagonist, script,
-                                                           vis, headRoom, eye, distMap, objIndex=objIndex,
-                                                           objVisibility=objVisibility)
-
-    else:
-        for i in range(len(qualityHash)):
-            for j in range(len(qualityHash[0])):
-                print("prepare quality hash for time {} cam {}".format(i, j))
-                qualityHash[i][j] = getWeightedQualityCostWoObj([startTime + i, j], totalTime, startTime, endTime,
-                                                           cameraIndex, characterIndex, protagonist, script,
-                                                           vis, headRoom, eye, distMap)
+    if times is None:
+        times = range(len(qualityHash))
+    for i in times:
+        for j in range(len(qualityHash[0])):
+            print("prepare quality hash for time {} cam {}".format(i, j))
+            qualityHash[i][j] = getWeightedQualityCost([startTime + i, j], totalTime, startTime, endTime, cameraIndex,
+                                                       characterIndex, protagonist, script, vis, headRoom, eye,
+                                                       distMap, objIndex=objIndex, objVisibility=objVisibility)
 
 
 # prepare node cost for graph nodes when there are user free cameras added
-def prepareQualityHashWUserCam(qualityHash, totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, scriptDf, visDf, headRoomDf, eyeDf, distMap, objIndex = None, objVisibility = None, userCamData = None):
+def prepareQualityHashWUserCam(qualityHash, totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, scriptDf, visDf, headRoomDf, eyeDf, distMap, objIndex = None, objVisibility = None, userCamData = None, times = None):
     """
     description: prepare node cost (user free cameras considered)
     Node quality costs are calculated before dynamic programming. This ease the process of calculating node cost because they only need to consider
     features related the node itself. Once the node quality costs are calculated, save them in qualith hash for dynamic programming.
     No need to calculate user free cameras because they must cover that user specified time period. But knowing the time when user free cameras
     are added can reduce the workload for generating node cost for default nodes in these time intervals.
+    Every time covered by a user free camera gets 0 node cost without being calculated. If times is given, only these rows of qualityHash are recomputed.
+    """
+    if times is None:
+        times = range(len(qualityHash))
+    userCamTimes = set()
+    if userCamData:
+        userCamTimes = utils.getUserCamTimes(userCamData)
+    for i in times:
+        if startTime + i in userCamTimes:
+            # skip user added cam times
+            qualityHash[i] = [0] * len(qualityHash[i])
+            continue
+        for j in range(len(qualityHash[0])):
+            print("prepare quality hash for time {} cam {}".format(i, j))
+            qualityHash[i][j] = getWeightedQualityCost([startTime + i, j], totalTime, startTime, endTime, cameraIndex,
+                                                       characterIndex, protagonist, scriptDf, visDf, headRoomDf, eyeDf,
+                                                       distMap, objIndex=objIndex, objVisibility=objVisibility)
+    print("finish generating default quality cost hash!!!")
+
+def getNodeFeatures(node, characterIndex, script, charVisibility, headRoomData, eyePosData, objIndex=None, objVisibility=None):
+    """
+    :param node: [time, camera]
+    :param objIndex: item index from item list, None if no user interested items are considered
+    :param objVisibility: item visibility, 4D list of shape [time, cam, item, 2]
+    :return: {"actions", "subs", "subVis", "objVis", "eyePos", "headRoom"}, one list entry per action
+    description:
+    actions, subjects and objects of the node are read from the script once, every per member feature used by the node
+    cost is collected in the same pass. Items only have visibility, eye position and head room are character features.
     """
-    if objIndex:
-        for i in range(len(qualityHash)):
-            if userCamData:
-                if i in userCamData.keys():
-                    # skip user added cam times
-                    continue
-            for j in range(len(qualityHash[0])):
-                print("prepare quality hash for time {} cam {}".format(i, j))
-                qualityHash[i][j] = getWeightedQualityCostWObj([startTime + i, j], totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, scriptDf,
-                                           visDf, headRoomDf, eyeDf, distMap, objIndex=objIndex, objVisibility=objVisibility)
-        print("finish generating default quality cost hash!!!")
-    else:
-        for i in range(len(qualityHash)):
-            if userCamData:
-                if i in userCamData.keys():
-                # skip user added cam times
-                    continue
-            for j in range(len(qualityHash[0])):
-                print("prepare quality hash for time {} cam {}".format(i, j))
-                qualityHash[i][j] = getWeightedQualityCostWoObj([startTime + i, j], totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, scriptDf,
-                                           visDf, headRoomDf, eyeDf, distMap)
-        print("finish generating default quality cost hash!!!")
-
-
-# prepare quality cost with user specified items added
-def getWeightedQualityCostWObj(node, totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, script, charVisibility, headRoomData, eyePosData, distMap, objIndex, objVisibility):
-    """
-    quality cost == node cost
-    This is considering node cost when no user interested items are considered.
-    So all subjects, objectes are characters during the calculation
-    """
-    # dummy start node and dummy end node has 0 quality cost
-    if node[0] == -1 or node[0] == endTime + 1:
-        return 0
-
-
-    # action proximity cost
     index = utils.getActionIndex(node[0], script) #action sequence index
-    actions_list = utils.getActions(node[0], index, script) #action
-    if len(actions_list) > 1:
-        print("parallel actions happen at time: {}, actions: {}".format(node[0], actions_list))
+    actions_list = utils.getActions(node[0], index, script)
     subs_list = utils.getSubjects(node[0], index, script, characterIndex, objIndex)
-    # subs = [characters[x] for x in subs]
     objs_list = utils.getObjects(node[0], index, script, characterIndex, objIndex)
-    # objs = [characters[x] for x in objs]
-    # print("subs: ", subs)
-    # print("objs: ", objs)
     assert len(actions_list) == len(subs_list) == len(objs_list), "for script at time {}, number of actions is not compatible with number of subjects and objects".format(node[0])
-    visCosts = []
-    subVis_list = []
-    objVis_list = []
+    features = {"actions": actions_list, "subs": subs_list, "subVis": [], "objVis": [], "eyePos": [], "headRoom": []}
     for i in range(len(actions_list)):
         subVis = []
         objVis = []
-        # animation_time = getAnimationStartTime(node[0], index, script)
-        for sub in subs_list[i]:
-            if sub in objIndex.keys():
-                # sub is an object
-                sub = objIndex[sub]
-                subVis.append(utils.getObjVisibility(sub, node[0], node[1], objVisibility))
-            else:
-                sub = characterIndex[sub]
-                subVis.append(utils.getCharVisibility(sub, node[0], node[1], charVisibility))
-        for obj in objs_list[i]:
-            if obj in objIndex.keys():
-                # sub is an object
-                obj = objIndex[obj]
-                objVis.append(utils.getObjVisibility(obj, node[0], node[1], objVisibility))
-            else:
-                obj = characterIndex[obj]
-                objVis.append(utils.getCharVisibility(obj, node[0], node[1], charVisibility))
-
-        visCosts.append(getVisibilityCost(subVis, objVis))
-        subVis_list.append(subVis)
-        objVis_list.append(objVis)
-    visCost = sum(visCosts) / len(visCosts)
-
-    # hitchcock cost
-    hitchCockCost = getHitchCockCost(actions_list, subVis_list, objVis_list)
-
-    # lookroom cost
-    lookRoomCosts = []
-    for i in range(len(actions_list)):
         eyePos = []
-        for sub in subs_list[i]:
-            if sub in characterIndex.keys():
-                sub = characterIndex[sub]
-                eyePos.append(utils.getDefaultEyePos(sub, node[0], node[1], eyePosData))
-
-        # for obj in objs:
-        #     eyePos.append(getEyePos(node[0], node[1], obj, eyeDf))
-        # face thetas not ready yet, for lookroom cost assume all have 0 thetas
-        eyeThetas = [0] * len(eyePos)
-        # for sub in subs:
-        #     eyeThetas.append(getFaceThetas(node[0], node[1], sub, faceThetaDf))
-        # for obj in objs:
-        #     eyeThetas.append(getFaceThetas(node[0], node[1], obj, faceThetasDf))
-        lookRoomCosts.append(getLookRoomCost(eyePos, eyeThetas))
-    lookRoomCost = sum(lookRoomCosts) / len(lookRoomCosts)
-
-    # headroom cost
-    headRoomCosts = []
-    for i in range(len(actions_list)):
         headRoom = []
-        # only characters have eyes related cost
-        for sub in subs_list[i]:
-            if sub in characterIndex.keys():
-                sub = characterIndex[sub]
-                headRoom.append(utils.getHeadRoom(node[0], node[1], sub, headRoomData))
-        for obj in objs_list[i]:
-            if obj in characterIndex.keys():
-                obj = characterIndex[obj]
-                headRoom.append(utils.getHeadRoom(node[0], node[1], obj, headRoomData))
-        headRoomCosts.append(getHeadRoomCost(headRoom))
-    headRoomCost = sum(headRoomCosts) / len(headRoomCosts)
-    povCost = 1
-    # print("action is {}".format(actions_list))
-    # print("protagonist; ", protagonist)
-    if "look" in actions_list and (any(characterIndex[protagonist] in sublist for sublist in subs_list)):
-        # possibly trigger POV
-        print("possible POV trigger!")
-        povCost = getPOVCost(node[0], node[1], characterIndex[protagonist], cameraIndex, characterIndex)
-    # print("POV COST: ", povCost)
-
-
-    shotOrderCost = 1
-    if node[0] < totalTime * .1:
-        # if time is in the first 10%
-        dist = cameraIndex[node[1]]["distance"]
-        if dist != "NA":
-            dist = distMap[dist]
-            shotOrderCost = getShotOrderCost(dist)
-        else:
-            # no POV camera at the beginning of video to avoid confusion
-            shotOrderCost = 1
-
-
-    # weighted node cost summation
-    qualityCost = visCost * QUALITY_WEIGHTS[0] + \
-                  hitchCockCost * QUALITY_WEIGHTS[1] + \
-                  lookRoomCost * QUALITY_WEIGHTS[2] + \
-                  headRoomCost * QUALITY_WEIGHTS[3] + \
-                  povCost * QUALITY_WEIGHTS[4] + \
-                  shotOrderCost * QUALITY_WEIGHTS[5]
-    return qualityCost
-
-# prepare quality cost with out user specified items added
-def getWeightedQualityCostWoObj(node, totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, script, charVisibility, headRoomData, eyePosData, distMap):
+        for members, memberVis, isSubject in [(subs_list[i], subVis, True), (objs_list[i], objVis, False)]:
+            for member in members:
+                if objIndex and member in objIndex.keys():
+                    memberVis.append(utils.getObjVisibility(objIndex[member], node[0], node[1], objVisibility))
+                elif member in characterIndex.keys():
+                    char = characterIndex[member]
+                    memberVis.append(utils.getCharVisibility(char, node[0], node[1], charVisibility))
+                    if isSubject:
+                        eyePos.append(utils.getDefaultEyePos(char, node[0], node[1], eyePosData))
+                    headRoom.append(utils.getHeadRoom(node[0], node[1], char, headRoomData))
+        features["subVis"].append(subVis)
+        features["objVis"].append(objVis)
+        features["eyePos"].append(eyePos)
+        features["headRoom"].append(headRoom)
+    return features
+
+
+def getWeightedQualityCost(node, totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, script, charVisibility, headRoomData, eyePosData, distMap, objIndex=None, objVisibility=None, returnTerms=False):
     """
     quality cost == node cost
-    This is considering node cost when there exist user interested items.
-    Subjects and objects of actions can be characters or items in this case.
+    :param objIndex: item index from item list, None if no user interested items are considered
+    :param objVisibility: item visibility, 4D list of shape [time, cam, item, 2]
+    :param returnTerms: return the unweighted cost terms, in the order of QUALITY_WEIGHTS
+    description:
+    Without items all subjects and objects are characters. With items subjects and objects of actions can be characters
+    or items, actions are then always counted in the visibility and headroom cost, without items only actions with
+    character subjects (visibility) or characters (headroom) count.
     """
     # dummy start node and dummy end node has 0 quality cost
     if node[0] == -1 or node[0] == endTime + 1:
-        return 0
-
-    # action proximity cost
-    index = utils.getActionIndex(node[0], script) #action sequence index
-    actions_list = utils.getActions(node[0], index, script) #action
-    # print("action: ", actions_list)
-    subs_list = utils.getSubjects(node[0], index, script, characterIndex, objIndex=None)
-    # subs = [characters[x] for x in subs]
-    objs_list = utils.getObjects(node[0], index, script, characterIndex, objIndex=None)
-    # objs = [characters[x] for x in objs]
-    # print("subs: ", subs)
-    # print("objs: ", objs)
-    subVis_list = []
-    objVis_list = []
+        return [0] * len(QUALITY_WEIGHTS) if returnTerms else 0
+    withObj = bool(objIndex)
+    features = getNodeFeatures(node, characterIndex, script, charVisibility, headRoomData, eyePosData, objIndex,
+                               objVisibility)
+    actions_list = features["actions"]
+    subs_list = features["subs"]
+
+    # visibility cost
     visCosts = []
-    # animation_time = getAnimationStartTime(node[0], index, script)
-    for i in range(len(actions_list)):
-        subVis = []
-        objVis = []
-        for sub in subs_list[i]:
-            if sub in characterIndex.keys():
-                sub = characterIndex[sub]
-                subVis.append(utils.getCharVisibility(sub, node[0], node[1], charVisibility))
-        for obj in objs_list[i]:
-            if obj in characterIndex.keys():
-                obj = characterIndex[obj]
-                objVis.append(utils.getCharVisibility(obj, node[0], node[1], charVisibility))
-
-        # print("t: {}, cam: {} sub visibility: {}".format(node[0], node[1], subVis))
-        # print("t: {}, cam: {} obj visibility: {}".format(node[0], node[1], objVis))
-        subVis_list.append(subVis)
-        objVis_list.append(objVis)
-        # print(subVis, objVis)
-        if subVis:
+    for subVis, objVis in zip(features["subVis"], features["objVis"]):
+        if subVis or withObj:
             visCosts.append(getVisibilityCost(subVis, objVis))
         else:
             visCosts.append(0)
-    print(subs_list)
-    print(objs_list)
-    print(subVis_list)
-    print(objVis_list)
     visCost = sum(visCosts) / len(visCosts)
-    # hitchcock cost
-    hitchCockCost = getHitchCockCost(actions_list, subVis_list, objVis_list)
 
+    # hitchcock cost
+    hitchCockCost = getHitchCockCost(actions_list, features["subVis"], features["objVis"])
 
     # lookroom cost
-    lookRoomCosts = []
-    for i in range(len(actions_list)):
-        eyePos = []
-        for sub in subs_list[i]:
-            if sub in characterIndex.keys():
-                sub = characterIndex[sub]
-                eyePos.append(utils.getDefaultEyePos(sub, node[0], node[1], eyePosData))
-
-        # for obj in objs:
-        #     eyePos.append(getEyePos(node[0], node[1], obj, eyeDf))
-        # face thetas not ready yet, for lookroom cost assume all have 0 thetas
-        eyeThetas = [0] * len(eyePos)
-        # for sub in subs:
-        #     eyeThetas.append(getFaceThetas(node[0], node[1], sub, faceThetaDf))
-        # for obj in objs:
-        #     eyeThetas.append(getFaceThetas(node[0], node[1], obj, faceThetasDf))
-        lookRoomCosts.append(getLookRoomCost(eyePos, eyeThetas))
+    # face thetas not ready yet, for lookroom cost assume all have 0 thetas
+    lookRoomCosts = [getLookRoomCost(eyePos, [0] * len(eyePos)) if eyePos else 0 for eyePos in features["eyePos"]]
     lookRoomCost = sum(lookRoomCosts) / len(lookRoomCosts)
 
-    # headroom cost
-    headRoomCosts = []
+    # headroom cost, only characters have eyes related cost
+    headRoomCosts = [getHeadRoomCost(headRoom) if headRoom else 0 for headRoom in features["headRoom"]
+                     if headRoom or withObj]
+    headRoomCost = sum(headRoomCosts) / len(headRoomCosts) if headRoomCosts else 0
 
-    # only characters have eyes related cost
-    for i in range(len(actions_list)):
-        headRoom = []
-        for sub in subs_list[i]:
-            if sub in characterIndex.keys():
-                sub = characterIndex[sub]
-                headRoom.append(utils.getHeadRoom(node[0], node[1], sub, headRoomData))
-        for obj in objs_list[i]:
-            if obj in characterIndex.keys():
-                obj = characterIndex[obj]
-                headRoom.append(utils.getHeadRoom(node[0], node[1], obj, headRoomData))
-        if headRoom:
-            headRoomCosts.append(getHeadRoomCost(headRoom))
-    headRoomCost = sum(headRoomCosts) / len(headRoomCosts)
     povCost = 1
-    povCosts = []
-    # print("action is {}".format(actions_list))
-    # print("protagonist; ", protagonist)
-    for i in range(len(actions_list)):
-        if actions_list[i] == "look" and any(characterIndex[protagonist] in sublist for sublist in subs_list):
-            print("possible POV trigger!")
-            povCosts.append(getPOVCost(node[0], node[1], characterIndex[protagonist], cameraIndex, characterIndex))
-    if povCosts:
-        povCost = sum(povCosts) / len(povCosts)
+    if "look" in actions_list and any(characterIndex[protagonist] in sublist for sublist in subs_list):
+        # possibly trigger POV
+        print("possible POV trigger!")
+        povCost = getPOVCost(node[0], node[1], characterIndex[protagonist], cameraIndex, characterIndex)
+
     shotOrderCost = 1
     if node[0] < totalTime * .1:
         # if time is in the first 10%
@@ -641,6 +526,10 @@ def getWeightedQualityCostWoObj(node, totalTime, startTime, endTime, cameraIndex
             # no POV camera at the beginning of video to avoid confusion
             shotOrderCost = 1
 
+    if returnTerms:
+        # unweighted cost terms, in the order of QUALITY_WEIGHTS
+        return [visCost, hitchCockCost, lookRoomCost, headRoomCost, povCost, shotOrderCost]
+
     # weighted node cost summation
     qualityCost = visCost * QUALITY_WEIGHTS[0] + \
                   hitchCockCost * QUALITY_WEIGHTS[1] + \
@@ -650,6 +539,25 @@ def getWeightedQualityCostWoObj(node, totalTime, startTime, endTime, cameraIndex
                   shotOrderCost * QUALITY_WEIGHTS[5]
     return qualityCost
 
+# prepare quality cost with user specified items added
+def getWeightedQualityCostWObj(node, totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, script, charVisibility, headRoomData, eyePosData, distMap, objIndex, objVisibility, returnTerms=False):
+    """
+    quality cost == node cost
+    This is considering node cost when there exist user interested items, see getWeightedQualityCost
+    """
+    return getWeightedQualityCost(node, totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, script,
+                                  charVisibility, headRoomData, eyePosData, distMap, objIndex, objVisibility,
+                                  returnTerms)
+
+# prepare quality cost with out user specified items added
+def getWeightedQualityCostWoObj(node, totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, script, charVisibility, headRoomData, eyePosData, distMap, returnTerms=False):
+    """
+    quality cost == node cost
+    This is considering node cost when no user interested items are considered, see getWeightedQualityCost
+    """
+    return getWeightedQualityCost(node, totalTime, startTime, endTime, cameraIndex, characterIndex, protagonist, script,
+                                  charVisibility, headRoomData, eyePosData, distMap, returnTerms=returnTerms)
+
 # get edge cost when there are user added free cameras
 def getWeightedTransferCostWithUserCams(node1, node2, endTime, characters, script, eyePosData, leftRightOrderData, userCamData, objects):
     """
@@ -769,7 +677,7 @@ def getWeightedTransferCostWoUserCam(node1, node2, endTime, characterIndex, scri
     # action1 = getAction(index1, scriptDf)
     # animationTime1 = getAnimationStartTime(node1[0], index1, scriptDf)
     subs1 = utils.getSubjects(node1[0], index1, script, characterIndex, items)
-    objs1 = utils.getObjects(node1[1], index1, script, characterIndex, items)
+    objs1 = utils.getObjects(node1[0], index1, script, characterIndex, items)
 
     index2 = utils.getActionIndex(node2[0], script)
     # action2 = getAction(index2, scriptDf)
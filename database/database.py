@@ -1,20 +1,122 @@
-import mysql.connector
 import json
 import ast
+import sqlite3
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import numpy as np
+try:
+    import mysql.connector
+    import mysql.connector.pooling
+except ImportError:
+    # only the SQLite stand-in can be used
+    mysql = None
+
+DATA_TABLE = "cam_optimize_data_test"
+# dtype of the data parsed into arrays
+ARRAY_DTYPES = {"charVisibility": np.int32,
+                "eyePos": np.float32,
+                "headroom": np.float32,
+                "objVisibility": np.int32,
+                "charProVelocity": np.float32,
+                "charCamDist": np.float32}
+# data parsed into nested lists with ast.literal_eval
+LITERAL_DATA = ["leftRightOrder"]
+# data stored in the row of another data name
+DATA_ROWS = {"leftRightOrder": "headroom"}
+
+
+def get_blob_shape(text, size):
+    """
+    :param text: nested list literal
+    :param size: number of values in text
+    :return: shape of the nested list, from how many lists are opened at every depth
+    """
+    chars = np.frombuffer(text.encode(), dtype=np.uint8)
+    opens = chars == ord("[")
+    depth = np.cumsum(opens.astype(int) - (chars == ord("]")))
+    counts = np.bincount(depth[opens])[1:]
+    shape = [int(counts[k + 1] // counts[k]) for k in range(len(counts) - 1)]
+    shape.append(size // max(int(counts[-1]), 1))
+    return tuple(shape)
+
+
+def parse_array_blob(blob, dtype):
+    """
+    :param blob: nested list literal as stored in the database, "NA" for missing values
+    :param dtype: array dtype, missing values need a float dtype
+    :return: ndarray of the nested list, NaN for "NA"
+    description:
+    same values as ast.literal_eval, parsed with one numpy call instead of building nested python lists
+    """
+    text = blob.replace("'", "").replace('"', "")
+    values = np.fromstring(text.replace("NA", "nan").replace("[", "").replace("]", ""), dtype=float, sep=",")
+    shape = get_blob_shape(text, values.size)
+    assert int(np.prod(shape)) == values.size, "data is not a regular nested list, shape {} for {} values".format(
+        shape, values.size)
+    if np.issubdtype(dtype, np.integer):
+        assert not np.isnan(values).any(), "integer data has NA values"
+    return values.reshape(shape).astype(dtype)
+
+
+def get_data_row(data_name):
+    # data name of the DB row holding data_name
+    return DATA_ROWS.get(data_name, data_name)
+
+
+def parse_data(data_name, blob):
+    # array of an ARRAY_DTYPES data or nested lists of a LITERAL_DATA data, run in worker processes by
+    # DBLoader.fetch_parsed
+    if data_name in LITERAL_DATA:
+        return ast.literal_eval(blob)
+    return parse_array_blob(blob, ARRAY_DTYPES[data_name])
+
+
+def check_shape(array, expected, messages):
+    """
+    :param array: parsed data
+    :param expected: expected size of every leading axis
+    :param messages: message printed for every unmatched axis
+    """
+    for axis, (size, message) in enumerate(zip(expected, messages)):
+        if array.ndim <= axis or array.shape[axis] != size:
+            print(message)
 
 
 class DataBase:
-    def __init__(self, db_address, user_name, passwd, database):
+    # parameter placeholder of the DB API driver
+    placeholder = "%s"
+
+    def __init__(self, db_address, user_name, passwd, database, pool_size=None):
         # basic setting
         self.db_address = db_address
         self.user_name = user_name
         self.passwd = passwd
         self.database = database
+        # pool_size: number of pooled connections shared by worker threads, one connection if None
+        self.pool_size = pool_size
 
         self.db = None
         self.cursor = None
+        self.pool = None
 
     def db_connect(self):
+        assert mysql is not None, "mysql.connector is not installed"
+        if self.pool_size:
+            if self.pool is None:
+                self.pool = mysql.connector.pooling.MySQLConnectionPool(
+                    pool_name="cam_optimize_{}".format(id(self)),
+                    pool_size=self.pool_size,
+                    host=self.db_address,
+                    user=self.user_name,
+                    passwd=self.passwd,
+                    database=self.database,
+                    port=3306
+                )
+            else:
+                print("{db_address} is already connected".format(db_address=self.db_address))
+            return
+
         if self.db is None:
             mydb = mysql.connector.connect(
                 host=self.db_address,
@@ -34,18 +136,130 @@ class DataBase:
             print("cursor is already exist, please close current cursor first")
 
     def db_disconnect(self):
+        if self.pool is not None:
+            # pooled connections are closed when they are garbage collected
+            self.pool = None
+            return
         self.cursor.close()
         self.db.close()
         self.cursor = None
         self.db = None
 
+    def is_thread_safe(self):
+        # the single connection can not run queries from several threads
+        return self.pool is not None
+
+    @contextmanager
+    def get_cursor(self, buffered=True):
+        """
+        :param buffered: fetch all rows of a query at once, unbuffered cursors stream them
+        description:
+        a cursor on a pooled connection, returned to the pool afterwards, or on the single connection
+        """
+        if self.pool is not None:
+            connection = self.pool.get_connection()
+            cursor = connection.cursor(buffered=buffered)
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+                connection.close()
+        elif buffered:
+            yield self.cursor
+        else:
+            cursor = self.db.cursor(buffered=False)
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
     def download_data(self, project_id, data_name):
-        sql = "SELECT content FROM cam_optimize_data_test WHERE project_id=%s and data_name=%s;"
-        self.cursor.execute(sql, (project_id, data_name))
-        result = self.cursor.fetchone()[0]
-        print(result)
+        sql = "SELECT content FROM {table} WHERE project_id={p} and data_name={p};".format(table=DATA_TABLE,
+                                                                                         p=self.placeholder)
+        with self.get_cursor() as cursor:
+            cursor.execute(sql, (project_id, data_name))
+            result = cursor.fetchone()
+        assert result is not None, "project {} has no {} data".format(project_id, data_name)
         # TODO: save to data format used in c sharp
-        return result
+        return result[0]
+
+    def iter_data(self, project_ids, data_names, batch_size=4):
+        """
+        :param project_ids: project ids
+        :param data_names: data names
+        :param batch_size: rows fetched at a time
+        :return: generator of (project_id, data_name, content) rows, all from one query
+        description:
+        rows are streamed, only batch_size blobs are held by the cursor at a time.
+        Without a pool the connection is busy until the generator is exhausted.
+        """
+        sql = "SELECT project_id, data_name, content FROM {table} WHERE project_id IN ({ids}) " \
+              "and data_name IN ({names});".format(table=DATA_TABLE,
+                                                   ids=", ".join([self.placeholder] * len(project_ids)),
+                                                   names=", ".join([self.placeholder] * len(data_names)))
+        with self.get_cursor(buffered=False) as cursor:
+            cursor.execute(sql, tuple(project_ids) + tuple(data_names))
+            rows = cursor.fetchmany(batch_size)
+            while rows:
+                for row in rows:
+                    yield row
+                rows = cursor.fetchmany(batch_size)
+
+    def download_many(self, project_ids, data_names):
+        """
+        :return: {(project_id, data_name): content} of every requested data in one round trip
+        """
+        return {(project_id, data_name): content for project_id, data_name, content in
+                self.iter_data(project_ids, data_names)}
+
+
+class SQLiteDataBase(DataBase):
+    """
+    DataBase on a local SQLite file with the same table, to run and benchmark the loaders offline
+    """
+    placeholder = "?"
+
+    def __init__(self, path=":memory:"):
+        super().__init__(path, None, None, None)
+        # worker threads share the connection, one query at a time
+        self.lock = threading.Lock()
+
+    def db_connect(self):
+        if self.db is None:
+            self.db = sqlite3.connect(self.db_address, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS {} (project_id INTEGER, data_name TEXT, content TEXT, "
+                            "PRIMARY KEY (project_id, data_name));".format(DATA_TABLE))
+            self.cursor = self.db.cursor()
+        else:
+            print("{db_address} is already connected".format(db_address=self.db_address))
+
+    @contextmanager
+    def get_cursor(self, buffered=True):
+        with self.lock:
+            cursor = self.db.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    def is_thread_safe(self):
+        return True
+
+    def upload_data(self, project_id, data_name, content):
+        self.db.execute("INSERT OR REPLACE INTO {} VALUES (?, ?, ?);".format(DATA_TABLE),
+                        (project_id, data_name, content))
+        self.db.commit()
+
+    def copy_projects(self, db, project_ids, data_names):
+        """
+        :param db: connected DataBase to copy from
+        description:
+        copy the data of projects into this DB in one bulk download
+        """
+        for project_id, data_name, content in db.iter_data(project_ids, data_names):
+            self.db.execute("INSERT OR REPLACE INTO {} VALUES (?, ?, ?);".format(DATA_TABLE),
+                            (project_id, data_name, content))
+        self.db.commit()
 
 
 class DBLoader:
@@ -53,9 +267,70 @@ class DBLoader:
         super().__init__()
         self.project_id = project_id
         self.db = db
+        # blobs fetched ahead by fetch, bulk_fetch or fetch_parsed, and arrays parsed by fetch_parsed,
+        # kept until clear_blobs
+        self.blobs = {}
+        self.parsed = {}
+
+    def fetch(self, data_names):
+        """
+        :param data_names: data names the next load calls need, downloaded in one query
+        """
+        bulk_fetch([self], data_names)
+
+    def fetch_parsed(self, data_names, max_threads=4, max_workers=None):
+        """
+        :param data_names: data names the next load calls need
+        :param max_threads: concurrent downloads
+        :param max_workers: parsing processes, number of CPUs if None
+        description:
+        every data is downloaded on its own thread, ARRAY_DTYPES and LITERAL_DATA data is parsed in a worker process
+        as soon as its download finishes, so parsing overlaps the remaining downloads and the total time approaches
+        the longest download. The load calls then only check shapes.
+        Without a pooled DataBase the data is downloaded one query at a time, parsing still overlaps the downloads.
+        """
+        data_names = list(dict.fromkeys(data_names))
+        rows = [x for x in dict.fromkeys(get_data_row(x) for x in data_names) if x not in self.blobs]
+        with ProcessPoolExecutor(max_workers) as processes:
+            parses = {}
+
+            def parse_row(row):
+                for data_name in data_names:
+                    if get_data_row(data_name) == row and (data_name in ARRAY_DTYPES or data_name in LITERAL_DATA):
+                        parses[processes.submit(parse_data, data_name, self.blobs[row])] = data_name
+
+            if self.db.is_thread_safe():
+                with ThreadPoolExecutor(max_threads) as threads:
+                    downloads = {threads.submit(self.db.download_data, self.project_id, row): row for row in rows}
+                    for future in as_completed(downloads):
+                        self.blobs[downloads[future]] = future.result()
+                        parse_row(downloads[future])
+            else:
+                # the single connection runs one query at a time
+                for row in rows:
+                    self.blobs[row] = self.db.download_data(self.project_id, row)
+                    parse_row(row)
+            for future in as_completed(parses):
+                self.parsed[parses[future]] = future.result()
+
+    def clear_blobs(self):
+        self.blobs = {}
+        self.parsed = {}
+
+    def download(self, data_name):
+        row = get_data_row(data_name)
+        if row in self.blobs:
+            return self.blobs[row]
+        return self.db.download_data(self.project_id, row)
+
+    def parse(self, data_name):
+        # array of an ARRAY_DTYPES data or nested lists of a LITERAL_DATA data
+        if data_name in self.parsed:
+            return self.parsed[data_name]
+        return parse_data(data_name, self.download(data_name))
 
     def loadScript(self):
-        script = self.db.download_data(self.project_id, "script")
+        script = self.download("script")
         script = json.loads(script)
         # print(script)
         # print(type(script))
@@ -67,14 +342,14 @@ class DBLoader:
         return script
 
     def loadDefaultCameras(self):
-        defaultCams =  self.db.download_data(self.project_id, "defaultCams")
+        defaultCams =  self.download("defaultCams")
         defaultCams = json.loads(defaultCams)
 
         defaultCams = {i["camIndex"]: i for i in defaultCams["defaultCams"]}
         return defaultCams
 
     def loadCharacters(self):
-        characters = self.db.download_data(self.project_id, "characters")
+        characters = self.download("characters")
         characters = json.loads(characters)["characters"]
         print(type(characters))
         #
@@ -85,7 +360,7 @@ class DBLoader:
         return characters
 
     def loadObjects(self):
-        objects = self.db.download_data(self.project_id, "objects")
+        objects = self.download("objects")
         objects = json.loads(objects)
 
         objects = {i["label"]: i["objIndex"] for i in objects["objects"]}
@@ -98,48 +373,34 @@ class DBLoader:
         return distMap
 
     def loadCharVisibility(self, total_time, num_chars):
-        charVisibility = self.db.download_data(self.project_id, "charVisibility")
-        charVisibility = ast.literal_eval(charVisibility)
-        if len(charVisibility) != total_time:
-            print("character visibility time and animation total time unmatched")
-        if len(charVisibility[0]) != num_chars * 21:
-            print("number of character visibility cameras and default number of cameras unmatched")
-        if len(charVisibility[0][0]) != num_chars:
-            print("number of characters for character visibility and total number of characters unmatched")
-        if len(charVisibility[0][0][0]) != 6:
-            print("character visibility bodyparts is not 6")
-
-        charVisibility = [[[[int(x) for x in i] for i in j] for j in r] for r in charVisibility]
+        charVisibility = self.parse("charVisibility")
+        check_shape(charVisibility, [total_time, num_chars * 21, num_chars, 6],
+                    ["character visibility time and animation total time unmatched",
+                     "number of character visibility cameras and default number of cameras unmatched",
+                     "number of characters for character visibility and total number of characters unmatched",
+                     "character visibility bodyparts is not 6"])
         return charVisibility
 
     def loadEyePos(self, total_time, num_chars):
-        eyePos = self.db.download_data(self.project_id, "eyePos")
-        eyePos = ast.literal_eval(eyePos)
-        if len(eyePos) != total_time:
-            print("eye position time and animation total time unmatched")
-        if len(eyePos[0]) != num_chars * 21:
-            print("number of eye position cameras and default number of cameras unmatched")
-        if len(eyePos[0][0]) != num_chars:
-            print("number of characters for eye position and total number of characters unmatched")
-
-        eyePos = [[[[int(x) if x != "NA" else "NA" for x in i] for i in j] for j in r] for r in eyePos]
+        # NaN if no eye present
+        eyePos = self.parse("eyePos")
+        check_shape(eyePos, [total_time, num_chars * 21, num_chars],
+                    ["eye position time and animation total time unmatched",
+                     "number of eye position cameras and default number of cameras unmatched",
+                     "number of characters for eye position and total number of characters unmatched"])
         return eyePos
 
     def loadHeadRoom(self, total_time, num_chars):
-        headroom = self.db.download_data(self.project_id, "headroom")
-        headroom = ast.literal_eval(headroom)
-        if len(headroom) != total_time:
-            print("headroom time and animation total time unmatched")
-        if len(headroom[0]) != num_chars * 21:
-            print("number of headroom cameras and default number of cameras unmatched")
-        if len(headroom[0][0]) != num_chars:
-            print("number of characters for headroom and total number of characters unmatched")
-        headroom = [[[int(x) if x != "NA" else "NA" for x in j] for j in r] for r in headroom]
+        # NaN if head top is out
+        headroom = self.parse("headroom")
+        check_shape(headroom, [total_time, num_chars * 21, num_chars],
+                    ["headroom time and animation total time unmatched",
+                     "number of headroom cameras and default number of cameras unmatched",
+                     "number of characters for headroom and total number of characters unmatched"])
         return headroom
 
     def loadLeftRight(self,  total_time, num_chars):
-        leftRightOrder = self.db.download_data(self.project_id, "headroom")
-        leftRightOrder = ast.literal_eval(leftRightOrder)
+        leftRightOrder = self.parse("leftRightOrder")
         if len(leftRightOrder) != total_time:
             print("leftRightOrder time and animation total time unmatched")
         if len(leftRightOrder[0]) != num_chars * 21:
@@ -149,41 +410,46 @@ class DBLoader:
         return leftRightOrder
 
     def loadObjVisibility(self, total_time, num_chars, num_objects):
-        objVisibility = self.db.download_data(self.project_id, "objVisibility")
-        objVisibility = ast.literal_eval(objVisibility)
-        if len(objVisibility) != total_time:
-            print("object visibility time and animation total time unmatched")
-        if len(objVisibility[0]) != num_chars * 21:
-            print("number of object visibility cameras and default number of cameras unmatched")
-        if len(objVisibility[0][0]) != num_objects:
-            print("number of characters for object visibility and total number of characters unmatched")
-        if len(objVisibility[0][0][0]) != 2:
-            print("object visibility bodyparts is not 2")
-
-        objVisibility = [[[[int(x) for x in i] for i in j] for j in r] for r in objVisibility]
+        objVisibility = self.parse("objVisibility")
+        check_shape(objVisibility, [total_time, num_chars * 21, num_objects, 2],
+                    ["object visibility time and animation total time unmatched",
+                     "number of object visibility cameras and default number of cameras unmatched",
+                     "number of characters for object visibility and total number of characters unmatched",
+                     "object visibility bodyparts is not 2"])
         return objVisibility
 
     def loadUserCamData(self):
-        userCamData = self.db.download_data(self.project_id, "userCamData")
+        userCamData = self.download("userCamData")
         userCamData = json.loads(userCamData)
-        # userCamDataNew = dict()
-        # for i in userCamData["userCamData"]:
-        #     userCamDataNew[i["startTime"]] = i
+        userCamDataNew = dict()
+        for i in userCamData["userCamData"]:
+            userCamDataNew[i["startTime"]] = i
 
         # print(userCamDataNew)
-        return userCamData
+        return userCamDataNew
 
     def loadDefaultVelocity(self):
-        defaultVelocity = self.db.download_data(self.project_id, "charProVelocity")
-        defaultVelocity = ast.literal_eval(defaultVelocity)
-        defaultVelocity = [[[float(x) for x in i] for i in j] for j in defaultVelocity]
-        return defaultVelocity
+        return self.parse("charProVelocity")
 
     def loadDefaultCharCamDist(self):
-        defaultDist = self.db.download_data(self.project_id, "charCamDist")
-        defaultDist = ast.literal_eval(defaultDist)
-        defaultDist = [[[float(x) for x in i] for i in j] for j in defaultDist]
-        return defaultDist
+        return self.parse("charCamDist")
+
+
+
+def bulk_fetch(loaders, data_names):
+    """
+    :param loaders: DBLoaders of one or more projects on the same DataBase
+    :param data_names: data names to download for every project
+    description:
+    one query for all projects and data names, every loader keeps the blobs of its project until they are parsed
+    """
+    data_names = [x for x in dict.fromkeys(get_data_row(x) for x in data_names)]
+    loaders = {loader.project_id: loader for loader in loaders}
+    if not loaders or not data_names:
+        return
+    db = next(iter(loaders.values())).db
+    for project_id, data_name, content in db.iter_data(list(loaders.keys()), data_names):
+        loaders[project_id].blobs[data_name] = content
 
 
 
@@ -1,3 +1,5 @@
+import numpy as np
+
 
 root_action_list = ["subjectOnly", "subjectStrong", "subjectProminent", "even", "objectProminent", "objectStrong", "objectOnly"]
 actionSOImportance = {
@@ -20,6 +22,11 @@ itemImportanceList = ["frontProminent", "backProminent"]
 itemImportanceMap = {"frontProminent": [0.8, 0.2],
                     "backProminent": [0.2, 0.8]}
 
+# importance tables indexed by category id, rows follow root_action_list, charBodyImportanceList and itemImportanceList
+SO_IMPORTANCE_TABLE = np.array([actionSOImportance[x] for x in root_action_list], dtype=float)
+BODY_IMPORTANCE_TABLE = np.array([charBodyImportance[x] for x in charBodyImportanceList], dtype=float)
+ITEM_IMPORTANCE_TABLE = np.array([itemImportanceMap[x] for x in itemImportanceList], dtype=float)
+
 # TODO: art resource list should be read from database
 # now keep it local
 
@@ -49,37 +56,68 @@ actionBodyImportanceMap = {"idle": "wholeBodyProminent",
                          "lie": "wholeBodyProminent",
                          "selfie": "upperBodyProminent"}
 
-def getActionBodyImportance(action8Layers):
+def getActionBodyCategory(action8Layers):
+    """
+    :param action8Layers: action
+    :return: row of the action in BODY_IMPORTANCE_TABLE
+    """
     # if user define some part of action, then this part can change the body prominent
     if action8Layers[2] != "NA":
         if action8Layers[1] != "NA":
-            return charBodyImportance["facialProminent"]
+            return charBodyImportanceList.index("facialProminent")
         else:
-            return charBodyImportance["upperBodyProminent"]
+            return charBodyImportanceList.index("upperBodyProminent")
 
     # ==== temp replace ====
     key = action8Layers[0].split("_")[0]
     if key in actionBodyImportanceMap.keys():
-
-        return charBodyImportance[actionBodyImportanceMap[key]]
+        return charBodyImportanceList.index(actionBodyImportanceMap[key])
     else:
-        return charBodyImportance[actionBodyImportanceMap['idle']]
+        return charBodyImportanceList.index(actionBodyImportanceMap['idle'])
     # ==== end ====
 
-    # return charBodyImportance[actionBodyImportanceMap[action8Layers[0].split("_")[0]]]
 
-def getActionSOImportance(action8Layers):
+def getActionSOCategory(action8Layers):
+    """
+    :param action8Layers: action
+    :return: row of the action in SO_IMPORTANCE_TABLE
+    """
     # ==== temp replace ====
     key = action8Layers[0].split("_")[0]
     if key in actionSOImporanceMap.keys():
-        return actionSOImportance[actionSOImporanceMap[key]]
+        return root_action_list.index(actionSOImporanceMap[key])
     else:
-        return actionSOImportance[actionSOImporanceMap['idle']]
+        return root_action_list.index(actionSOImporanceMap['idle'])
     # ==== end ====
+
+
+def getItemCategory():
+    # items only have one importance distribution for now
+    return itemImportanceList.index("frontProminent")
+
+
+def getActionCategories(script):
+    """
+    :param script: action sequence
+    :return: [sequence][action] (SO category id, body category id) of every script action
+    description:
+    category ids are assigned once per script action, importance of an action is then a row of SO_IMPORTANCE_TABLE
+    and BODY_IMPORTANCE_TABLE, so arrays of actions can look up their importance with one indexing
+    """
+    return [[(getActionSOCategory(action), getActionBodyCategory(action)) for action in sequence["action"]]
+            for sequence in script]
+
+
+def getActionBodyImportance(action8Layers):
+    return charBodyImportance[charBodyImportanceList[getActionBodyCategory(action8Layers)]]
+    # return charBodyImportance[actionBodyImportanceMap[action8Layers[0].split("_")[0]]]
+
+def getActionSOImportance(action8Layers):
+    return actionSOImportance[root_action_list[getActionSOCategory(action8Layers)]]
     # return actionSOImportance[actionSOImporanceMap[action8Layers[0].split("_")[0]]]
 
 def getItemImportance():
-    return itemImportanceMap["frontProminent"]
+    return itemImportanceMap[itemImportanceList[getItemCategory()]]
 
 if __name__ == "__main__":
     pass
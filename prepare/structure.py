@@ -5,13 +5,69 @@ from utils import utils
 from sklearn.preprocessing import normalize
 
 
+class LazyField:
+    """
+    project data field downloaded and parsed on first access, the value is then kept on the project
+    load(project) returns the value, data_name(project) is the DB data it parses, None if nothing is downloaded
+    """
+
+    def __init__(self, load, data_name):
+        self.load = load
+        self.data_name = data_name
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        assert getattr(instance, "db_loader", None) is not None, \
+            "{} is not loaded and the project has no DB loader".format(self.name)
+        value = self.load(instance)
+        # the instance attribute hides this descriptor from now on
+        instance.__dict__[self.name] = value
+        return value
+
+
 class Project:
 
     camera = None
     character = None
 
+    # per frame data, loaded on first access
+    LAZY_FIELDS = ["charVisibility", "eyePos", "headRoom", "leftRightOrder", "objVisibility", "defaultVelocity",
+                   "defaultDist"]
+    # int32 array of shape [66,63,3,6]
+    charVisibility = LazyField(lambda self: self.db_loader.loadCharVisibility(self.totalTime, self.numCharacters),
+                               lambda self: "charVisibility")
+    # float32 array of shape [66,63,3,2], NaN if no eye present
+    eyePos = LazyField(lambda self: self.db_loader.loadEyePos(self.totalTime, self.numCharacters),
+                       lambda self: "eyePos")
+    # float32 array of shape [66,63,2], NaN if head top is out
+    headRoom = LazyField(lambda self: self.db_loader.loadHeadRoom(self.totalTime, self.numCharacters),
+                         lambda self: "headroom")
+    # 3D list of shape [66,63,3], "NA" if character eye not present
+    # stored in the headroom data, see DATA_ROWS in database/database.py
+    leftRightOrder = LazyField(lambda self: self.db_loader.loadLeftRight(self.totalTime, self.numCharacters),
+                               lambda self: "leftRightOrder")
+    # user objects are added to be considered
+    # int32 array of shape [66, 63, <number of user added objects>, 2]
+    objVisibility = LazyField(lambda self: self.db_loader.loadObjVisibility(self.totalTime, self.numDefaultCameras,
+                                                                            self.numCharacters)
+                              if self.addObjects else None,
+                              lambda self: "objVisibility" if self.addObjects else None)
+    # conflict detector
+    defaultVelocity = LazyField(lambda self: self.db_loader.loadDefaultVelocity(), lambda self: "charProVelocity")
+    defaultDist = LazyField(lambda self: self.db_loader.loadDefaultCharCamDist(), lambda self: "charCamDist")
+
     def __init__(self, db_loader, project_id, full_time=None, protagonist=None, add_object=None, add_user_cams=None):
         self.project_id = project_id
+        # per frame data is downloaded by db_loader when first used, see LAZY_FIELDS
+        self.db_loader = db_loader
+        # the small data used right away is downloaded in one query
+        db_loader.fetch(["script", "characters", "defaultCams"] + (["objects"] if add_object else []) +
+                        (["userCamData"] if add_user_cams else []))
 
         self.script = db_loader.loadScript()  # list of dict
         # script reorder only for temp
@@ -42,31 +98,22 @@ class Project:
         # default character surrounding cameras data
         self.defaultCameras = db_loader.loadDefaultCameras()
         self.numDefaultCameras = len(self.defaultCameras.keys())
-        self.charVisibility = db_loader.loadCharVisibility(self.totalTime, self.numCharacters) # 4D list of shape [66,63,3,6]
-        self.eyePos = db_loader.loadEyePos(self.totalTime, self.numCharacters) # 4D list of shape [66,63,3,2], "NA" if no eye present
-        self.headRoom = db_loader.loadHeadRoom(self.totalTime, self.numCharacters) # 3D list of shape [66,63,2], "NA" if head top is out
-        self.leftRightOrder = db_loader.loadLeftRight(self.totalTime, self.numCharacters) # 3D list of shape [66,63,3], "NA" if character eye not present
         self.userCamData = None
 
         # user objects are added to be considered
         self.objects = None
-        self.objVisibility = None
         if self.addObjects:
             self.objects = db_loader.loadObjects() #
-            self.objVisibility = db_loader.loadObjVisibility(self.totalTime, self.numDefaultCameras, self.numCharacters) # 4D list of shape [66, 63, <number of user added objects>, 2]
 
         # user defined cameras are added to be considered
         self.userCamData = None
-        # if self.addUserCams:
-        #     self.userCamData = db_loader.loadUserCamData() # dict {startTime: <user cam data>}
+        if self.addUserCams:
+            self.userCamData = db_loader.loadUserCamData() # dict {startTime: <user cam data>}
+        db_loader.clear_blobs()
         #     self.userCamData, self.parallelUserCam = user_cam_preprocess.preprocess_user_cam(self.userCamData)
         #     print(self.userCamData)
         #     print(self.parallelUserCam)
 
-        # conflict detector
-        self.defaultVelocity = db_loader.loadDefaultVelocity()
-        self.defaultDist = db_loader.loadDefaultCharCamDist()
-
         # extra part
         self.char2camera_id = None
         self.color_abs_coverage = None
@@ -76,12 +123,54 @@ class Project:
         self.animation_dict = None
         self.animation_score_dict = None
         self.talking_char_t = None
+        # per second script lookup, see utils.script_index
+        self.script_index = None
 
         # optimized path
         self.camera_optimized_path = None
         self.minimum_cost_map = None
         self.initial_minimum_cost_map()
 
+    def __getstate__(self):
+        # pickled projects keep every field, the DB connection can not be pickled
+        self.prefetch()
+        state = dict(self.__dict__)
+        state.pop("db_loader", None)
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        :param state: {field: value} of every field, as returned by __getstate__ or saved by common.project_cache
+        :return: project data with the fields of state, nothing is downloaded
+        """
+        project_data = cls.__new__(cls)
+        # fields added after the state was saved
+        project_data.script_index = None
+        project_data.__dict__.update(state)
+        return project_data
+
+    def prefetch(self, fields=None, max_threads=None):
+        """
+        :param fields: names of LAZY_FIELDS a stage needs, all of them if None
+        :param max_threads: download the data on this many threads and parse it in worker processes, see
+                            DBLoader.fetch_parsed, if None it is downloaded in one query
+        description:
+        load the fields now instead of on first access, fields already loaded are skipped.
+        """
+        fields = [x for x in (self.LAZY_FIELDS if fields is None else fields) if x not in self.__dict__]
+        if not fields:
+            return
+        data_names = [getattr(Project, x).data_name(self) for x in fields]
+        data_names = [x for x in data_names if x is not None]
+        if max_threads:
+            self.db_loader.fetch_parsed(data_names, max_threads)
+        else:
+            self.db_loader.fetch(data_names)
+        for field in fields:
+            getattr(self, field)
+        self.db_loader.clear_blobs()
+
     def script_reorder(self):
         self.script = sorted(self.script, key = lambda i: i['startTime'][0])
 
@@ -204,6 +293,18 @@ class CostMatrix:
 
         # ======= sum up the cost parts ===========
         self.quality_cost = None
+        # quality_cost_cumsum[t] is the sum of quality_cost rows before t, shape [time + 1, cam]
+        self.quality_cost_cumsum = None
+
+        # ======= edge cost ===========
+        self.transfer_cost = None
+
+        # dominated[t - startTime][cam] is True if node [t, cam] can not be on an optimal path
+        self.dominated = None
+
+        # ======= dynamic programming tables, reused by re-optimization ===========
+        self.cost_to_go = None
+        self.next_node = None
 
     def init_sequence_cover(self, sequence_cover):
         self.sequence_cover = sequence_cover
@@ -225,4 +326,17 @@ class CostMatrix:
 
     def init_quality_cost(self, quality_cost):
         self.quality_cost = quality_cost
+        quality_cost = np.asarray(quality_cost, dtype=float)
+        self.quality_cost_cumsum = np.zeros((quality_cost.shape[0] + 1,) + quality_cost.shape[1:], dtype=float)
+        np.cumsum(quality_cost, axis=0, out=self.quality_cost_cumsum[1:])
+
+    def init_transfer_cost(self, transfer_cost):
+        self.transfer_cost = transfer_cost
+
+    def init_dominated(self, dominated):
+        self.dominated = dominated
+
+    def init_dp_tables(self, cost_to_go, next_node):
+        self.cost_to_go = cost_to_go
+        self.next_node = next_node
 
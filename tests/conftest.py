@@ -0,0 +1,113 @@
+# synthetic projects for the tests, no database needed
+import io
+import os
+import sys
+import random
+import contextlib
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.setrecursionlimit(100000)
+
+from prepare.structure import CostMatrix
+from common.camera_optimization import camera_pre_optimization
+
+ACTIONS = ["talk_a", "idle_b", "walk_c", "look_d", "sit_e"]
+ANGLES = [0, 45, -45, 90, -90]
+
+
+class SyntheticProject:
+    """
+    random project with the fields of prepare.structure.Project, every per frame field already loaded
+    """
+    def __init__(self, total_time=24, num_characters=2, cams_per_char=3, seed=0, na_rate=.2):
+        rnd = random.Random(seed)
+        names = ["c{}".format(i) for i in range(num_characters)]
+        num_cameras = num_characters * cams_per_char
+        self.project_id = 1
+        self.characters = {name: i for i, name in enumerate(names)}
+        self.numCharacters = num_characters
+        self.defaultCameras = {i: {"camIndex": i, "charIndex": i // cams_per_char, "angle": rnd.choice(ANGLES),
+                                   "distance": rnd.choice(["CU", "MS", "LS"])} for i in range(num_cameras)}
+        self.numDefaultCameras = num_cameras
+        self.script = self.random_script(rnd, names, total_time)
+        self.startTime = 0
+        self.totalTime = total_time
+        self.endTime = total_time - 1
+        self.distMap = {"CU": .7, "MS": 1., "LS": 3.}
+        self.protagonist = names[0]
+        self.objects = None
+        self.objVisibility = None
+        self.userCamData = None
+        self.talking_char_t = None
+        self.script_index = None
+
+        def na(value):
+            return "NA" if rnd.random() < na_rate else value
+
+        def eye():
+            if rnd.random() < na_rate:
+                return ["NA", "NA"]
+            return [rnd.choice([100, 200, rnd.randint(0, 1024)]), rnd.choice([300, rnd.randint(0, 768)])]
+
+        frames = range(total_time)
+        cameras = range(num_cameras)
+        chars = range(num_characters)
+        self.charVisibility = [[[[rnd.randint(0, 20000) if rnd.random() > .3 else 0 for _ in range(6)]
+                                 for _ in chars] for _ in cameras] for _ in frames]
+        self.eyePos = [[[eye() for _ in chars] for _ in cameras] for _ in frames]
+        self.headRoom = [[[na(rnd.randint(0, 1)) for _ in chars] for _ in cameras] for _ in frames]
+        self.leftRightOrder = [[[na(str(rnd.randint(0, 2))) for _ in chars] for _ in cameras] for _ in frames]
+        self.defaultVelocity = [[[rnd.random() for _ in chars] for _ in cameras] for _ in frames]
+        self.defaultDist = [[[rnd.random() * 5 for _ in chars] for _ in cameras] for _ in frames]
+
+        self.action_data = [[{"animations": {str(rnd.randint(0, 5)): 1} if rnd.random() < .7 else {},
+                              "sentences": {"0": {"animation_duration": rnd.choice([0, 1])}}} for _ in chars]
+                            for _ in self.script]
+        self.animation_dict = {"a{}".format(i): i for i in range(6)}
+        self.char2camera_id = {}
+        for cam, setting in self.defaultCameras.items():
+            self.char2camera_id.setdefault(setting["charIndex"], []).append(cam)
+
+    @staticmethod
+    def random_script(rnd, names, total_time):
+        script = []
+        t = 0
+        while t < total_time:
+            length = min(rnd.randint(2, 6), total_time - t)
+            sequence = {"sequenceIndex": len(script), "startTime": [], "duration": [], "action": [],
+                        "subjects": [], "objects": []}
+            for a in range(rnd.randint(1, 2)):
+                sequence["startTime"].append(t)
+                sequence["duration"].append(length if a == 0 else rnd.randint(1, length))
+                sequence["action"].append([rnd.choice(ACTIONS)] + [rnd.choice(["NA", "x"]) for _ in range(7)])
+                sequence["subjects"].append(rnd.sample(names, rnd.randint(1, len(names))))
+                sequence["objects"].append(rnd.sample(names, rnd.randint(0, len(names))))
+            script.append(sequence)
+            t += length
+        return script
+
+    def initial_talking_char_t(self, talking_char_t):
+        self.talking_char_t = talking_char_t
+
+    def prefetch(self, fields=None, max_threads=None):
+        # every field is loaded already
+        pass
+
+
+def prepare_project(prune=False, **kwargs):
+    """
+    :return: synthetic project and its cost matrix after camera_pre_optimization
+    """
+    project_data = SyntheticProject(**kwargs)
+    cost_matrix = CostMatrix(project_data.project_id)
+    with contextlib.redirect_stdout(io.StringIO()):
+        camera_pre_optimization(project_data, cost_matrix, prune)
+    return project_data, cost_matrix
+
+
+@pytest.fixture
+def quiet():
+    # the solvers print every shot
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
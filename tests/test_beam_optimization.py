@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from conftest import prepare_project
+from common.beam_optimization import beam_search, beam_search_gap
+from common.camera_optimization import backward_pass, get_start_cost
+from common.path_scoring import score_path
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_full_beam_is_exact(quiet, seed):
+    project_data, cost_matrix = prepare_project(total_time=40, num_characters=3, cams_per_char=4, seed=seed)
+    DefaultCamCostHash, _ = backward_pass(project_data, cost_matrix)
+    exact_cost = float(np.min(DefaultCamCostHash[0])) + get_start_cost(project_data)
+    for prune in [True, False]:
+        cost, path = beam_search(project_data, cost_matrix, project_data.numDefaultCameras, prune=prune)
+        assert np.isclose(cost, exact_cost)
+        assert np.isclose(score_path(project_data, cost_matrix, path)["total"], cost)
+
+
+def test_beam_search_gap(quiet):
+    project_data, cost_matrix = prepare_project(total_time=40, num_characters=3, cams_per_char=4, seed=1)
+    report = beam_search_gap(project_data, cost_matrix, [1, 2, project_data.numDefaultCameras])
+    assert [row[0] for row in report] == [1, 2, project_data.numDefaultCameras]
+    assert all(row[2] > -1e-9 for row in report)
+    assert abs(report[-1][2]) < 1e-9
+
+
+def test_forward_dominated():
+    from common.beam_optimization import get_forward_dominated
+    cost = np.array([0., 1., 1.5])
+    shot_costs = np.array([[1., 1., 1.], [2., 2., 0.]])
+    # node 1 always costs 1 more than node 0, node 2 is cheaper for the second duration
+    assert get_forward_dominated(cost, shot_costs, np.array([.5, .5])).tolist() == [False, True, False]
+    assert not get_forward_dominated(cost, shot_costs, np.array([1., 1.])).any()
@@ -0,0 +1,24 @@
+import tracemalloc
+from conftest import SyntheticProject
+from prepare.structure import CostMatrix
+from common import camera_optimization
+
+
+def test_checkpoint_without_transfer_tensor(quiet):
+    project_data = SyntheticProject(total_time=120, num_characters=4, cams_per_char=6, seed=3)
+    cost_matrix = CostMatrix(project_data.project_id)
+    camera_optimization.camera_pre_optimization(project_data, cost_matrix, transfer=False)
+    assert cost_matrix.transfer_cost is None
+
+    tracemalloc.start()
+    path = camera_optimization.get_checkpoint_optimized_path(project_data, cost_matrix)
+    checkpoint_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert cost_matrix.transfer_cost is None
+
+    camera_optimization.initial_transfer_cost(project_data, cost_matrix, camera_optimization.MAX_DURATION)
+    full_path = camera_optimization.get_optimized_path(
+        project_data, *camera_optimization.backward_pass(project_data, cost_matrix))
+    assert path == full_path
+    # the checkpoint solver peak stays well below the transfer cost tensor alone
+    assert checkpoint_peak < cost_matrix.transfer_cost.nbytes / 2
@@ -0,0 +1,37 @@
+import numpy as np
+from conftest import prepare_project
+from cost_functions import cost_curve
+from common.camera_optimization import camera_optimization_main, MAX_DURATION
+
+
+def test_curve_lookup_scalar_outside_table():
+    lookup = cost_curve.CurveLookup(cost_curve.durationCurve, MAX_DURATION)
+    for x in [MAX_DURATION + 1, 2.5, -1]:
+        assert isinstance(lookup(x), float)
+        assert lookup(x) == cost_curve.durationCurve(x)
+    assert lookup(3) == cost_curve.durationCurve(3)
+
+
+def test_curve_lookup_array():
+    lookup = cost_curve.CurveLookup(cost_curve.durationCurve, MAX_DURATION)
+    x = np.array([[1, MAX_DURATION + 1], [2.5, -1]])
+    assert np.array_equal(lookup(x), cost_curve.durationCurve(x))
+
+
+def test_position_change_curve_arrays():
+    pos1 = np.array([.1, .2])
+    pos2 = np.array([.3, .4])
+    assert cost_curve.positionChangeCurve(pos1, pos2) == cost_curve.positionChangeCurve([.1, .2], [.3, .4])
+    assert cost_curve.positionChangeCurve(pos1, pos1) == 0
+    batch = np.array([[.1, .2], [.3, .4], [.9, .9]])
+    expected = [cost_curve.positionChangeCurve(list(p), [.3, .4]) for p in batch]
+    assert np.allclose(cost_curve.positionChangeCurve(batch, pos2), expected)
+
+
+def test_long_max_duration(quiet):
+    project_data, cost_matrix = prepare_project(total_time=30, seed=1)
+    max_duration = MAX_DURATION + 2
+    path = camera_optimization_main(project_data, cost_matrix, max_duration=max_duration)
+    assert sum(shot[2] for shot in path) == project_data.totalTime
+    assert all(1 <= shot[2] <= max_duration for shot in path)
+    assert camera_optimization_main(project_data, cost_matrix, "checkpoint", max_duration) == path
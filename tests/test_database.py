@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from database.database import SQLiteDataBase, DBLoader, bulk_fetch, parse_data
+
+DATA_NAMES = ["script", "eyePos", "headroom"]
+
+
+def make_db(project_ids, data_names=DATA_NAMES):
+    db = SQLiteDataBase()
+    db.db_connect()
+    for project_id in project_ids:
+        for data_name in data_names:
+            db.upload_data(project_id, data_name, "{}-{}".format(project_id, data_name))
+    return db
+
+
+@pytest.mark.parametrize("batch_size", [1, 4, 100])
+def test_iter_data_round_trip(batch_size):
+    db = make_db([1, 2, 3])
+    rows = list(db.iter_data([1, 3], ["script", "headroom"], batch_size))
+    assert sorted(rows) == [(1, "headroom", "1-headroom"), (1, "script", "1-script"),
+                            (3, "headroom", "3-headroom"), (3, "script", "3-script")]
+    # the connection is free again once the generator is exhausted
+    assert db.download_data(2, "eyePos") == "2-eyePos"
+
+
+def test_download_many_round_trip():
+    db = make_db([1, 2])
+    blobs = db.download_many([1, 2, 4], DATA_NAMES + ["objects"])
+    assert blobs == {(project_id, data_name): "{}-{}".format(project_id, data_name)
+                     for project_id in [1, 2] for data_name in DATA_NAMES}
+
+    copy = make_db([])
+    copy.copy_projects(db, [2], DATA_NAMES)
+    assert copy.download_many([1, 2], DATA_NAMES) == {key: value for key, value in blobs.items() if key[0] == 2}
+
+
+def test_bulk_fetch():
+    db = make_db([1, 2])
+    loaders = [DBLoader(db, 1), DBLoader(db, 2)]
+    bulk_fetch(loaders, ["script", "eyePos", "script"])
+    for loader in loaders:
+        assert loader.blobs == {"script": "{}-script".format(loader.project_id),
+                                "eyePos": "{}-eyePos".format(loader.project_id)}
+
+
+class SingleConnectionDataBase(SQLiteDataBase):
+    # like a DataBase without a connection pool
+    def is_thread_safe(self):
+        return False
+
+
+@pytest.mark.parametrize("db_class", [SQLiteDataBase, SingleConnectionDataBase])
+def test_fetch_parsed(quiet, db_class):
+    db = db_class()
+    db.db_connect()
+    headroom = [[[1, "NA"], [0, 1]], [[0, 0], ["NA", 1]]]
+    eye_pos = [[[[1, 2], ["NA", "NA"]], [[3, 4], [5, 6]]]] * 2
+    db.upload_data(1, "headroom", str(headroom))
+    db.upload_data(1, "eyePos", str(eye_pos))
+    loader = DBLoader(db, 1)
+    loader.fetch_parsed(["eyePos", "leftRightOrder", "headroom"], max_threads=2, max_workers=1)
+    assert sorted(loader.blobs) == ["eyePos", "headroom"]
+    assert sorted(loader.parsed) == ["eyePos", "headroom", "leftRightOrder"]
+    # left right order is parsed in the pool from the headroom data
+    assert loader.loadLeftRight(2, 1) == headroom
+    assert np.array_equal(loader.loadHeadRoom(2, 1), parse_data("headroom", str(headroom)), equal_nan=True)
+    assert np.array_equal(loader.loadEyePos(2, 1), parse_data("eyePos", str(eye_pos)), equal_nan=True)
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from conftest import SyntheticProject, prepare_project
+from prepare.structure import CostMatrix
+from common.camera_optimization import camera_pre_optimization, backward_pass, get_optimized_path
+
+
+def check_dominated_states(project_data, cost_matrix):
+    """
+    :return: camera sequence and its cost of the full and the pruned solver
+    """
+    dominated = cost_matrix.dominated
+    results = []
+    for marks in [None, dominated]:
+        cost_matrix.init_dominated(marks)
+        cost_to_go, next_node = backward_pass(project_data, cost_matrix)
+        path = get_optimized_path(project_data, cost_to_go, next_node)
+        results.append((path, float(cost_to_go[0][path[0][1]])))
+    cost_matrix.init_dominated(dominated)
+    return results
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_pruning_keeps_optimal_path(quiet, seed):
+    project_data, cost_matrix = prepare_project(prune=True, total_time=40 + 5 * seed, num_characters=2 + seed % 3,
+                                                cams_per_char=3 + seed % 4, seed=seed)
+    assert cost_matrix.dominated.any()
+    (full_path, full_cost), (pruned_path, pruned_cost) = check_dominated_states(project_data, cost_matrix)
+    assert pruned_path == full_path
+    assert np.isclose(pruned_cost, full_cost)
+    # an optimal path never visits a dominated node
+    assert not any(cost_matrix.dominated[start - project_data.startTime][cam] for start, cam, _ in full_path)
+
+
+def test_pruning_rejects_user_cameras(quiet):
+    project_data = SyntheticProject(total_time=20)
+    project_data.userCamData = {10: {"camIndex": 100, "duration": 4}}
+    with pytest.raises(AssertionError):
+        camera_pre_optimization(project_data, CostMatrix(project_data.project_id), prune=True)
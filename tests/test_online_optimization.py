@@ -0,0 +1,31 @@
+import pytest
+from conftest import prepare_project
+from common.camera_optimization import camera_optimization_main
+from common.online_optimization import online_camera_optimization, iter_second_features
+from common.path_scoring import score_path
+
+
+def is_timeline(project_data, path):
+    return path[0][0] == project_data.startTime and path[-1][0] + path[-1][2] == project_data.endTime + 1 and \
+           all(path[i][0] + path[i][2] == path[i + 1][0] for i in range(len(path) - 1))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_online_full_window_same_as_dp(quiet, seed):
+    project_data, cost_matrix = prepare_project(total_time=30 + 5 * seed, seed=seed)
+    path = camera_optimization_main(project_data, cost_matrix)
+    online_path = list(online_camera_optimization(iter_second_features(project_data, cost_matrix),
+                                                  project_data.numDefaultCameras, window=project_data.totalTime,
+                                                  start_time=project_data.startTime))
+    assert online_path == path
+
+
+@pytest.mark.parametrize("window", [0, 2, 8])
+def test_online_short_window(quiet, window):
+    project_data, cost_matrix = prepare_project(total_time=40, seed=1)
+    best_cost = score_path(project_data, cost_matrix, camera_optimization_main(project_data, cost_matrix))["total"]
+    online_path = list(online_camera_optimization(iter_second_features(project_data, cost_matrix),
+                                                  project_data.numDefaultCameras, window=window,
+                                                  start_time=project_data.startTime))
+    assert is_timeline(project_data, online_path)
+    assert score_path(project_data, cost_matrix, online_path)["total"] >= best_cost - 1e-9
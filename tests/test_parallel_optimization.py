@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from conftest import prepare_project
+from common.camera_optimization import camera_optimization_main, MAX_DURATION
+from common.parallel_optimization import camera_optimization_parallel
+
+
+@pytest.mark.parametrize("total_time", [3, MAX_DURATION, 40])
+def test_parallel_same_as_serial(quiet, total_time):
+    project_data, cost_matrix = prepare_project(total_time=total_time, seed=2)
+    serial_transfer_cost = cost_matrix.transfer_cost
+    path = camera_optimization_main(project_data, cost_matrix)
+
+    cost_matrix.init_transfer_cost(None)
+    cost, parallel_path = camera_optimization_parallel(project_data, cost_matrix, max_workers=2)
+    assert parallel_path == path
+    assert np.array_equal(cost_matrix.transfer_cost, serial_transfer_cost)
+
+
+def test_parallel_movement_cost(quiet, monkeypatch):
+    from cost_functions import cost_functions
+    monkeypatch.setattr(cost_functions, "STYLE_WEIGHTS", [0, 0, 1])
+    project_data, cost_matrix = prepare_project(total_time=20, seed=4)
+    serial_transfer_cost = cost_matrix.transfer_cost
+    cost_matrix.init_transfer_cost(None)
+    camera_optimization_parallel(project_data, cost_matrix, max_workers=2)
+    assert np.array_equal(cost_matrix.transfer_cost, serial_transfer_cost)
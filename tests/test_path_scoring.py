@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from conftest import prepare_project
+from common.camera_optimization import backward_pass, get_optimized_path, get_start_cost
+from common.path_scoring import score_path, score_paths, SCORE_TERMS
+
+
+@pytest.mark.parametrize("style", [False, True])
+@pytest.mark.parametrize("seed", range(3))
+def test_score_same_as_dp_cost(quiet, monkeypatch, seed, style):
+    if style:
+        from cost_functions import cost_functions
+        monkeypatch.setattr(cost_functions, "STYLE_WEIGHTS", [.5, .5, 1])
+    project_data, cost_matrix = prepare_project(total_time=30 + 7 * seed, seed=seed)
+    cost_to_go, next_node = backward_pass(project_data, cost_matrix)
+    path = get_optimized_path(project_data, cost_to_go, next_node)
+    score = score_path(project_data, cost_matrix, path)
+    assert np.isclose(score["total"], cost_to_go[0][path[0][1]] + get_start_cost(project_data))
+    assert np.isclose(score["total"], score["start"] + sum(score[term].sum() for term in SCORE_TERMS))
+    assert all(score[term].shape == (len(path),) for term in SCORE_TERMS)
+
+    # any other path costs at least as much as the optimal one
+    other_path = [[start, (cam + 1) % project_data.numDefaultCameras, duration] for start, cam, duration in path]
+    other_cost, = score_paths(project_data, cost_matrix, [other_path])
+    assert other_cost >= score["total"] - 1e-9
+
+
+def test_score_rejects_invalid_path(quiet):
+    project_data, cost_matrix = prepare_project(total_time=12)
+    for path in [[], [[0, 0, 6], [5, 0, 6]], [[0, 0, 6], [6, 0, 5]], [[0, 0, 12]],
+                 [[0, project_data.numDefaultCameras, 6], [6, 0, 6]]]:
+        with pytest.raises(AssertionError):
+            score_path(project_data, cost_matrix, path)
@@ -0,0 +1,58 @@
+import os
+import pickle
+import numpy as np
+from conftest import SyntheticProject, prepare_project
+from prepare.structure import Project, CostMatrix
+from common.camera_optimization import camera_pre_optimization, camera_optimization_main
+from common import project_cache
+
+
+def make_legacy_project():
+    # a Project as pickled before the project cache, every per frame field is a nested list
+    project_data = Project.__new__(Project)
+    vars(project_data).update(vars(SyntheticProject(total_time=12, seed=6)))
+    del project_data.script_index
+    return project_data
+
+
+def test_convert_pickled_project(quiet, tmp_path):
+    path = os.path.join(str(tmp_path), "project_data")
+    legacy = make_legacy_project()
+    with open(path, "wb") as f:
+        pickle.dump(legacy, f)
+
+    project_data = project_cache.load_or_convert_project(path)
+    assert project_cache.is_project_cache(path)
+    assert os.path.isfile(path + ".pkl")
+    assert project_data.script == legacy.script
+    assert project_data.defaultCameras == legacy.defaultCameras
+    assert np.array_equal(project_data.charVisibility, np.array(legacy.charVisibility))
+
+    # later runs load the cache
+    project_data = project_cache.load_or_convert_project(path)
+    assert np.array_equal(project_data.charVisibility, np.array(legacy.charVisibility))
+
+
+def test_resume_interrupted_conversion(quiet, tmp_path):
+    path = os.path.join(str(tmp_path), "project_data")
+    legacy = make_legacy_project()
+    with open(path + ".pkl", "wb") as f:
+        pickle.dump(legacy, f)
+    project_data = project_cache.load_or_convert_project(path)
+    assert project_cache.is_project_cache(path)
+    assert project_data.totalTime == legacy.totalTime
+
+
+def test_left_right_order_memory_mapped(quiet, tmp_path):
+    legacy, cost_matrix = prepare_project(total_time=20, seed=3)
+    path = camera_optimization_main(legacy, cost_matrix)
+    project_cache.save_project(str(tmp_path), legacy)
+    assert os.path.isfile(os.path.join(str(tmp_path), "leftRightOrder.npy"))
+
+    project_data = project_cache.load_project(str(tmp_path))
+    assert isinstance(project_data, Project)
+    assert isinstance(project_data.leftRightOrder, np.memmap)
+    assert project_data.leftRightOrder.tolist() == legacy.leftRightOrder
+    cost_matrix = CostMatrix(project_data.project_id)
+    camera_pre_optimization(project_data, cost_matrix)
+    assert camera_optimization_main(project_data, cost_matrix) == path
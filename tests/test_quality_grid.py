@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from conftest import SyntheticProject
+from cost_functions import cost_functions
+from cost_functions import array_cost_functions
+from common.project_cache import to_array, ARRAY_FIELDS
+from camera_optimization_support.support import initial_script_index
+
+
+@pytest.mark.parametrize("typed", [False, True])
+def test_quality_grid_same_as_per_node(quiet, typed):
+    project_data = SyntheticProject(total_time=40, num_characters=4, cams_per_char=5, seed=7)
+    quality_hash = [[0] * project_data.numDefaultCameras for _ in range(project_data.totalTime)]
+    cost_functions.prepareQualityHashWoUserCam(quality_hash, project_data.totalTime, project_data.startTime,
+                                               project_data.endTime, project_data.defaultCameras,
+                                               project_data.characters, project_data.protagonist,
+                                               project_data.script, project_data.charVisibility,
+                                               project_data.headRoom, project_data.eyePos, project_data.distMap,
+                                               None, None)
+    if typed:
+        # arrays as loaded from the database or the project cache
+        for field in ["charVisibility", "eyePos", "headRoom"]:
+            setattr(project_data, field, to_array(getattr(project_data, field), ARRAY_FIELDS[field]))
+    initial_script_index(project_data)
+    quality_cost = array_cost_functions.getWeightedQualityCostGrid(
+        project_data.totalTime, project_data.startTime, project_data.endTime, project_data.defaultCameras,
+        project_data.characters, project_data.protagonist, project_data.script, project_data.charVisibility,
+        project_data.headRoom, project_data.eyePos, project_data.distMap, scriptIndex=project_data.script_index)
+    assert np.allclose(quality_cost, quality_hash, rtol=0, atol=1e-12)
@@ -0,0 +1,44 @@
+import random
+import numpy as np
+import pytest
+from conftest import SyntheticProject, prepare_project
+from prepare.structure import CostMatrix
+from common.camera_optimization import camera_pre_optimization, camera_optimization_main, camera_re_optimization
+
+
+def edit_project(project_data, rnd, dirty_start, dirty_end):
+    # new subjects and actions for the sequences inside the range, new framing for every second of it
+    names = list(project_data.characters)
+    for sequence in project_data.script:
+        if dirty_start <= sequence["startTime"][0] and \
+                max(start + duration for start, duration in zip(sequence["startTime"], sequence["duration"])) \
+                <= dirty_end + 1:
+            sequence["subjects"][0] = rnd.sample(names, 1)
+            sequence["action"][0][0] = rnd.choice(["talk_x", "look_y", "run_z"])
+    for t in range(dirty_start, dirty_end + 1):
+        for cam in range(project_data.numDefaultCameras):
+            for char in range(project_data.numCharacters):
+                project_data.eyePos[t][cam][char] = [rnd.randint(0, 1024), rnd.randint(0, 768)]
+                project_data.charVisibility[t][cam][char] = [rnd.randint(0, 9000) for _ in range(6)]
+
+
+@pytest.mark.parametrize("prune", [False, True])
+@pytest.mark.parametrize("seed", range(3))
+def test_re_optimization_same_as_full(quiet, seed, prune):
+    kwargs = {"total_time": 60, "seed": seed}
+    project_data, cost_matrix = prepare_project(prune, **kwargs)
+    camera_optimization_main(project_data, cost_matrix)
+    dirty_start, dirty_end = 30, 36
+    edit_project(project_data, random.Random(seed), dirty_start, dirty_end)
+    path = camera_re_optimization(project_data, cost_matrix, dirty_start, dirty_end)
+
+    full_project = SyntheticProject(**kwargs)
+    edit_project(full_project, random.Random(seed), dirty_start, dirty_end)
+    full_cost_matrix = CostMatrix(full_project.project_id)
+    camera_pre_optimization(full_project, full_cost_matrix, prune)
+    assert path == camera_optimization_main(full_project, full_cost_matrix)
+    assert np.array_equal(cost_matrix.quality_cost, full_cost_matrix.quality_cost)
+    assert np.allclose(cost_matrix.transfer_cost, full_cost_matrix.transfer_cost)
+    if prune:
+        assert np.array_equal(cost_matrix.dominated, full_cost_matrix.dominated)
+    assert np.allclose(cost_matrix.cost_to_go, full_cost_matrix.cost_to_go)
@@ -0,0 +1,53 @@
+import itertools
+import numpy as np
+import pytest
+from conftest import prepare_project
+from common.camera_optimization import camera_optimization_main
+from common.path_scoring import score_paths
+from common.top_k_optimization import camera_optimization_top_k
+
+
+def get_seconds(path):
+    # per second camera sequence of a path
+    return tuple(cam for start, cam, duration in path for _ in range(duration))
+
+
+def get_compositions(total, max_duration):
+    if total == 0:
+        yield []
+        return
+    for duration in range(1, min(max_duration, total) + 1):
+        for rest in get_compositions(total - duration, max_duration):
+            yield [duration] + rest
+
+
+@pytest.mark.parametrize("k", [5, 30])
+def test_top_k_distinct(quiet, k):
+    project_data, cost_matrix = prepare_project(total_time=30, seed=1)
+    best_path = camera_optimization_main(project_data, cost_matrix)
+    paths = camera_optimization_top_k(project_data, cost_matrix, k)
+    assert len(paths) == k
+    assert len(set(get_seconds(path) for _, path in paths)) == k
+    assert paths[0][1] == best_path
+    costs = [cost for cost, _ in paths]
+    assert costs == sorted(costs)
+    assert np.allclose(costs, score_paths(project_data, cost_matrix, [path for _, path in paths]))
+
+
+def test_top_k_brute_force(quiet):
+    project_data, cost_matrix = prepare_project(total_time=7, num_characters=2, cams_per_char=2, seed=5)
+    all_paths = []
+    for durations in get_compositions(project_data.totalTime, 6):
+        starts = np.cumsum([0] + durations[:-1])
+        for cams in itertools.product(range(project_data.numDefaultCameras), repeat=len(durations)):
+            all_paths.append([[int(s), c, d] for s, c, d in zip(starts, cams, durations)])
+    # a cut costs as much as its cheapest split into shots
+    best_cost = {}
+    for path, cost in zip(all_paths, score_paths(project_data, cost_matrix, all_paths)):
+        seconds = get_seconds(path)
+        best_cost[seconds] = min(best_cost.get(seconds, np.inf), cost)
+
+    paths = camera_optimization_top_k(project_data, cost_matrix, 40)
+    assert np.allclose([cost for cost, _ in paths], sorted(best_cost.values())[:40])
+    for cost, path in paths:
+        assert np.isclose(cost, best_cost[get_seconds(path)])
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from conftest import prepare_project
+from utils import utils
+from common.camera_optimization import camera_optimization_main, camera_re_optimization
+from common.parallel_optimization import camera_optimization_parallel
+
+
+def get_user_cam(project_data, cam_index, duration, seed):
+    # user camera with random framing of every character at its first and last second
+    rnd = np.random.RandomState(seed)
+    user_cam = {"camIndex": cam_index, "duration": duration}
+    for start_end in ["start", "end"]:
+        user_cam[start_end + "_eyePosition"] = [[int(rnd.randint(0, 1024)), int(rnd.randint(0, 768))]
+                                                for _ in range(project_data.numCharacters)]
+        user_cam[start_end + "_leftToRight"] = [str(rnd.randint(0, 3)) for _ in range(project_data.numCharacters)]
+    return user_cam
+
+
+def check_user_shots(project_data, path):
+    user_cam_times = utils.getUserCamTimes(project_data.userCamData)
+    assert path[0][0] == project_data.startTime and path[-1][0] + path[-1][2] == project_data.endTime + 1
+    for start, cam, duration in path:
+        if start in project_data.userCamData:
+            # fixed shots appear verbatim
+            assert [cam, duration] == [project_data.userCamData[start]["camIndex"],
+                                       project_data.userCamData[start]["duration"]]
+        else:
+            # default shots never cross a user camera interval
+            assert not user_cam_times.intersection(range(start, start + duration))
+    assert set(start for start, _, _ in path).issuperset(project_data.userCamData)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_user_cameras_fixed(quiet, seed):
+    project_data, cost_matrix = prepare_project(total_time=30, seed=seed)
+    # a user camera index may also be a default camera index
+    project_data.userCamData = {0: get_user_cam(project_data, 3, 2, seed),
+                                10: get_user_cam(project_data, 100, 4, seed + 1),
+                                14: get_user_cam(project_data, 101, 3, seed + 2),
+                                27: get_user_cam(project_data, 1, 3, seed + 3)}
+    path = camera_optimization_main(project_data, cost_matrix)
+    check_user_shots(project_data, path)
+    assert camera_re_optimization(project_data, cost_matrix, 4, 6) == path
+
+
+@pytest.mark.parametrize("solver", ["recursive", "checkpoint"])
+def test_user_cameras_unsupported(quiet, solver):
+    project_data, cost_matrix = prepare_project(total_time=20)
+    project_data.userCamData = {10: get_user_cam(project_data, 100, 4, 0)}
+    with pytest.raises(AssertionError):
+        camera_optimization_main(project_data, cost_matrix, solver)
+    with pytest.raises(AssertionError):
+        camera_optimization_parallel(project_data, cost_matrix, max_workers=1)
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from conftest import prepare_project
+from cost_functions import cost_functions
+from common.camera_optimization import camera_optimization_main
+from common.path_scoring import score_path
+from common.weight_sweep import weight_sweep
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_default_setting_same_as_main(quiet, seed):
+    project_data, cost_matrix = prepare_project(total_time=30, seed=seed)
+    path = camera_optimization_main(project_data, cost_matrix)
+    result, = weight_sweep(project_data, cost_matrix, [{}])
+    assert result["path"] == path
+    assert np.isclose(result["cost"], score_path(project_data, cost_matrix, path)["total"])
+
+
+def test_setting_same_as_main(quiet, monkeypatch):
+    quality_weights = [w * (1 + i) for i, w in enumerate(cost_functions.QUALITY_WEIGHTS)]
+    transfer_weights = [w * 3 for w in cost_functions.TRANSFER_WEIGHTS]
+    project_data, cost_matrix = prepare_project(total_time=30, seed=4)
+    results = weight_sweep(project_data, cost_matrix, [{}, {"quality_weights": quality_weights,
+                                                            "transfer_weights": transfer_weights}])
+
+    monkeypatch.setattr(cost_functions, "QUALITY_WEIGHTS", quality_weights)
+    monkeypatch.setattr(cost_functions, "TRANSFER_WEIGHTS", transfer_weights)
+    project_data, cost_matrix = prepare_project(total_time=30, seed=4)
+    assert results[1]["path"] == camera_optimization_main(project_data, cost_matrix)
+    assert results[1]["path"] != results[0]["path"]
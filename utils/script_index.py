@@ -0,0 +1,102 @@
+# script timeline index
+import numpy as np
+from utils import utils
+from prepare import action_preprocess
+
+
+class ScriptIndex:
+    """
+    per second view of the script, built once per project
+    sequence[t] is the sequence index of time t, actions[t], subjects[t] and objects[t] are the same lists as
+    utils.getActions, utils.getSubjects and utils.getObjects. Subjects and objects are also kept as integer arrays
+    padded with -1 to the largest number of actions and members, so vectorized cost code can use them as masks.
+    Every script action gets its importance category ids once, soCategory and bodyCategory index the importance tables
+    of action_preprocess.
+    """
+
+    def __init__(self, script, totalTime, characterIndex, protagonist=None, objIndex=None):
+        self.totalTime = totalTime
+        self.characterIndex = characterIndex
+        self.objIndex = objIndex
+        self.numCharacters = len(characterIndex)
+
+        self.sequence = np.zeros((totalTime,), dtype=int)
+        self.actions = []
+        self.subjects = []
+        self.objects = []
+        members = {"subject": [], "object": [], "subjectChar": [], "objectChar": []}
+        pov = []
+        categories = action_preprocess.getActionCategories(script)
+        actionCategories = []
+        for t in range(totalTime):
+            index = utils.getActionIndex(t, script)
+            # -1 is the last sequence, as when used as a list index
+            self.sequence[t] = index % len(script)
+            actions_list = utils.getActions(t, index, script)
+            actionCategories.append([categories[index][i] for i in utils.getActionIds(t, index, script)])
+            subs_list = utils.getSubjects(t, index, script, characterIndex, objIndex)
+            objs_list = utils.getObjects(t, index, script, characterIndex, objIndex)
+            self.actions.append(actions_list)
+            self.subjects.append(subs_list)
+            self.objects.append(objs_list)
+            for names, key in [(subs_list, "subject"), (objs_list, "object")]:
+                members[key].append([self.get_entities(x) for x in names])
+                members[key + "Char"].append([[characterIndex[y] for y in x if y in characterIndex.keys()]
+                                              for x in names])
+            pov.append(protagonist is not None and "look" in actions_list and
+                       any(characterIndex[protagonist] in sublist for sublist in subs_list))
+
+        numActions = max([len(x) for x in self.actions] + [1])
+        self.action = np.zeros((totalTime, numActions), dtype=bool)
+        # padding actions use category 0, they are masked by action
+        self.soCategory = np.zeros((totalTime, numActions), dtype=int)
+        self.bodyCategory = np.zeros((totalTime, numActions), dtype=int)
+        self.pov = np.array(pov, dtype=bool)
+        for t, row in enumerate(actionCategories):
+            for a, (soCategory, bodyCategory) in enumerate(row):
+                self.action[t, a] = True
+                self.soCategory[t, a] = soCategory
+                self.bodyCategory[t, a] = bodyCategory
+        # subject, object: index into characters then items, subjectChar, objectChar: character index
+        for key, value in members.items():
+            width = max([len(m) for row in value for m in row] + [1])
+            array = np.full((totalTime, numActions, width), -1, dtype=int)
+            for t, row in enumerate(value):
+                for a, m in enumerate(row):
+                    array[t, a, :len(m)] = m
+            setattr(self, key, array)
+
+        # how many actions happening at time t have the character as subject/object
+        characters = np.arange(self.numCharacters)
+        self.subCount = (self.subjectChar[..., np.newaxis] == characters).sum(axis=(1, 2))
+        self.objCount = (self.objectChar[..., np.newaxis] == characters).sum(axis=(1, 2))
+
+    def get_entities(self, names):
+        # characters keep their index, items come after the characters
+        if self.objIndex:
+            return [self.numCharacters + self.objIndex[x] if x in self.objIndex.keys() else self.characterIndex[x]
+                    for x in names]
+        return [self.characterIndex[x] for x in names if x in self.characterIndex.keys()]
+
+    def getActionIndex(self, t):
+        return self.sequence[t]
+
+    def getActions(self, t):
+        return self.actions[t]
+
+    def getSubjects(self, t):
+        return self.subjects[t]
+
+    def getObjects(self, t):
+        return self.objects[t]
+
+    def getActionStructure(self, times):
+        """
+        :param times: node times
+        :return: {"action", "so", "body", "pov", "subject", "object", "subjectChar", "objectChar"} rows of times
+        """
+        structure = {key: getattr(self, key)[times] for key in
+                     ["action", "pov", "subject", "object", "subjectChar", "objectChar"]}
+        structure["so"] = action_preprocess.SO_IMPORTANCE_TABLE[self.soCategory[times]]
+        structure["body"] = action_preprocess.BODY_IMPORTANCE_TABLE[self.bodyCategory[times]]
+        return structure
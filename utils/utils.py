@@ -88,6 +88,18 @@ def getActionIndex(t, script):
     return -1
 
 
+def getActionIds(t, seqIndex, script):
+    """
+    :param t: time
+    :param seqIndex: sequence index
+    :param script: action sequence
+    :return: indices of the actions under this sequence happening at time t
+    """
+    # not all actions under the same sequence are happenning at time t
+    # some might stop earlier
+    return [i for i in range(len(script[seqIndex]['action']))
+            if script[seqIndex]["startTime"][i] <= t < script[seqIndex]["startTime"][i] + script[seqIndex]["duration"][i]]
+
 def getActions(t, seqIndex, script):
     """
     :param t: time
@@ -95,16 +107,8 @@ def getActions(t, seqIndex, script):
     :param script: action sequence
     :return: actions under this sequence
     """
-    actions = script[seqIndex]['action']
-    actions_exist = []
-    for i in range(len(actions)):
-        # not all actions under the same sequence are happenning at time t
-        # some might stop earlier
-        if t >= script[seqIndex]["startTime"][i] and t < script[seqIndex]["startTime"][i] + script[seqIndex]["duration"][i]:
-            # actions[i] is still happening at time t
-            actions_exist.append(actions[i])
     # return actions happening at time t, if action is unknown, put ""
-    return actions_exist
+    return [script[seqIndex]['action'][i] for i in getActionIds(t, seqIndex, script)]
 
 def getSubjects(t, seqIndex, script, characterIndex, objIndex):
     """
@@ -157,6 +161,12 @@ def getObjects(t, seqIndex, script, characterIndex, objIndex):
                 objects_exist.append("")
     return objects_exist
 
+def isNA(value):
+    # missing values are "NA" in nested list data and NaN in array data
+    if isinstance(value, str):
+        return value == "NA"
+    return bool(value != value)
+
 def getCharVisibility(char, time, cam, charVis):
     """
     :param char: character
@@ -187,8 +197,8 @@ def getDefaultEyePos(char, t, cam, eyePosData):
     :return: character eye position for node [t, cam]
     """
     eyePos = eyePosData[t][cam][char]
-    if eyePos == ["NA", "NA"]:
-        return eyePos
+    if isNA(eyePos[0]):
+        return ["NA", "NA"]
     else:
         return [int(x) for x in eyePos]
 
@@ -232,8 +242,8 @@ def getHeadRoom(t, cam, char, headroomData):
     :return: character headroom for node [t, cam]
     """
     headroom = headroomData[t][cam][char]
-    if headroom == "NA":
-        return headroom
+    if isNA(headroom):
+        return "NA"
     else:
         return int(headroom)
 
@@ -441,6 +451,17 @@ def getValidNextNodesWUserCam(t, max_duration, fixedNodes, numDefaultCams, start
     return nodes
 
 
+def getUserCamTimes(userCamData):
+    """
+    :param userCamData: user added camera data {startTime: <user cam data>}
+    :return: set of all times covered by user added cameras
+    """
+    times = set()
+    for t, userCam in userCamData.items():
+        times.update(range(t, t + userCam["duration"]))
+    return times
+
+
 def getUserDefinedNextNodes(t, userCamData, num_cameras):
     duration = userCamData[t]["duration"]
     nextNodeTime = t + duration